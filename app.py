@@ -1,4 +1,4 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session
+from flask import Flask, render_template, stream_template, request, redirect, url_for, flash, jsonify, session
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from flask_mail import Mail, Message
@@ -38,6 +38,26 @@ except ImportError:
     DOLOS_AVAILABLE = False
     print("Dolos integration not available - using local plagiarism detection only")
 
+from plagiarism_backends import Backend, BackendRegistry, BackendUnavailable
+from engine_metrics import CheckProfile, EngineHistograms, EXTRACTION, PREPROCESS
+
+from fingerprinting import (
+    compute_fingerprints, pack_fingerprints, unpack_fingerprints, FingerprintIndex, build_fragments, top_k_by_shared,
+    DEFAULT_KGRAM_LENGTH, DEFAULT_WINDOW_SIZE
+)
+from text_preprocessing import preprocess_documents, set_memory_budget, Vocabulary
+from minhash import minhash_signature, pack_signature, unpack_signature, band_buckets
+from tfidf_model import term_counts, pack_vector, unpack_vector, DocumentFrequencies
+from plagiarism_result import PlagiarismResult, content_statistics, fragment_ranges
+from code_tokenizer import language_for_file, compute_code_fingerprints, CODE_KGRAM_LENGTH, CODE_WINDOW_SIZE
+from ast_clones import subtree_hashes, pack_subtrees, unpack_subtrees, clone_similarity, clone_regions
+from pair_similarity import semantic_pair_similarity, phrase_pair_similarity, structure_pair_similarity, shared_rows
+from parallel_engine import pairwise_matrices, default_workers
+from content_digest import save_upload, normalized_sha256, extracted_text_digest, EXTRACTED_TEXT_MARKER
+from simhash import SimHashIndex, paragraph_simhashes, hamming_distance, to_signed, to_unsigned, MAX_HAMMING_DISTANCE
+from submission_diff import anchor_chain, side_by_side_rows, READ_CHUNK_CHARS
+from clustering import cluster_pairs
+
 # Load environment variables from .env file
 if os.path.exists('.env'):
     with open('.env', 'r') as f:
@@ -85,6 +105,24 @@ app.config['DUPLICHECKER_API_KEY'] = os.environ.get('DUPLICHECKER_API_KEY', '')
 app.config['DUPLICHECKER_API_URL'] = 'https://www.duplichecker.com/api/plagiarism-check'
 app.config['USE_DUPLICHECKER_API'] = os.environ.get('USE_DUPLICHECKER_API', 'false').lower() in ['true', 'on', '1']
 
+# Local Plagiarism Engine Configuration
+# The cascade skips expensive methods on peers that cannot raise their maximum (exact results)
+app.config['PLAGIARISM_CASCADE'] = os.environ.get('PLAGIARISM_CASCADE', 'true').lower() in ['true', 'on', '1']
+# Optionally also skip them on peers below this fingerprint similarity (%), 0 keeps results exact
+app.config['PLAGIARISM_CASCADE_MIN_FINGERPRINT'] = float(os.environ.get('PLAGIARISM_CASCADE_MIN_FINGERPRINT', 0))
+# Submissions whose pair score (%) reaches this threshold are grouped together
+app.config['PLAGIARISM_GROUP_THRESHOLD'] = float(os.environ.get('PLAGIARISM_GROUP_THRESHOLD', 50))
+# Full assignment checks of at least this many submissions score pairs in a process pool (0 = all cores)
+app.config['PLAGIARISM_WORKERS'] = int(os.environ.get('PLAGIARISM_WORKERS', 0))
+app.config['PLAGIARISM_PARALLEL_MIN_DOCUMENTS'] = int(os.environ.get('PLAGIARISM_PARALLEL_MIN_DOCUMENTS', 100))
+# Memory (MB) the statistics of one document may take; longer documents are scored in windows and sampled (0 = no limit)
+app.config['PLAGIARISM_MEMORY_BUDGET_MB'] = int(os.environ.get('PLAGIARISM_MEMORY_BUDGET_MB', 256))
+# Trace peak Python allocations per method in every check (tracemalloc slows checks down); force checks always do
+app.config['PLAGIARISM_TRACE_MEMORY'] = os.environ.get('PLAGIARISM_TRACE_MEMORY', 'false').lower() in ['true', 'on', '1']
+# Seconds between health probes of the external backends (Dolos, PlagiarismCheck.org)
+app.config['PLAGIARISM_BACKEND_HEALTH_SECONDS'] = int(os.environ.get('PLAGIARISM_BACKEND_HEALTH_SECONDS', 300))
+set_memory_budget(app.config['PLAGIARISM_MEMORY_BUDGET_MB'] * 1024 * 1024)
+
 # Ensure upload directory exists
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
@@ -96,19 +134,40 @@ login_manager.login_view = 'login'
 login_manager.session_protection = "strong"  # Force re-login on server restart
 login_manager.remember_cookie_duration = timedelta(days=30)  # Remember for 30 days
 
-# Initialize Dolos integration
+# Plagiarism backends: probed here and by the scheduler, checks only read the cached health
 dolos_integration = None
-if DOLOS_AVAILABLE:
-    try:
+
+def probe_dolos():
+    """Dolos health: Node.js and the Dolos installation (probed on construction the first time)"""
+    global dolos_integration
+    if not DOLOS_AVAILABLE:
+        return False
+    if dolos_integration is None:
         dolos_integration = DolosIntegration()
-        if dolos_integration.is_available():
-            print("✅ Dolos integration available - advanced plagiarism detection enabled")
-        else:
-            print("⚠️ Dolos integration not properly configured - using local detection only")
-            dolos_integration = None
-    except Exception as e:
-        print(f"⚠️ Error initializing Dolos integration: {e}")
-        dolos_integration = None
+        return dolos_integration.is_available()
+    return dolos_integration.refresh_availability()
+
+def probe_plagiarism_check_api():
+    """PlagiarismCheck.org health: enabled and configured; request failures trip its circuit breaker"""
+    return bool(app.config['USE_PLAGIARISM_CHECK_API'] and app.config['PLAGIARISM_CHECK_API_TOKEN'])
+
+backend_registry = BackendRegistry()
+# Stage metrics of the checks run by this process, see engine_metrics.py
+plagiarism_metrics = EngineHistograms()
+health_ttl = app.config['PLAGIARISM_BACKEND_HEALTH_SECONDS']
+backend_registry.register(Backend('dolos', 'peer', ['code'], probe_dolos, priority=0, health_ttl=health_ttl))
+backend_registry.register(Backend('local', 'peer', ['code', 'text'], lambda: True, priority=100, health_ttl=health_ttl))
+backend_registry.register(Backend('plagiarismcheck', 'web', ['text'], probe_plagiarism_check_api, priority=10,
+                                  health_ttl=health_ttl))
+
+if backend_registry.get('dolos').healthy:
+    print("✅ Dolos integration available - advanced plagiarism detection enabled")
+else:
+    print("⚠️ Dolos integration not properly configured - using local detection only")
+
+def refresh_backend_health():
+    """Re-probe plagiarism backends whose cached health expired"""
+    backend_registry.refresh_health()
 
 # Initialize scheduler for automated tasks
 scheduler = BackgroundScheduler()
@@ -126,6 +185,9 @@ def initialize_database():
             # Create all tables
             db.create_all()
             
+            # Add columns introduced after the tables were first created
+            upgrade_database_columns()
+            
             # Create admin user if not exists
             admin = User.query.filter_by(username='admin').first()
             if not admin:
@@ -195,6 +257,51 @@ def initialize_database():
             import traceback
             traceback.print_exc()
 
+# Columns added to existing tables after their first release: (table, column, SQL type)
+ADDED_COLUMNS = [
+    ('submission', 'plagiarism_match_id', 'INTEGER REFERENCES submission (id)'),
+    ('submission', 'plagiarism_details', 'TEXT'),
+    ('submission_fingerprint', 'content_hash', 'VARCHAR(64)'),
+    ('submission_fingerprint', 'text_length', 'INTEGER'),
+    ('submission_fingerprint', 'minhash', 'BLOB'),
+    ('submission_fingerprint', 'term_counts', 'BLOB'),
+    ('submission', 'plagiarism_group_id', 'INTEGER REFERENCES plagiarism_group (id)'),
+    ('submission_fingerprint', 'ast_subtrees', 'BLOB'),
+    ('submission_fingerprint', 'template_digest', 'VARCHAR(64)'),
+    ('submission_fingerprint', 'paragraph_count', 'INTEGER'),
+    ('submission_fingerprint', 'posting_count', 'INTEGER'),
+    ('submission', 'content_sha256', 'VARCHAR(64)'),
+    ('assignment_tfidf_model', 'scores_version', 'INTEGER NOT NULL DEFAULT 0'),
+]
+
+# Indexes on added columns (created by db.create_all only for new tables): (name, table, column)
+ADDED_INDEXES = [
+    ('ix_submission_fingerprint_content_hash', 'submission_fingerprint', 'content_hash'),
+    ('ix_submission_content_sha256', 'submission', 'content_sha256'),
+]
+
+def upgrade_database_columns():
+    """Add missing columns to existing tables (db.create_all only creates new tables)"""
+    from sqlalchemy import inspect, text
+    
+    inspector = inspect(db.engine)
+    existing_tables = inspector.get_table_names()
+    for table, column, column_type in ADDED_COLUMNS:
+        if table not in existing_tables:
+            continue
+        columns = [col['name'] for col in inspector.get_columns(table)]
+        if column not in columns:
+            print(f"🔄 Adding column {table}.{column}")
+            db.session.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {column_type}'))
+    for name, table, column in ADDED_INDEXES:
+        if table in existing_tables:
+            db.session.execute(text(f'CREATE INDEX IF NOT EXISTS {name} ON {table} ({column})'))
+    # Digests of empty text stored before short texts got none would mark every empty upload a copy
+    if 'submission' in existing_tables:
+        db.session.execute(text('UPDATE submission SET content_sha256 = NULL WHERE content_sha256 = :empty'),
+                           {'empty': hashlib.sha256(b'').hexdigest()})
+    db.session.commit()
+
 def create_demo_courses():
     """Create demo classes and courses, enroll students"""
     try:
@@ -527,6 +634,17 @@ class Assignment(db.Model):
     course = db.relationship('Course', backref='assignments')  # Add course relationship
     submissions = db.relationship('Submission', backref='assignment', lazy=True)
 
+class AssignmentTemplate(db.Model):
+    """Text every submission of an assignment is expected to contain (prompt, skeleton code), excluded from plagiarism fingerprints"""
+    id = db.Column(db.Integer, primary_key=True)
+    assignment_id = db.Column(db.Integer, db.ForeignKey('assignment.id'), nullable=False, index=True)
+    name = db.Column(db.String(200), nullable=False)
+    content = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    assignment = db.relationship('Assignment', backref=db.backref('templates', lazy=True, order_by='AssignmentTemplate.id'))
+
 class Submission(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     assignment_id = db.Column(db.Integer, db.ForeignKey('assignment.id'), nullable=False)
@@ -539,9 +657,107 @@ class Submission(db.Model):
     plagiarism_score = db.Column(db.Float, default=0.0)
     plagiarism_report = db.Column(db.Text, nullable=True)
     content = db.Column(db.Text, nullable=True)  # Store file content for plagiarism detection
+    plagiarism_match_id = db.Column(db.Integer, db.ForeignKey('submission.id'), nullable=True)  # Best matching peer
+    plagiarism_details = db.Column(db.Text, nullable=True)  # Compact JSON with per-method scores
+    plagiarism_group_id = db.Column(db.Integer, db.ForeignKey('plagiarism_group.id'), nullable=True)  # Collusion group
+    content_sha256 = db.Column(db.String(64), nullable=True, index=True)  # Whitespace-normalized content digest, see content_digest.py
     
     # Relationships
     grades = db.relationship('Grade', backref='submission', lazy=True)
+    plagiarism_match = db.relationship('Submission', remote_side=[id], foreign_keys=[plagiarism_match_id],
+                                       post_update=True)  # Two submissions may be each other's best match
+
+class SubmissionFingerprint(db.Model):
+    """Winnowed fingerprints and other index data of a submission, computed once at upload time"""
+    id = db.Column(db.Integer, primary_key=True)
+    submission_id = db.Column(db.Integer, db.ForeignKey('submission.id'), unique=True, nullable=False)
+    kgram_length = db.Column(db.Integer, nullable=False)
+    window_size = db.Column(db.Integer, nullable=False)
+    fingerprint_count = db.Column(db.Integer, nullable=False, default=0)
+    data = db.Column(db.LargeBinary, nullable=False)  # packed fingerprints, see fingerprinting.pack_fingerprints
+    content_hash = db.Column(db.String(64), nullable=True, index=True)  # SHA-256 of the extracted text
+    text_length = db.Column(db.Integer, nullable=True)  # Length of the stripped text, for the peer filter
+    minhash = db.Column(db.LargeBinary, nullable=True)  # MinHash signature of the fingerprint hashes, see minhash.py
+    term_counts = db.Column(db.LargeBinary, nullable=True)  # Hashed TF-IDF term counts, see tfidf_model.py (empty if too short)
+    ast_subtrees = db.Column(db.LargeBinary, nullable=True)  # Python only: packed subtree hashes, see ast_clones.py
+    template_digest = db.Column(db.String(64), nullable=True)  # Assignment templates excluded from the fingerprints
+    paragraph_count = db.Column(db.Integer, nullable=True)  # Paragraph SimHashes stored (0 for code), None if not indexed yet
+    posting_count = db.Column(db.Integer, nullable=True)  # Distinct fingerprint hashes in the postings, None if not indexed yet
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    submission = db.relationship('Submission', backref=db.backref('fingerprint', uselist=False))
+
+class AssignmentTfidfModel(db.Model):
+    """Document frequencies of an assignment's indexed submissions, updated as they are indexed"""
+    id = db.Column(db.Integer, primary_key=True)
+    assignment_id = db.Column(db.Integer, db.ForeignKey('assignment.id'), unique=True, nullable=False)
+    document_count = db.Column(db.Integer, nullable=False, default=0)
+    data = db.Column(db.LargeBinary, nullable=True)  # packed tfidf_model.DocumentFrequencies
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    scores_version = db.Column(db.Integer, nullable=False, default=0)  # Bumped by every write of the assignment's scores, see claim_assignment_scores
+
+class PlagiarismGroup(db.Model):
+    """Submissions of an assignment connected by pair scores above the group threshold"""
+    id = db.Column(db.Integer, primary_key=True)
+    assignment_id = db.Column(db.Integer, db.ForeignKey('assignment.id'), nullable=False, index=True)
+    size = db.Column(db.Integer, nullable=False)
+    max_score = db.Column(db.Float, nullable=False, default=0.0)  # Highest pair score inside the group
+    threshold = db.Column(db.Float, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    members = db.relationship('Submission', backref='plagiarism_group', lazy=True,
+                              foreign_keys='Submission.plagiarism_group_id', order_by='Submission.id')
+
+class MinHashBand(db.Model):
+    """LSH band buckets of a submission's MinHash signature, for candidate lookup across the corpus"""
+    __table_args__ = (db.Index('ix_minhash_band_bucket', 'band', 'bucket'),)
+    
+    id = db.Column(db.Integer, primary_key=True)
+    submission_id = db.Column(db.Integer, db.ForeignKey('submission.id'), nullable=False, index=True)
+    band = db.Column(db.Integer, nullable=False)
+    bucket = db.Column(db.BigInteger, nullable=False)
+
+class FingerprintPosting(db.Model):
+    """Inverted index of the corpus: one row per distinct winnowed fingerprint hash of a submission"""
+    __table_args__ = (db.Index('ix_fingerprint_posting_hash', 'fingerprint_hash', 'submission_id'),)
+    
+    id = db.Column(db.Integer, primary_key=True)
+    submission_id = db.Column(db.Integer, db.ForeignKey('submission.id'), nullable=False, index=True)
+    fingerprint_hash = db.Column(db.BigInteger, nullable=False)
+
+class AstSubtreeHash(db.Model):
+    """Normalized AST subtree hashes of Python submissions per assignment, for structural clone lookup"""
+    __table_args__ = (db.Index('ix_ast_subtree_assignment_hash', 'assignment_id', 'subtree_hash'),)
+    
+    id = db.Column(db.Integer, primary_key=True)
+    assignment_id = db.Column(db.Integer, db.ForeignKey('assignment.id'), nullable=False)
+    submission_id = db.Column(db.Integer, db.ForeignKey('submission.id'), nullable=False, index=True)
+    subtree_hash = db.Column(db.BigInteger, nullable=False)
+
+class ParagraphSimHash(db.Model):
+    """64-bit SimHash of each paragraph of a document, for reworded paragraph lookup across the corpus"""
+    id = db.Column(db.Integer, primary_key=True)
+    submission_id = db.Column(db.Integer, db.ForeignKey('submission.id'), nullable=False, index=True)
+    position = db.Column(db.Integer, nullable=False)  # Index among the submission's hashed paragraphs
+    simhash = db.Column(db.BigInteger, nullable=False)  # Stored signed, see simhash.to_signed
+    char_start = db.Column(db.Integer, nullable=False)
+    char_end = db.Column(db.Integer, nullable=False)
+
+class SubmissionPair(db.Model):
+    """Memoized per-method similarity of two documents, keyed by pair memo hashes and engine version"""
+    __table_args__ = (db.UniqueConstraint('hash_a', 'hash_b', 'engine_version'),)
+    
+    id = db.Column(db.Integer, primary_key=True)
+    hash_a = db.Column(db.String(64), nullable=False)  # pair_memo_hash of each side, hash_a <= hash_b
+    hash_b = db.Column(db.String(64), nullable=False)
+    engine_version = db.Column(db.String(32), nullable=False)
+    semantic_ab = db.Column(db.Float, nullable=False)  # A checked against B
+    semantic_ba = db.Column(db.Float, nullable=False)  # B checked against A
+    fingerprint = db.Column(db.Float, nullable=False)
+    phrase = db.Column(db.Float, nullable=False)
+    structure = db.Column(db.Float, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 class Grade(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -595,20 +811,27 @@ def allowed_file(filename):
     }
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+# Text-based files that can be fully analyzed
+TEXT_FILE_EXTENSIONS = {
+    'txt', 'py', 'js', 'java', 'c', 'cpp', 'cs', 'go', 'rs', 'php', 'rb',
+    'scala', 'kt', 'swift', 'r', 'sql', 'html', 'css', 'sh', 'ps1', 'ts',
+    'jsx', 'tsx', 'vue', 'svelte', 'm', 'mm', 'h', 'hpp', 'cc', 'cxx',
+    'pl', 'pm', 'pyw', 'pyi', 'pyx', 'pxd', 'pxi', 'sass', 'scss', 'less',
+    'xml', 'json', 'yaml', 'yml', 'toml', 'ini', 'cfg', 'conf', 'md',
+    'rst', 'tex', 'latex', 'rtf', 'csv', 'tsv', 'log', 'out', 'err'
+}
+# What read_file_content returns for a text file that is empty or cannot be decoded
+UNREADABLE_TEXT = "Unable to read file content - encoding issues"
+# Encodings tried in order on text files
+TEXT_ENCODINGS = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1', 'ascii']
+
 def read_file_content(file_path):
     """Read file content for plagiarism detection, handling different file types"""
     try:
         file_extension = file_path.split('.')[-1].lower()
         
         # Text-based files that can be fully analyzed
-        text_extensions = {
-            'txt', 'py', 'js', 'java', 'c', 'cpp', 'cs', 'go', 'rs', 'php', 'rb',
-            'scala', 'kt', 'swift', 'r', 'sql', 'html', 'css', 'sh', 'ps1', 'ts',
-            'jsx', 'tsx', 'vue', 'svelte', 'm', 'mm', 'h', 'hpp', 'cc', 'cxx',
-            'pl', 'pm', 'pyw', 'pyi', 'pyx', 'pxd', 'pxi', 'sass', 'scss', 'less',
-            'xml', 'json', 'yaml', 'yml', 'toml', 'ini', 'cfg', 'conf', 'md',
-            'rst', 'tex', 'latex', 'rtf', 'csv', 'tsv', 'log', 'out', 'err'
-        }
+        text_extensions = TEXT_FILE_EXTENSIONS
         
         # Document files that can be analyzed with text extraction
         document_extensions = {
@@ -627,7 +850,7 @@ def read_file_content(file_path):
         
         if file_extension in text_extensions:
             # Read text-based files with multiple encoding attempts
-            encodings = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1', 'ascii']
+            encodings = TEXT_ENCODINGS
             for encoding in encodings:
                 try:
                     with open(file_path, 'r', encoding=encoding) as f:
@@ -637,7 +860,7 @@ def read_file_content(file_path):
                             return content
                 except (UnicodeDecodeError, UnicodeError):
                     continue
-            return "Unable to read file content - encoding issues"
+            return UNREADABLE_TEXT
             
         elif file_extension in document_extensions:
             # Try to extract text from document files
@@ -668,6 +891,26 @@ def read_file_content(file_path):
     except Exception as e:
         return f"Error reading file: {str(e)}"
 
+def open_text_file(file_path):
+    """Open a text submission the way read_file_content reads it, None for other files
+    
+    The file is decoded chunk by chunk to choose the encoding, so its text is never
+    held whole; the caller reads (and closes) the returned file.
+    """
+    if file_path.split('.')[-1].lower() not in TEXT_FILE_EXTENSIONS:
+        return None
+    for encoding in TEXT_ENCODINGS:
+        try:
+            with open(file_path, 'r', encoding=encoding) as f:
+                readable = any(chunk.strip() for chunk in iter(lambda: f.read(READ_CHUNK_CHARS), ''))
+        except (UnicodeDecodeError, UnicodeError):
+            continue
+        except OSError:
+            return None
+        if readable:
+            return open(file_path, 'r', encoding=encoding)
+    return None
+
 def extract_text_from_document(file_path, file_extension):
     """Extract text content from document files (PDF, Word, etc.)"""
     try:
@@ -824,11 +1067,21 @@ def check_plagiarism_simple_web(content):
 
 def check_plagiarism_with_api(content, author_email, author_name=None):
     """Check plagiarism using PlagiarismCheck.org API"""
+    backend = backend_registry.get('plagiarismcheck')
+    if not backend.allow():
+        # Not configured, or failing (circuit open): no request is made
+        print("⚠️ PlagiarismCheck.org API not configured or unavailable, falling back to local check")
+        return None
+    
+    try:
+        return backend_registry.call(backend, submit_plagiarism_check, content, author_email, author_name)
+    except BackendUnavailable as e:
+        print(f"❌ {e}")
+        return None
+
+def submit_plagiarism_check(content, author_email, author_name=None):
+    """Submit a check to PlagiarismCheck.org, raises BackendUnavailable when the API fails"""
     try:
-        if not app.config['USE_PLAGIARISM_CHECK_API'] or not app.config['PLAGIARISM_CHECK_API_TOKEN']:
-            print("⚠️ PlagiarismCheck.org API not configured, falling back to local check")
-            return None
-        
         # Prepare API request data
         data = {
             'group_token': app.config['PLAGIARISM_CHECK_API_TOKEN'],
@@ -856,21 +1109,18 @@ def check_plagiarism_with_api(content, author_email, author_name=None):
                     'message': 'Plagiarism check submitted successfully'
                 }
             else:
-                print(f"❌ API response error: {result}")
-                return None
+                raise BackendUnavailable(f"API response error: {result}")
         else:
-            print(f"❌ API request failed with status {response.status_code}: {response.text}")
-            return None
+            raise BackendUnavailable(f"API request failed with status {response.status_code}: {response.text}")
             
     except requests.exceptions.Timeout:
-        print("❌ PlagiarismCheck.org API request timed out")
-        return None
+        raise BackendUnavailable("PlagiarismCheck.org API request timed out")
     except requests.exceptions.RequestException as e:
-        print(f"❌ PlagiarismCheck.org API request failed: {e}")
-        return None
+        raise BackendUnavailable(f"PlagiarismCheck.org API request failed: {e}")
+    except BackendUnavailable:
+        raise
     except Exception as e:
-        print(f"❌ Unexpected error in plagiarism API check: {e}")
-        return None
+        raise BackendUnavailable(f"Unexpected error in plagiarism API check: {e}")
 
 def get_plagiarism_report(check_id):
     """Get plagiarism report from PlagiarismCheck.org API"""
@@ -897,192 +1147,851 @@ def get_plagiarism_report(check_id):
         print(f"❌ Error getting plagiarism report: {e}")
         return None
 
-def calculate_plagiarism_score(content, other_submissions):
-    """Calculate comprehensive plagiarism score using Dolos (if available) or local methods"""
+def submission_language(submission):
+    """Programming language of a code submission by its file extension, None for documents"""
+    return language_for_file(submission.file_name or submission.file_path)
+
+def fingerprint_parameters(language):
+    """(k-gram length, window size) of fingerprints for a language, or for prose when None"""
+    if language:
+        return CODE_KGRAM_LENGTH, CODE_WINDOW_SIZE
+    return DEFAULT_KGRAM_LENGTH, DEFAULT_WINDOW_SIZE
+
+def compute_submission_fingerprints(content, language, document=None):
+    """Winnowed fingerprints of code (normalized tokens) or of a document (words)"""
+    if language:
+        return compute_code_fingerprints(content, language)
+    if document is None:
+        document = preprocess_documents([content])[0]
+    return document.fingerprints()
+
+def assignment_template_texts(assignment):
+    """Texts all submissions of an assignment share: its description, instructions and attached templates"""
+    texts = [assignment.description, assignment.instructions] + [template.content for template in assignment.templates]
+    return [text for text in texts if text and text.strip()]
+
+def assignment_template_digest(assignment_id):
+    """(SHA-256 of an assignment's template texts, the texts); changes whenever a template does"""
+    assignment = Assignment.query.get(assignment_id)
+    texts = assignment_template_texts(assignment) if assignment else []
+    return hashlib.sha256('\x00'.join(texts).encode('utf-8')).hexdigest(), texts
+
+# Per process fingerprint hashes of assignment templates: (assignment id, language) -> (digest, hashes)
+template_hashes_cache = {}
+TEMPLATE_HASHES_CACHE_SIZE = 64
+
+def get_template_hashes(assignment_id, language):
+    """Digest of an assignment's template texts and the fingerprint hashes they produce for a language
+    
+    Submission fingerprints matching these hashes are dropped at index time, so shared
+    prompts and starter code neither inflate scores nor keep pairs from being pruned.
+    """
+    digest, texts = assignment_template_digest(assignment_id)
+    cached = template_hashes_cache.get((assignment_id, language))
+    if cached is not None and cached[0] == digest:
+        return cached
+    
+    hashes = set()
+    for text in texts:
+        hashes.update(fingerprint.hash for fingerprint in compute_submission_fingerprints(text, language))
+    if len(template_hashes_cache) >= TEMPLATE_HASHES_CACHE_SIZE:
+        template_hashes_cache.pop(next(iter(template_hashes_cache)))
+    template_hashes_cache[(assignment_id, language)] = (digest, hashes)
+    return digest, hashes
+
+def get_template_paragraphs(assignment_id):
+    """Paragraph SimHashes of an assignment's template texts, cached next to the template fingerprint hashes"""
+    digest, texts = assignment_template_digest(assignment_id)
+    cached = template_hashes_cache.get((assignment_id, 'paragraphs'))
+    if cached is not None and cached[0] == digest:
+        return cached[1]
+    
+    hashes = [paragraph.simhash for text in texts for paragraph in paragraph_simhashes(text)]
+    if len(template_hashes_cache) >= TEMPLATE_HASHES_CACHE_SIZE:
+        template_hashes_cache.pop(next(iter(template_hashes_cache)))
+    template_hashes_cache[(assignment_id, 'paragraphs')] = (digest, hashes)
+    return hashes
+
+def submission_content_digest(file_name, content, stream_digest=None):
+    """Digest stored in Submission.content_sha256
+    
+    Text files hash their normalized text (stream_digest, when hashed during the
+    upload, is exactly that), documents the normalized text extracted from them, so
+    a Word copy of a PDF matches too. Text too short to compare (empty files, image-only
+    PDFs) gets None, so it is never looked up. Anything text could not be extracted from
+    keeps the digest of its bytes, or None when there is none: placeholder messages must
+    never match.
+    """
+    extension = file_name.rsplit('.', 1)[-1].lower() if '.' in file_name else ''
+    if extension in TEXT_FILE_EXTENSIONS:
+        if stream_digest or not content or content == UNREADABLE_TEXT:
+            return stream_digest
+        return normalized_sha256(content)
+    if content and EXTRACTED_TEXT_MARKER.match(content):
+        return extracted_text_digest(content)
+    return stream_digest
+
+def find_duplicate_submission(submission):
+    """Earliest submission of another student to the same assignment with the same content digest, if any
+    
+    One lookup on the indexed digest column, whatever the size of the corpus. Copies
+    of work handed in for another assignment are left to the incremental check, which
+    scores them against their own assignment's peers.
+    """
+    if not submission.content_sha256:
+        return None
+    return Submission.query.filter(
+        Submission.content_sha256 == submission.content_sha256,
+        Submission.assignment_id == submission.assignment_id,
+        Submission.student_id != submission.student_id,
+        Submission.id != submission.id
+    ).order_by(Submission.id).first()
+
+def flag_duplicate_submission(submission, original):
+    """Record an identical copy: 100% on every method for both sides of the pair (caller commits)
+    
+    Identical content scores the same against every other peer as the original does,
+    so the copy needs no pairwise check of its own.
+    """
+    identical = {method: 100.0 for method in PLAGIARISM_METHODS}
+    store_plagiarism_scores(submission, identical, original, 100.0, compared=1, mode='duplicate',
+                            fragments=get_match_fragments(submission, original))
+    
+    details = json.loads(original.plagiarism_details) if original.plagiarism_details else {}
+    store_plagiarism_scores(original, identical, submission, 100.0, compared=details.get('compared', 0) + 1,
+                            mode=details.get('mode', 'incremental'), timings=details.get('timings'),
+                            content=details.get('content'), fragments=get_match_fragments(original, submission))
+    
+    merge_plagiarism_group(submission, [original], 100.0, app.config.get('PLAGIARISM_GROUP_THRESHOLD', 50.0))
+
+def index_submission_fingerprints(submission, content):
+    """Compute and store the winnowed fingerprints and term counts of a submission (caller commits)
+    
+    Code submissions are fingerprinted from their normalized token stream (identifiers
+    and literals abstracted), documents from their words. Fingerprints of the
+    assignment's templates are left out.
+    """
+    content = content or ''
+    document = preprocess_documents([content])[0]
+    language = submission_language(submission)
+    template_digest, template_hashes = get_template_hashes(submission.assignment_id, language)
+    fingerprints = [
+        fingerprint for fingerprint in compute_submission_fingerprints(content, language, document)
+        if fingerprint.hash not in template_hashes
+    ]
+    
+    record = submission.fingerprint
+    if record is None:
+        record = SubmissionFingerprint(submission_id=submission.id)
+        submission.fingerprint = record
+    
+    record.kgram_length, record.window_size = fingerprint_parameters(language)
+    record.template_digest = template_digest
+    record.fingerprint_count = len(fingerprints)
+    record.data = pack_fingerprints(fingerprints)
+    record.content_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
+    if submission.content_sha256 is None:
+        submission.content_sha256 = submission_content_digest(submission.file_name or submission.file_path, content)
+    record.text_length = len(content.strip())
+    
+    signature = minhash_signature(fingerprint.hash for fingerprint in fingerprints)
+    record.minhash = pack_signature(signature)
+    MinHashBand.query.filter_by(submission_id=submission.id).delete()
+    for band, bucket in enumerate(band_buckets(signature)):
+        db.session.add(MinHashBand(submission_id=submission.id, band=band, bucket=bucket))
+    
+    # Postings of the corpus-wide inverted index, one per distinct hash
+    hashes = {fingerprint.hash for fingerprint in fingerprints}
+    FingerprintPosting.query.filter_by(submission_id=submission.id).delete()
+    db.session.bulk_insert_mappings(FingerprintPosting, [
+        {'submission_id': submission.id, 'fingerprint_hash': fingerprint_hash} for fingerprint_hash in hashes
+    ])
+    record.posting_count = len(hashes)
+    
+    # Term counts for the assignment's TF-IDF model, only for documents the checks compare
+    previous_terms = record.term_counts
+    record.term_counts = pack_vector(term_counts([document])[0]) if record.text_length > 10 else b''
+    update_assignment_tfidf(submission.assignment_id, previous_terms, record.term_counts)
+    
+    # Structural clone index of Python files, parsed once here
+    AstSubtreeHash.query.filter_by(submission_id=submission.id).delete()
+    if language == 'python':
+        subtrees = subtree_hashes(content)
+        record.ast_subtrees = pack_subtrees(subtrees)
+        for subtree_hash in {subtree.hash for subtree in subtrees or []}:
+            db.session.add(AstSubtreeHash(assignment_id=submission.assignment_id, submission_id=submission.id,
+                                          subtree_hash=subtree_hash))
+    else:
+        record.ast_subtrees = None
+    
+    # Paragraph SimHashes of documents, leaving out paragraphs reworded from the templates
+    ParagraphSimHash.query.filter_by(submission_id=submission.id).delete()
+    paragraphs = []
+    if language is None:
+        template_paragraphs = get_template_paragraphs(submission.assignment_id)
+        paragraphs = [
+            paragraph for paragraph in paragraph_simhashes(content)
+            if not any(hamming_distance(paragraph.simhash, template) <= MAX_HAMMING_DISTANCE
+                       for template in template_paragraphs)
+        ]
+        for paragraph in paragraphs:
+            db.session.add(ParagraphSimHash(submission_id=submission.id, position=paragraph.position,
+                                            simhash=to_signed(paragraph.simhash), char_start=paragraph.char_start,
+                                            char_end=paragraph.char_end))
+    record.paragraph_count = len(paragraphs)
+    
+    record.created_at = datetime.utcnow()
+    db.session.add(record)
+    
+    return fingerprints
+
+def update_assignment_tfidf(assignment_id, previous_terms, terms):
+    """Replace a submission's term counts in its assignment's document frequencies (caller commits)"""
+    # Row locked until the caller commits, so concurrent workers don't lose each other's counts
+    model = AssignmentTfidfModel.query.filter_by(assignment_id=assignment_id).with_for_update().first()
+    if model is None:
+        model = AssignmentTfidfModel(assignment_id=assignment_id)
+    
+    frequencies = DocumentFrequencies.unpack(model.data)
+    if previous_terms:
+        frequencies.remove(unpack_vector(previous_terms))
+    if terms:
+        frequencies.add(unpack_vector(terms))
+    
+    model.document_count = frequencies.document_count
+    model.data = frequencies.pack()
+    model.updated_at = datetime.utcnow()
+    db.session.add(model)
+
+# Per process TF-IDF matrices of recently checked assignments: assignment id -> (model version, vectors)
+assignment_tfidf_cache = {}
+ASSIGNMENT_TFIDF_CACHE_SIZE = 32
+
+def load_assignment_tfidf(assignment_id):
+    """TF-IDF vectors of an assignment's indexed submissions, rebuilt only when its model changed
+    
+    Returns (document frequencies, {submission id: row}, L2 normalised matrix). The
+    document frequencies are rebuilt from the stored term counts if they drifted out
+    of sync with them (e.g. submissions indexed before the model existed).
+    """
+    from scipy.sparse import vstack
+    
+    model = AssignmentTfidfModel.query.filter_by(assignment_id=assignment_id).first()
+    version = (model.document_count, model.updated_at) if model else None
+    cached = assignment_tfidf_cache.get(assignment_id)
+    if cached is not None and version is not None and cached[0] == version:
+        return cached[1]
+    
+    stored = db.session.query(SubmissionFingerprint.submission_id, SubmissionFingerprint.term_counts).join(
+        Submission, SubmissionFingerprint.submission_id == Submission.id
+    ).filter(Submission.assignment_id == assignment_id).order_by(Submission.id).all()
+    rows = [(submission_id, unpack_vector(data)) for submission_id, data in stored if data]
+    
+    frequencies = DocumentFrequencies.unpack(model.data) if model else None
+    if frequencies is None or frequencies.document_count != len(rows):
+        frequencies = DocumentFrequencies.from_rows([row for _, row in rows])
+        if model is None:
+            model = AssignmentTfidfModel(assignment_id=assignment_id)
+            db.session.add(model)
+        model.document_count = frequencies.document_count
+        model.data = frequencies.pack()
+        model.updated_at = datetime.utcnow()
+        version = (model.document_count, model.updated_at)
+    
+    matrix = frequencies.transform(vstack([row for _, row in rows])) if rows else None
+    vectors = (frequencies, {submission_id: i for i, (submission_id, _) in enumerate(rows)}, matrix)
+    
+    if len(assignment_tfidf_cache) >= ASSIGNMENT_TFIDF_CACHE_SIZE:
+        assignment_tfidf_cache.pop(next(iter(assignment_tfidf_cache)))
+    assignment_tfidf_cache[assignment_id] = (version, vectors)
+    return vectors
+
+def get_tfidf_vectors(assignment_id, submissions, records):
+    """L2 normalised TF-IDF rows of submissions weighted by an assignment's model, no refit
+    
+    Submissions of the assignment come straight from the cached matrix, others (wider
+    scopes) are weighted with the assignment's document frequencies.
+    """
+    from scipy.sparse import vstack
+    
+    frequencies, positions, matrix = load_assignment_tfidf(assignment_id)
+    rows = []
+    for sub in submissions:
+        if sub.id in positions:
+            rows.append(matrix[positions[sub.id]])
+        else:
+            rows.append(frequencies.transform(unpack_vector(records[sub.id].term_counts)))
+    return vstack(rows).tocsr()
+
+def load_fingerprint_records(submissions, contents=None):
+    """Stored fingerprint records of submissions, indexing any that are missing or stale (caller commits)
+    
+    Returns a dict of submission id -> SubmissionFingerprint. Contents are only read
+    for submissions that need (re)indexing.
+    """
+    submission_ids = [sub.id for sub in submissions]
+    records = SubmissionFingerprint.query.filter(
+        SubmissionFingerprint.submission_id.in_(submission_ids)
+    ).all() if submission_ids else []
+    languages = {sub.id: submission_language(sub) for sub in submissions}
+    assignment_digests = {}
+    for sub in submissions:
+        if sub.assignment_id not in assignment_digests:
+            assignment_digests[sub.assignment_id] = assignment_template_digest(sub.assignment_id)[0]
+    digests = {sub.id: assignment_digests[sub.assignment_id] for sub in submissions}
+    stored = {
+        record.submission_id: record for record in records
+        if (record.kgram_length, record.window_size) == fingerprint_parameters(languages[record.submission_id])
+        and (languages[record.submission_id] != 'python' or record.ast_subtrees is not None)
+        and record.template_digest == digests[record.submission_id]
+        and record.paragraph_count is not None and record.posting_count is not None
+        and record.content_hash is not None and record.minhash is not None and record.term_counts is not None
+    }
+    
+    for i, sub in enumerate(submissions):
+        if sub.id not in stored:
+            content = contents[i] if contents is not None and contents[i] is not None else read_file_content(sub.file_path)
+            index_submission_fingerprints(sub, content)
+            stored[sub.id] = sub.fingerprint
+    
+    return stored
+
+def get_ast_subtrees(submissions, records):
+    """Stored AST subtree hashes of submissions, None for anything but parsed Python files"""
+    return [unpack_subtrees(records[sub.id].ast_subtrees) or None for sub in submissions]
+
+def find_structural_clones(submission, min_similarity=0.0, limit=10):
+    """Python submissions of the same assignment sharing AST subtrees with a submission, most similar first
+    
+    The per-assignment subtree index finds every peer sharing a subtree in one SQL
+    join; each peer is then scored with one hash join of the stored subtrees. Returns
+    dicts with the peer id, similarity (%), shared subtree count and cloned line spans.
+    """
+    from sqlalchemy import and_, func
+    from sqlalchemy.orm import aliased
+    
+    record = load_fingerprint_records([submission])[submission.id]
+    subtrees = unpack_subtrees(record.ast_subtrees)
+    if not subtrees:
+        return []
+    
+    own = aliased(AstSubtreeHash)
+    shared_counts = db.session.query(AstSubtreeHash.submission_id, func.count()).join(
+        own, and_(own.assignment_id == AstSubtreeHash.assignment_id, own.subtree_hash == AstSubtreeHash.subtree_hash)
+    ).filter(
+        own.submission_id == submission.id,
+        AstSubtreeHash.submission_id != submission.id
+    ).group_by(AstSubtreeHash.submission_id).all()
+    if not shared_counts:
+        return []
+    
+    peers = SubmissionFingerprint.query.filter(
+        SubmissionFingerprint.submission_id.in_([submission_id for submission_id, _ in shared_counts])
+    ).all()
+    peer_subtrees = {peer.submission_id: unpack_subtrees(peer.ast_subtrees) for peer in peers}
+    
+    clones = []
+    for submission_id, count in shared_counts:
+        similarity = clone_similarity(subtrees, peer_subtrees.get(submission_id, [])) * 100
+        if similarity >= min_similarity:
+            clones.append({
+                'submission_id': submission_id,
+                'similarity': round(similarity, 2),
+                'shared_subtrees': count,
+                'regions': clone_regions(subtrees, peer_subtrees[submission_id])
+            })
+    clones.sort(key=lambda clone: -clone['similarity'])
+    return clones[:limit]
+
+def index_missing_fingerprints(limit=200):
+    """Index submissions uploaded before fingerprints and MinHash bands were stored"""
+    from sqlalchemy import and_, or_
+    
+    with app.app_context():
+        # Code records indexed with prose parameters are refreshed lazily by load_fingerprint_records
+        current = db.session.query(SubmissionFingerprint.submission_id).filter(
+            or_(*[
+                and_(SubmissionFingerprint.kgram_length == k, SubmissionFingerprint.window_size == w)
+                for k, w in [(DEFAULT_KGRAM_LENGTH, DEFAULT_WINDOW_SIZE), (CODE_KGRAM_LENGTH, CODE_WINDOW_SIZE)]
+            ]),
+            SubmissionFingerprint.content_hash.isnot(None),
+            SubmissionFingerprint.paragraph_count.isnot(None),
+            SubmissionFingerprint.posting_count.isnot(None),
+            SubmissionFingerprint.minhash.isnot(None),
+            SubmissionFingerprint.term_counts.isnot(None)
+        )
+        submissions = Submission.query.filter(~Submission.id.in_(current)).limit(limit).all()
+        if not submissions:
+            return 0
+        
+        try:
+            load_fingerprint_records(submissions)
+            db.session.commit()
+            print(f"🔄 Indexed fingerprints of {len(submissions)} submissions")
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Fingerprint backfill failed: {e}")
+        return len(submissions)
+
+# Comparison scopes, from narrowest to widest ('all' includes previous terms)
+PLAGIARISM_SCOPES = ['assignment', 'course', 'class', 'all']
+
+def filter_by_scope(query, submission, scope):
+    """Restrict a query over Submission to the submissions within a scope of a given submission"""
+    if scope == 'assignment':
+        query = query.filter(Submission.assignment_id == submission.assignment_id)
+    elif scope == 'course':
+        query = query.join(Assignment, Submission.assignment_id == Assignment.id).filter(
+            Assignment.course_id == submission.assignment.course_id
+        )
+    elif scope == 'class':
+        query = query.join(Assignment, Submission.assignment_id == Assignment.id).join(
+            Course, Assignment.course_id == Course.id
+        ).filter(Course.class_id == submission.assignment.course.class_id)
+    return query
+
+def find_candidate_submissions(submission, scope='all'):
+    """Likely near-duplicates of a submission within a scope, from the MinHash LSH bands
+    
+    Only submissions sharing at least one band bucket are returned, so the cost
+    grows with the number of candidates rather than with the size of the corpus.
+    """
+    from sqlalchemy import and_, or_
+    
+    record = load_fingerprint_records([submission])[submission.id]
+    buckets = band_buckets(unpack_signature(record.minhash))
+    if not buckets:
+        return []
+    
+    matching = db.session.query(MinHashBand.submission_id).filter(
+        or_(*[and_(MinHashBand.band == band, MinHashBand.bucket == bucket) for band, bucket in enumerate(buckets)])
+    )
+    query = Submission.query.filter(Submission.id.in_(matching), Submission.id != submission.id)
+    return filter_by_scope(query, submission, scope).order_by(Submission.id).all()
+
+def find_similar_submissions(submission, k=5, scope='assignment'):
+    """The k submissions within a scope sharing the most fingerprints with a submission, best first
+    
+    Served from the fingerprint postings: one grouped self-join counts the hashes each
+    peer shares with the submission, so only peers with at least one shared hash are
+    touched and none is scored pair by pair. Returns (Submission, similarity %, shared
+    hashes) tuples.
+    """
+    from sqlalchemy import func
+    from sqlalchemy.orm import aliased
+    
+    record = load_fingerprint_records([submission])[submission.id]
+    if not record.posting_count:
+        return []
+    
+    own = aliased(FingerprintPosting)
+    query = db.session.query(
+        FingerprintPosting.submission_id, SubmissionFingerprint.posting_count, func.count()
+    ).join(
+        own, own.fingerprint_hash == FingerprintPosting.fingerprint_hash
+    ).join(
+        Submission, Submission.id == FingerprintPosting.submission_id
+    ).join(
+        SubmissionFingerprint, SubmissionFingerprint.submission_id == FingerprintPosting.submission_id
+    ).filter(
+        own.submission_id == submission.id,
+        FingerprintPosting.submission_id != submission.id
+    )
+    rows = filter_by_scope(query, submission, scope).group_by(
+        FingerprintPosting.submission_id, SubmissionFingerprint.posting_count
+    ).all()
+    
+    shared = {submission_id: count for submission_id, _, count in rows}
+    sizes = {submission_id: posting_count or 0 for submission_id, posting_count, _ in rows}
+    best = top_k_by_shared(record.posting_count, shared, sizes, k)
+    peers = {peer.id: peer for peer in Submission.query.filter(Submission.id.in_([peer_id for peer_id, _, _ in best]))}
+    return [(peers[peer_id], round(similarity * 100, 2), count) for peer_id, similarity, count in best]
+
+# Per process SimHash index of every stored paragraph, labelled with ParagraphSimHash ids
+paragraph_index = {'index': None, 'rows': 0, 'last_id': 0}
+paragraph_index_lock = threading.Lock()
+
+def get_paragraph_index():
+    """The corpus paragraph index, extended with the rows stored since the last call
+    
+    Re-indexing a submission deletes its rows and inserts new ones, so rows are only
+    ever appended by id; when the row count no longer adds up, rows were deleted and
+    the index is rebuilt from scratch.
+    """
+    from sqlalchemy import func
+    
+    with paragraph_index_lock:
+        count, last_id = db.session.query(func.count(ParagraphSimHash.id), func.max(ParagraphSimHash.id)).one()
+        last_id = last_id or 0
+        if paragraph_index['index'] is not None and count == paragraph_index['rows'] and last_id == paragraph_index['last_id']:
+            return paragraph_index['index']
+        
+        rows = db.session.query(ParagraphSimHash.id, ParagraphSimHash.simhash).filter(
+            ParagraphSimHash.id > paragraph_index['last_id']
+        ).order_by(ParagraphSimHash.id).all()
+        if paragraph_index['index'] is None or paragraph_index['rows'] + len(rows) != count:
+            rows = db.session.query(ParagraphSimHash.id, ParagraphSimHash.simhash).order_by(ParagraphSimHash.id).all()
+            paragraph_index['index'] = SimHashIndex()
+            paragraph_index['rows'] = 0
+        
+        paragraph_index['index'].add([to_unsigned(simhash) for _, simhash in rows], [row_id for row_id, _ in rows])
+        paragraph_index['rows'] += len(rows)
+        paragraph_index['last_id'] = last_id
+        return paragraph_index['index']
+
+def find_paragraph_matches(submission, scope='all', max_distance=MAX_HAMMING_DISTANCE, limit=50):
+    """Paragraphs of other submissions within a few SimHash bits of a submission's paragraphs
+    
+    Each of the submission's paragraphs is looked up in the corpus index, so the cost
+    does not grow with the number of stored submissions. Returns dicts naming the
+    paragraph that triggered the match, the peer submission and paragraph, and the
+    Hamming distance; ordered by paragraph, closest first.
+    """
+    load_fingerprint_records([submission])
+    own = ParagraphSimHash.query.filter_by(submission_id=submission.id).order_by(ParagraphSimHash.position).all()
+    if not own:
+        return []
+    
+    index = get_paragraph_index()
+    hits = {}
+    for paragraph in own:
+        for row_id, distance in index.query(to_unsigned(paragraph.simhash), max_distance):
+            hits.setdefault(row_id, []).append((paragraph, distance))
+    if not hits:
+        return []
+    
+    peers = ParagraphSimHash.query.filter(
+        ParagraphSimHash.id.in_(list(hits)),
+        ParagraphSimHash.submission_id != submission.id
+    ).all()
+    in_scope = {
+        submission_id for submission_id, in filter_by_scope(
+            db.session.query(Submission.id).filter(Submission.id.in_({peer.submission_id for peer in peers})),
+            submission, scope
+        )
+    } if peers else set()
+    
+    matches = [
+        {
+            'paragraph': paragraph.position,
+            'char_start': paragraph.char_start,
+            'char_end': paragraph.char_end,
+            'submission_id': peer.submission_id,
+            'peer_paragraph': peer.position,
+            'peer_char_start': peer.char_start,
+            'peer_char_end': peer.char_end,
+            'distance': distance
+        }
+        for peer in peers if peer.submission_id in in_scope
+        for paragraph, distance in hits[peer.id]
+    ]
+    matches.sort(key=lambda match: (match['paragraph'], match['distance'], match['submission_id'], match['peer_paragraph']))
+    return matches[:limit]
+
+def get_comparison_submissions(submission, scope='assignment'):
+    """Submissions to check a submission against
+    
+    Always every other submission of the same assignment; wider scopes add only the
+    LSH candidates found outside the assignment.
+    """
+    peers = Submission.query.filter(
+        Submission.assignment_id == submission.assignment_id,
+        Submission.id != submission.id
+    ).all()
+    
+    if scope != 'assignment':
+        seen = {peer.id for peer in peers}
+        peers += [candidate for candidate in find_candidate_submissions(submission, scope) if candidate.id not in seen]
+    
+    return peers
+
+def calculate_dolos_plagiarism_score(content, other_submissions):
+    """Dolos score of content against other submissions, None when there is nothing for Dolos to compare"""
+    # Prepare submissions for Dolos analysis
+    submissions = [{"id": "current", "content": content}]
+    for i, sub in enumerate(other_submissions):
+        if hasattr(sub, 'content') and sub.content and len(sub.content.strip()) > 10:
+            submissions.append({"id": f"sub_{i}", "content": sub.content})
+    
+    if len(submissions) < 2:
+        return None
+    
+    # Run Dolos analysis
+    dolos_results = dolos_integration.analyze_submissions(submissions)
+    if "error" in dolos_results or "plagiarism_scores" not in dolos_results:
+        raise BackendUnavailable(dolos_results.get('error', 'Unknown error'))
+    
+    # Extract score for current submission
+    current_score = dolos_results["plagiarism_scores"].get("current", 0.0)
+    print(f"🔍 Dolos analysis completed - Score: {current_score}%")
+    return round(current_score, 2)
+
+def calculate_plagiarism_score(content, other_submissions, file_name=None, assignment_id=None):
+    """Calculate comprehensive plagiarism score using Dolos (if available) or local methods
+    
+    Backends are tried in the registry's order for the file's type (Dolos for
+    code); one that is unhealthy or failing is skipped without being called.
+    The local engine weights TF-IDF by assignment_id's model when given.
+    """
     if not other_submissions or not content:
         return 0.0
     
-    # Try Dolos integration first (for code submissions)
-    if dolos_integration and dolos_integration.is_available():
+    for backend in backend_registry.route('peer', file_name):
+        if backend.name == 'local':
+            break
         try:
-            # Prepare submissions for Dolos analysis
-            submissions = [{"id": "current", "content": content}]
-            for i, sub in enumerate(other_submissions):
-                if hasattr(sub, 'content') and sub.content and len(sub.content.strip()) > 10:
-                    submissions.append({"id": f"sub_{i}", "content": sub.content})
-            
-            if len(submissions) >= 2:
-                # Run Dolos analysis
-                dolos_results = dolos_integration.analyze_submissions(submissions)
-                
-                if "error" not in dolos_results and "plagiarism_scores" in dolos_results:
-                    # Extract score for current submission
-                    current_score = dolos_results["plagiarism_scores"].get("current", 0.0)
-                    print(f"🔍 Dolos analysis completed - Score: {current_score}%")
-                    return round(current_score, 2)
-                else:
-                    print(f"⚠️ Dolos analysis failed: {dolos_results.get('error', 'Unknown error')}")
-                    print("🔄 Falling back to local plagiarism detection...")
+            score = backend_registry.call(backend, PEER_SCORERS[backend.name], content, other_submissions)
         except Exception as e:
-            print(f"⚠️ Dolos integration error: {e}")
+            print(f"⚠️ {backend.name} analysis failed: {e}")
             print("🔄 Falling back to local plagiarism detection...")
+            continue
+        if score is not None:
+            return score
     
-    # Fallback to local comprehensive plagiarism detection
-    return calculate_local_plagiarism_score(content, other_submissions)
+    # Local comprehensive plagiarism detection, always available
+    return backend_registry.call(backend_registry.get('local'), calculate_local_plagiarism_score, content, other_submissions,
+                                 assignment_id=assignment_id)
+
+# Methods combined by the local engine, in reporting order
+PLAGIARISM_METHODS = ['tfidf', 'semantic', 'fingerprint', 'phrase', 'structure']
+
+# Bump whenever a method changes, memoized pair scores of older versions are ignored
+PLAGIARISM_ENGINE_VERSION = (
+    f'local-3-k{DEFAULT_KGRAM_LENGTH}-w{DEFAULT_WINDOW_SIZE}-code-k{CODE_KGRAM_LENGTH}-w{CODE_WINDOW_SIZE}'
+)
+
+def get_plagiarism_weights(tfidf_score):
+    """Weights for combining method scores based on method reliability"""
+    # If TF-IDF fails (returns 0), redistribute weights to other methods
+    if tfidf_score < 1.0:  # TF-IDF failed or very low
+        return {
+            'tfidf': 0.0,
+            'semantic': 0.35,
+            'fingerprint': 0.3,
+            'phrase': 0.2,
+            'structure': 0.15
+        }
+    return {
+        'tfidf': 0.3,
+        'semantic': 0.25,
+        'fingerprint': 0.2,
+        'phrase': 0.15,
+        'structure': 0.1
+    }
 
-def calculate_local_plagiarism_score(content, other_submissions):
+def combine_plagiarism_scores(scores):
+    """Weighted overall score from per-method scores, returns (score, weights)"""
+    weights = get_plagiarism_weights(scores['tfidf'])
+    final_score = (
+        scores['tfidf'] * weights['tfidf'] +
+        scores['semantic'] * weights['semantic'] +
+        scores['fingerprint'] * weights['fingerprint'] +
+        scores['phrase'] * weights['phrase'] +
+        scores['structure'] * weights['structure']
+    )
+    return final_score, weights
+
+def calculate_local_plagiarism_score(content, other_submissions, content_fingerprints=None, assignment_id=None,
+                                     content_subtrees=None):
     """Calculate comprehensive plagiarism score using multiple local methods"""
     if not other_submissions or not content:
         return 0.0
     
+    try:
+        result = calculate_local_plagiarism_result(content, other_submissions, content_fingerprints,
+                                                   assignment_id=assignment_id, content_subtrees=content_subtrees)
+        return result.score if result else 0.0
+        
+    except Exception as e:
+        print(f"Error in comprehensive plagiarism calculation: {e}")
+        return calculate_simple_similarity(content, other_submissions)
+
+# Scorers of the external peer backends, by registry name
+PEER_SCORERS = {'dolos': calculate_dolos_plagiarism_score}
+
+def calculate_local_plagiarism_result(content, other_submissions, content_fingerprints=None, profile=None,
+                                      assignment_id=None, content_subtrees=None):
+    """Structured result of the local methods, None when there is nothing to compare
+    
+    TF-IDF is weighted by the document frequencies of assignment_id's incremental
+    model when given, as in the memoized and assignment checks, otherwise by those
+    of the compared documents. Structure compares Python files as AST clones when
+    content_subtrees and the peers' subtrees attribute hold their stored subtrees.
+    
+    The best match is the peer with the highest weighted score (its id when the peers
+    have one), with the fragments copied from it. Stage metrics go to profile (a new CheckProfile
+    when None), which is finished and recorded in the engine histograms.
+    """
+    if not other_submissions or not content:
+        return None
+    
+    profile = profile or CheckProfile()
+    try:
+        frequencies = load_assignment_tfidf(assignment_id)[0] if assignment_id is not None else None
+        return local_plagiarism_result(content, other_submissions, content_fingerprints, profile, frequencies,
+                                       content_subtrees)
+    finally:
+        profile.finish()
+        plagiarism_metrics.record(profile)
+
+def local_plagiarism_result(content, other_submissions, content_fingerprints, profile, frequencies=None,
+                            content_subtrees=None):
+    """Body of calculate_local_plagiarism_result, stages measured into profile"""
     # Prepare documents - filter out empty or invalid content
     documents = [content]
+    fingerprints = [content_fingerprints]
+    subtrees = [content_subtrees]
+    compared = []
     for sub in other_submissions:
         if hasattr(sub, 'content') and sub.content and len(sub.content.strip()) > 10:
             documents.append(sub.content)
+            fingerprints.append(getattr(sub, 'fingerprints', None))
+            subtrees.append(getattr(sub, 'subtrees', None))
+            compared.append(sub)
     
     if len(documents) < 2:
-        return 0.0
+        return None
     
-    try:
-        # Method 1: Enhanced TF-IDF with multiple n-grams
-        tfidf_score = calculate_tfidf_similarity(documents)
-        
-        # Method 2: Semantic similarity using word contexts
-        semantic_score = calculate_semantic_similarity(documents)
-        
-        # Method 3: Content fingerprinting
-        fingerprint_score = calculate_fingerprint_similarity(documents)
-        
-        # Method 4: Phrase matching
-        phrase_score = calculate_phrase_similarity(documents)
-        
-        # Method 5: Structure similarity
-        structure_score = calculate_structure_similarity(documents)
-        
-        # Dynamic weighting based on method reliability
-        scores = {
-            'tfidf': tfidf_score,
-            'semantic': semantic_score,
-            'fingerprint': fingerprint_score,
-            'phrase': phrase_score,
-            'structure': structure_score
-        }
-        
-        # If TF-IDF fails (returns 0), redistribute weights to other methods
-        if tfidf_score < 1.0:  # TF-IDF failed or very low
-            print(f"⚠️ TF-IDF failed ({tfidf_score}%), using other methods")
-            weights = {
-                'tfidf': 0.0,
-                'semantic': 0.35,
-                'fingerprint': 0.3,
-                'phrase': 0.2,
-                'structure': 0.15
-            }
-        else:
-            weights = {
-                'tfidf': 0.3,
-                'semantic': 0.25,
-                'fingerprint': 0.2,
-                'phrase': 0.15,
-                'structure': 0.1
-            }
-        
-        final_score = (
-            scores['tfidf'] * weights['tfidf'] +
-            scores['semantic'] * weights['semantic'] +
-            scores['fingerprint'] * weights['fingerprint'] +
-            scores['phrase'] * weights['phrase'] +
-            scores['structure'] * weights['structure']
+    # Tokenize every document once, all methods share the result
+    with profile.measure(PREPROCESS):
+        documents = preprocess_documents(documents)
+    profile.count(PREPROCESS, tokens=sum(len(doc) for doc in documents))
+    match = None
+    match_score = 0.0
+    fragments = []
+    
+    if app.config.get('PLAGIARISM_CASCADE', True):
+        # Cheap methods first, expensive ones only where they can still raise the maximum
+        scores, cascade_stats = calculate_cascade_scores(
+            documents, fingerprints, app.config.get('PLAGIARISM_CASCADE_MIN_FINGERPRINT', 0.0), profile, frequencies,
+            subtrees
         )
-        
-        # Debug output
-        print(f"🔍 Individual scores: TF-IDF={tfidf_score:.1f}%, Semantic={semantic_score:.1f}%, Fingerprint={fingerprint_score:.1f}%, Phrase={phrase_score:.1f}%, Structure={structure_score:.1f}%")
-        print(f"🔍 Weights: TF-IDF={weights['tfidf']}, Semantic={weights['semantic']}, Fingerprint={weights['fingerprint']}, Phrase={weights['phrase']}, Structure={weights['structure']}")
-        
-        print(f"🔍 Local plagiarism analysis completed - Score: {final_score}%")
-        return round(final_score, 2)
-        
-    except Exception as e:
-        print(f"Error in comprehensive plagiarism calculation: {e}")
-        return calculate_simple_similarity(content, other_submissions)
+        timings = cascade_stats.pop('timings')
+        if cascade_stats['best_peer'] is not None:
+            closest = cascade_stats['best_peer'] + 1
+            match = compared[closest - 1]
+            match_score = cascade_stats['best_score']
+            fragments = fragment_ranges(build_fragments(
+                fingerprints[0] if fingerprints[0] is not None else documents[0].fingerprints(),
+                fingerprints[closest] if fingerprints[closest] is not None else documents[closest].fingerprints()
+            ))
+        print(f"🔍 Cascade: {cascade_stats}")
+    else:
+        methods = {
+            # Method 1: Enhanced TF-IDF with multiple n-grams
+            'tfidf': lambda docs: calculate_tfidf_similarity(docs, frequencies),
+            # Method 2: Semantic similarity using word contexts
+            'semantic': calculate_semantic_similarity,
+            # Method 3: Content fingerprinting (stored fingerprints, no re-hashing)
+            'fingerprint': lambda docs: calculate_fingerprint_similarity(docs, fingerprints),
+            # Method 4: Phrase matching
+            'phrase': calculate_phrase_similarity,
+            # Method 5: Structure similarity
+            'structure': lambda docs: calculate_structure_similarity(docs, subtrees)
+        }
+        scores = {}
+        tokens = sum(len(doc) for doc in documents)
+        for method, calculate in methods.items():
+            with profile.measure(method):
+                scores[method] = calculate(documents)
+            profile.count(method, tokens=tokens, compared=len(compared))
+        timings = profile.timings(PLAGIARISM_METHODS)
+    
+    # Dynamic weighting based on method reliability
+    if scores['tfidf'] < 1.0:
+        print(f"⚠️ TF-IDF failed ({scores['tfidf']}%), using other methods")
+    result = build_plagiarism_result(scores, match_id=getattr(match, 'id', None), match_score=match_score,
+                                     compared=len(compared), mode='local', timings=timings, document=documents[0], fragments=fragments)
+    weights = result.weights
+    
+    # Debug output
+    print(f"🔍 Individual scores: TF-IDF={scores['tfidf']:.1f}%, Semantic={scores['semantic']:.1f}%, Fingerprint={scores['fingerprint']:.1f}%, Phrase={scores['phrase']:.1f}%, Structure={scores['structure']:.1f}%")
+    print(f"🔍 Weights: TF-IDF={weights['tfidf']}, Semantic={weights['semantic']}, Fingerprint={weights['fingerprint']}, Phrase={weights['phrase']}, Structure={weights['structure']}")
+    
+    print(f"🔍 Local plagiarism analysis completed - Score: {result.score}%")
+    return result
 
-def calculate_tfidf_similarity(documents):
-    """Enhanced TF-IDF similarity calculation"""
+def build_tfidf_matrix(documents, frequencies=None):
+    """TF-IDF of preprocessed documents, rows are L2 normalised (None if no features)
+    
+    Same definition as the stored vectors of the incremental model: hashed term
+    counts weighted by frequencies (an assignment's DocumentFrequencies), or by the
+    document frequencies of these documents when None.
+    """
+    counts = term_counts(documents)
+    if counts.nnz == 0:
+        # Every document consisted of stop words only
+        return None
+    if frequencies is None:
+        frequencies = DocumentFrequencies.from_rows([counts[i] for i in range(counts.shape[0])])
+    return frequencies.transform(counts)
+
+def tfidf_peer_similarities(documents, frequencies=None):
+    """TF-IDF cosine similarity (0-1) of the first document to each of the others
+    
+    Documents of 10 characters or less score 0. None when no document has any
+    feature (stop words only).
+    """
+    documents = preprocess_documents(documents)
+    valid = [i for i, doc in enumerate(documents) if doc.text and len(doc.text.strip()) > 10]
+    similarities = np.zeros(max(len(documents) - 1, 0))
+    if len(valid) < 2 or valid[0] != 0:
+        return similarities
+    
+    tfidf_matrix = build_tfidf_matrix([documents[i] for i in valid], frequencies)
+    if tfidf_matrix is None:
+        return None
+    # Rows are L2 normalised, cosine similarity is their dot product
+    similarities[np.array(valid[1:]) - 1] = (tfidf_matrix[1:] @ tfidf_matrix[0].T).toarray().ravel()
+    return similarities
+
+def calculate_tfidf_similarity(documents, frequencies=None):
+    """Enhanced TF-IDF similarity calculation, see build_tfidf_matrix for frequencies"""
     try:
-        from sklearn.feature_extraction.text import TfidfVectorizer
-        from sklearn.metrics.pairwise import cosine_similarity
-        import numpy as np
-        
-        # Filter out empty documents
-        valid_docs = [doc for doc in documents if doc and len(doc.strip()) > 10]
-        if len(valid_docs) < 2:
-            return 0.0
-        
-        # Create enhanced TF-IDF vectorizer with more lenient parameters
-        vectorizer = TfidfVectorizer(
-            stop_words='english',
-            ngram_range=(1, 3),  # Use 1-3 word combinations (more lenient)
-            max_features=1000,   # Reduced for better performance
-            lowercase=True,
-            strip_accents='unicode',
-            min_df=1,           # Allow single occurrence
-            max_df=1.0          # Allow all terms
-        )
-        
-        # Fit and transform documents
-        tfidf_matrix = vectorizer.fit_transform(valid_docs)
+        documents = preprocess_documents(documents)
+        similarities = tfidf_peer_similarities(documents, frequencies)
         
         # Check if we have valid features
-        if tfidf_matrix.shape[1] == 0:
+        if similarities is None:
             print("⚠️ TF-IDF: No valid features found, falling back to simple similarity")
-            return calculate_simple_similarity(valid_docs[0], valid_docs[1:])
-        
-        # Calculate cosine similarity between first document and all others
-        similarities = cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:])
+            valid_docs = [doc for doc in documents if doc.text and len(doc.text.strip()) > 10]
+            return calculate_simple_similarity(valid_docs[0].text, [doc.text for doc in valid_docs[1:]])
         
         # Get maximum similarity score
-        max_similarity = np.max(similarities) if similarities.size > 0 else 0.0
-        
-        return max_similarity * 100
+        return float(similarities.max()) * 100 if similarities.size > 0 else 0.0
         
     except Exception as e:
         print(f"⚠️ TF-IDF calculation error: {e}")
         # Fallback to simple similarity
         if len(documents) >= 2:
-            return calculate_simple_similarity(documents[0], documents[1:])
+            texts = [getattr(doc, 'text', doc) for doc in documents]
+            return calculate_simple_similarity(texts[0], texts[1:])
         return 0.0
 
+def get_semantic_contexts(doc, window_size=3):
+    """Get word contexts for semantic analysis (sparse word x context counts)"""
+    return doc.context_matrix(window_size=window_size, min_length=3)
+
+def semantic_upper_bound(main_contexts, other_contexts):
+    """Upper bound of semantic_pair_similarity from context sizes alone, without comparing contexts"""
+    import numpy as np
+    
+    main_rows, other_rows = shared_rows(main_contexts, other_contexts)
+    if len(main_rows) == 0:
+        return 0.0
+    
+    # Multiset intersection <= smaller context, union >= larger context
+    main_sizes, other_sizes = main_contexts.sizes[main_rows], other_contexts.sizes[other_rows]
+    smaller = np.minimum(main_sizes, other_sizes)
+    larger = np.maximum(main_sizes, other_sizes)
+    ratios = np.divide(smaller, larger, out=np.zeros(len(main_rows)), where=larger > 0)
+    return float(ratios.sum()) / len(main_rows)
+
 def calculate_semantic_similarity(documents):
     """Calculate semantic similarity using word frequency and context"""
     try:
-        import re
-        from collections import Counter
-        
-        def preprocess_text(text):
-            # Clean and tokenize text
-            text = re.sub(r'[^\w\s]', ' ', text.lower())
-            words = text.split()
-            return [word for word in words if len(word) > 2]
-        
-        def get_word_contexts(text, window_size=3):
-            """Get word contexts for semantic analysis"""
-            words = preprocess_text(text)
-            contexts = {}
-            for i, word in enumerate(words):
-                start = max(0, i - window_size)
-                end = min(len(words), i + window_size + 1)
-                context = words[start:end]
-                if word not in contexts:
-                    contexts[word] = []
-                contexts[word].extend(context)
-            return contexts
-        
         # Get contexts for all documents
-        all_contexts = []
-        for doc in documents:
-            contexts = get_word_contexts(doc)
-            all_contexts.append(contexts)
+        all_contexts = [get_semantic_contexts(doc) for doc in preprocess_documents(documents)]
         
         # Calculate semantic overlap
         if len(all_contexts) < 2:
@@ -1092,26 +2001,7 @@ def calculate_semantic_similarity(documents):
         max_similarity = 0.0
         
         for other_contexts in all_contexts[1:]:
-            similarity = 0.0
-            total_words = 0
-            
-            for word, contexts in main_contexts.items():
-                if word in other_contexts:
-                    # Calculate context similarity
-                    main_context_counter = Counter(contexts)
-                    other_context_counter = Counter(other_contexts[word])
-                    
-                    # Jaccard similarity of contexts
-                    intersection = sum((main_context_counter & other_context_counter).values())
-                    union = sum((main_context_counter | other_context_counter).values())
-                    
-                    if union > 0:
-                        similarity += intersection / union
-                    total_words += 1
-            
-            if total_words > 0:
-                avg_similarity = similarity / total_words
-                max_similarity = max(max_similarity, avg_similarity)
+            max_similarity = max(max_similarity, semantic_pair_similarity(main_contexts, other_contexts))
         
         return max_similarity * 100
         
@@ -1119,48 +2009,27 @@ def calculate_semantic_similarity(documents):
         print(f"Semantic similarity error: {e}")
         return 0.0
 
-def calculate_fingerprint_similarity(documents):
-    """Calculate similarity using content fingerprinting"""
+def calculate_fingerprint_similarity(documents, fingerprints=None):
+    """Calculate similarity using winnowed content fingerprints"""
     try:
-        import hashlib
-        import re
-        
-        def create_fingerprint(text, n=5):
-            """Create content fingerprint using n-grams"""
-            # Clean text
-            text = re.sub(r'[^\w\s]', ' ', text.lower())
-            words = text.split()
-            
-            # Create n-grams
-            ngrams = []
-            for i in range(len(words) - n + 1):
-                ngram = ' '.join(words[i:i+n])
-                ngrams.append(ngram)
-            
-            # Hash n-grams
-            fingerprints = set()
-            for ngram in ngrams:
-                fingerprint = hashlib.md5(ngram.encode()).hexdigest()
-                fingerprints.add(fingerprint)
-            
-            return fingerprints
-        
         if len(documents) < 2:
             return 0.0
         
-        main_fingerprints = create_fingerprint(documents[0])
-        max_similarity = 0.0
+        # Use stored fingerprints where available, only hash documents that have none
+        if fingerprints is None:
+            fingerprints = [None] * len(documents)
+        documents = preprocess_documents(documents)
+        fingerprints = [
+            doc_fingerprints if doc_fingerprints is not None else doc.fingerprints()
+            for doc, doc_fingerprints in zip(documents, fingerprints)
+        ]
         
-        for doc in documents[1:]:
-            other_fingerprints = create_fingerprint(doc)
-            
-            # Calculate Jaccard similarity
-            intersection = len(main_fingerprints & other_fingerprints)
-            union = len(main_fingerprints | other_fingerprints)
-            
-            if union > 0:
-                similarity = intersection / union
-                max_similarity = max(max_similarity, similarity)
+        index = FingerprintIndex()
+        for i, doc_fingerprints in enumerate(fingerprints[1:], start=1):
+            index.add(i, doc_fingerprints)
+        
+        # Jaccard similarity against the best matching document
+        _, max_similarity = index.max_similarity(fingerprints[0])
         
         return max_similarity * 100
         
@@ -1168,43 +2037,33 @@ def calculate_fingerprint_similarity(documents):
         print(f"Fingerprint similarity error: {e}")
         return 0.0
 
+def extract_phrases(doc, min_length=3, max_length=8):
+    """Extract meaningful phrases from text (multiset of rolling n-gram hashes)"""
+    return doc.phrase_counts(min_length=min_length, max_length=max_length)
+
+def count_phrases(token_count, min_length=3, max_length=8):
+    """Number of phrase occurrences extract_phrases yields for a document of token_count tokens"""
+    return sum(token_count - length + 1 for length in range(min_length, min(max_length + 1, token_count + 1)))
+
+def phrase_upper_bound(main_count, other_count):
+    """Upper bound of phrase_pair_similarity from the phrase counts (length ratio) alone"""
+    # Common occurrences <= smaller count, all occurrences >= larger count
+    if max(main_count, other_count) == 0:
+        return 0.0
+    return min(main_count, other_count) / max(main_count, other_count)
+
 def calculate_phrase_similarity(documents):
     """Calculate similarity based on common phrases"""
     try:
-        import re
-        from collections import Counter
-        
-        def extract_phrases(text, min_length=3, max_length=8):
-            """Extract meaningful phrases from text"""
-            # Clean text
-            text = re.sub(r'[^\w\s]', ' ', text.lower())
-            words = text.split()
-            
-            phrases = []
-            for length in range(min_length, min(max_length + 1, len(words) + 1)):
-                for i in range(len(words) - length + 1):
-                    phrase = ' '.join(words[i:i+length])
-                    if len(phrase.strip()) > 0:
-                        phrases.append(phrase)
-            
-            return Counter(phrases)
-        
         if len(documents) < 2:
             return 0.0
         
+        documents = preprocess_documents(documents)
         main_phrases = extract_phrases(documents[0])
         max_similarity = 0.0
         
         for doc in documents[1:]:
-            other_phrases = extract_phrases(doc)
-            
-            # Calculate phrase overlap
-            common_phrases = main_phrases & other_phrases
-            total_phrases = main_phrases | other_phrases
-            
-            if len(total_phrases) > 0:
-                similarity = sum(common_phrases.values()) / sum(total_phrases.values())
-                max_similarity = max(max_similarity, similarity)
+            max_similarity = max(max_similarity, phrase_pair_similarity(main_phrases, extract_phrases(doc)))
         
         return max_similarity * 100
         
@@ -1212,157 +2071,960 @@ def calculate_phrase_similarity(documents):
         print(f"Phrase similarity error: {e}")
         return 0.0
 
-def calculate_structure_similarity(documents):
-    """Calculate similarity based on document structure"""
+def analyze_structure(doc):
+    """Analyze document structure"""
+    structure = {
+        'paragraphs': doc.paragraph_count,
+        'sentences': doc.sentence_count,
+        'words': doc.word_count,
+        'avg_sentence_length': 0,
+        'avg_paragraph_length': 0
+    }
+    
+    if structure['sentences'] > 0:
+        structure['avg_sentence_length'] = structure['words'] / structure['sentences']
+    
+    if structure['paragraphs'] > 0:
+        structure['avg_paragraph_length'] = structure['words'] / structure['paragraphs']
+    
+    return structure
+
+def structure_peer_similarities(main, peers, subtrees=None):
+    """Structural similarity (0-1) of main to each peer, AST clone similarity where both have subtrees"""
+    if subtrees is None:
+        subtrees = [None] * (len(peers) + 1)
+    main_structure = analyze_structure(main)
+    return [
+        clone_similarity(subtrees[0], peer_subtrees) if subtrees[0] and peer_subtrees
+        else structure_pair_similarity(main_structure, analyze_structure(peer))
+        for peer, peer_subtrees in zip(peers, subtrees[1:])
+    ]
+
+def calculate_structure_similarity(documents, subtrees=None):
+    """Calculate similarity based on document structure
+    
+    subtrees, when given, holds the stored AST subtrees of each document (None for
+    anything but parsed Python files); Python pairs are compared as AST clones.
+    """
+    try:
+        if len(documents) < 2:
+            return 0.0
+        
+        documents = preprocess_documents(documents)
+        max_similarity = max(structure_peer_similarities(documents[0], documents[1:], subtrees), default=0.0)
+        
+        return max_similarity * 100
+        
+    except Exception as e:
+        print(f"Structure similarity error: {e}")
+        return 0.0
+
+def calculate_cascade_scores(documents, fingerprints=None, min_fingerprint=0.0, profile=None, frequencies=None,
+                             subtrees=None):
+    """Per-method scores (0-100) of the first document against the others, cheapest signals first
+    
+    TF-IDF, fingerprints and structure are computed for every peer. Peers are then
+    visited from the most to the least fingerprint-similar, and the expensive semantic
+    and phrase methods only run on peers whose upper bound exceeds the maximum found
+    so far; exact duplicates settle both at once. The maxima are therefore the same as
+    running every method on every peer. With min_fingerprint > 0, peers below that
+    fingerprint similarity (%) skip the expensive methods entirely (approximate).
+    TF-IDF is weighted by frequencies when given, see build_tfidf_matrix. Structure
+    compares Python files with stored subtrees as AST clones, see calculate_structure_similarity.
+    
+    Returns (scores, stats); stats include per-method timings in milliseconds, the
+    index of the peer with the highest weighted score (the best match, chosen as in
+    the matrix and memoized checks) and that score. Stage metrics also go to profile
+    when given.
+    """
+    profile = profile or CheckProfile()
+    with profile.measure(PREPROCESS):
+        documents = preprocess_documents(documents)
+    main, peers = documents[0], documents[1:]
+    stats = {'peers': len(peers), 'exact_duplicates': 0, 'semantic_computed': 0, 'semantic_pruned': 0,
+             'phrase_computed': 0, 'phrase_pruned': 0, 'below_threshold': 0, 'best_peer': None, 'best_score': 0.0}
+    all_tokens = sum(len(doc) for doc in documents)
+    
+    # Tier 1: cheap methods on every peer, kept per peer to choose the best match
+    scores = {'semantic': 0.0, 'fingerprint': 0.0, 'phrase': 0.0}
+    with profile.measure('tfidf'):
+        tfidf_similarities = tfidf_peer_similarities(documents, frequencies)
+        if tfidf_similarities is None:
+            # No features: the fallback score, no peer ranks above another on TF-IDF
+            scores['tfidf'] = calculate_tfidf_similarity(documents, frequencies)
+            tfidf_similarities = np.zeros(len(peers))
+        else:
+            scores['tfidf'] = float(tfidf_similarities.max()) * 100 if len(peers) else 0.0
+    
+    with profile.measure('structure'):
+        structure_similarities = structure_peer_similarities(main, peers, subtrees)
+        scores['structure'] = max(structure_similarities, default=0.0) * 100
+    
+    with profile.measure('fingerprint'):
+        if fingerprints is None:
+            fingerprints = [None] * len(documents)
+        fingerprints = [
+            doc_fingerprints if doc_fingerprints is not None else doc.fingerprints()
+            for doc, doc_fingerprints in zip(documents, fingerprints)
+        ]
+        index = FingerprintIndex()
+        for i, doc_fingerprints in enumerate(fingerprints[1:]):
+            index.add(i, doc_fingerprints)
+        fingerprint_similarities = index.similarities(fingerprints[0])
+        if fingerprint_similarities:
+            scores['fingerprint'] = max(fingerprint_similarities.values()) * 100
+    for method in ('tfidf', 'structure', 'fingerprint'):
+        profile.count(method, tokens=all_tokens, compared=len(peers))
+    
+    # Tier 2: expensive methods, most promising peers first so the maxima rise early
+    with profile.measure('semantic'):
+        main_contexts = get_semantic_contexts(main)
+    main_phrase_count = count_phrases(len(main))
+    main_phrases = None
+    semantic_max, phrase_max = 0.0, 0.0
+    # Per peer exact scores (0-1) where computed, upper bounds where pruned
+    semantic, semantic_bounds, phrase, phrase_bounds = {}, {}, {}, {}
+    order = sorted(range(len(peers)), key=lambda i: -fingerprint_similarities.get(i, 0.0))
+    
+    for i in order:
+        if semantic_max >= 1.0 and phrase_max >= 1.0:
+            stats['semantic_pruned'] += 1
+            stats['phrase_pruned'] += 1
+            continue
+        
+        peer = peers[i]
+        if peer.text == main.text:
+            # Identical documents score the maximum possible on both methods
+            stats['exact_duplicates'] += 1
+            semantic[i] = 1.0 if len(main_contexts.words) else 0.0
+            phrase[i] = 1.0 if main_phrase_count else 0.0
+            semantic_max, phrase_max = max(semantic_max, semantic[i]), max(phrase_max, phrase[i])
+            continue
+        
+        if fingerprint_similarities.get(i, 0.0) * 100 < min_fingerprint:
+            # Approximate mode: these peers count as 0 on both methods
+            stats['below_threshold'] += 1
+            semantic[i], phrase[i] = 0.0, 0.0
+            continue
+        
+        with profile.measure('semantic'):
+            other_contexts = get_semantic_contexts(peer)
+            bound = semantic_upper_bound(main_contexts, other_contexts)
+            if bound > semantic_max:
+                semantic[i] = semantic_pair_similarity(main_contexts, other_contexts)
+                semantic_max = max(semantic_max, semantic[i])
+                stats['semantic_computed'] += 1
+                profile.count('semantic', tokens=len(peer))
+            else:
+                semantic_bounds[i] = bound
+                stats['semantic_pruned'] += 1
+        
+        with profile.measure('phrase'):
+            bound = phrase_upper_bound(main_phrase_count, count_phrases(len(peer)))
+            if bound > phrase_max:
+                if main_phrases is None:
+                    main_phrases = extract_phrases(main)
+                    profile.count('phrase', tokens=len(main))
+                phrase[i] = phrase_pair_similarity(main_phrases, extract_phrases(peer))
+                phrase_max = max(phrase_max, phrase[i])
+                stats['phrase_computed'] += 1
+                profile.count('phrase', tokens=len(peer))
+            else:
+                phrase_bounds[i] = bound
+                stats['phrase_pruned'] += 1
+    
+    scores['semantic'] = semantic_max * 100
+    scores['phrase'] = phrase_max * 100
+    
+    # Best match: the highest weighted score with the overall weights, as in the matrix and
+    # memoized checks. Peers are visited by their upper bound (pruned methods at their
+    # bound) and a pruned method is only computed while the peer can still win.
+    _, weights = combine_plagiarism_scores(scores)
+    def weighted(i, semantic_score, phrase_score):
+        pair = {'tfidf': tfidf_similarities[i], 'semantic': semantic_score, 'fingerprint': fingerprint_similarities.get(i, 0.0),
+                'phrase': phrase_score, 'structure': structure_similarities[i]}
+        return float(sum(pair[method] * 100 * weights[method] for method in PLAGIARISM_METHODS))
+    upper = {
+        i: weighted(i, semantic.get(i, semantic_bounds.get(i, 1.0)), phrase.get(i, phrase_bounds.get(i, 1.0)))
+        for i in range(len(peers))
+    }
+    best, best_score = None, 0.0
+    for i in sorted(upper, key=lambda i: (-upper[i], i)):
+        if best is not None and upper[i] < best_score:
+            break
+        if i not in semantic:
+            with profile.measure('semantic'):
+                semantic[i] = semantic_pair_similarity(main_contexts, get_semantic_contexts(peers[i]))
+            profile.count('semantic', tokens=len(peers[i]), compared=1)
+        if i not in phrase:
+            with profile.measure('phrase'):
+                if main_phrases is None:
+                    main_phrases = extract_phrases(main)
+                    profile.count('phrase', tokens=len(main))
+                phrase[i] = phrase_pair_similarity(main_phrases, extract_phrases(peers[i]))
+            profile.count('phrase', tokens=len(peers[i]), compared=1)
+        score = weighted(i, semantic[i], phrase[i])
+        if best is None or score > best_score or (score == best_score and i < best):
+            best, best_score = i, score
+    stats['best_peer'], stats['best_score'] = best, best_score
+    
+    # Duplicates and peers below the fingerprint threshold skip both expensive methods
+    skipped = stats['exact_duplicates'] + stats['below_threshold']
+    profile.count('semantic', tokens=len(main), compared=stats['semantic_computed'],
+                  pruned=stats['semantic_pruned'] + skipped)
+    profile.count('phrase', compared=stats['phrase_computed'], pruned=stats['phrase_pruned'] + skipped)
+    
+    stats['timings'] = profile.timings(PLAGIARISM_METHODS)
+    return scores, stats
+
+def calculate_similarity_matrices(documents, fingerprints=None, valid=None, focus=None, tfidf_vectors=None,
+                                  subtrees=None, stats=None, profile=None):
+    """Pairwise scores (0-100) of every local method for a whole set of documents
+    
+    Entry [i, j] of each matrix scores document i against document j, exactly as a
+    single check of document i would score peer j. TF-IDF is fitted once on all valid
+    documents and compared with one sparse product, fingerprints with one sparse
+    product over the fingerprint incidence matrix.
+    
+    With focus set to a document index only the pairs involving that document are
+    computed (its row and column), which is O(N) instead of O(N^2). tfidf_vectors
+    (normalised rows of the valid documents, e.g. from an assignment's TF-IDF model)
+    replace fitting TF-IDF on the documents. Pairs of Python files with stored AST
+    subtrees (subtrees, None for other documents) score structure by clone similarity.
+    
+    Full checks of PLAGIARISM_PARALLEL_MIN_DOCUMENTS or more documents score the
+    pairwise methods in the parallel engine; stats (a dict) receives its figures.
+    Stage metrics go to profile when given (the parallel engine's pair scoring is
+    one 'pairwise' stage, its workers are not traced).
+    """
+    import numpy as np
+    from scipy.sparse import csr_matrix
+    
+    profile = profile or CheckProfile()
+    with profile.measure(PREPROCESS):
+        documents = preprocess_documents(documents)
+    n = len(documents)
+    all_tokens = sum(len(doc) for doc in documents)
+    if valid is None:
+        valid = [bool(doc.text and len(doc.text.strip()) > 10) for doc in documents]
+    if fingerprints is None:
+        fingerprints = [None] * n
+    fingerprints = [
+        doc_fingerprints if doc_fingerprints is not None else doc.fingerprints()
+        for doc, doc_fingerprints in zip(documents, fingerprints)
+    ]
+    valid_rows = [i for i in range(n) if valid[i]]
+    rows = list(range(n)) if focus is None else [focus]
+    matrices = {method: np.zeros((n, n)) for method in PLAGIARISM_METHODS}
+    
+    # Peers compared per method: every other document of the focus, or every pair
+    compared = n - 1 if focus is not None else n * (n - 1) // 2
+    
+    # Method 1: TF-IDF, one fit (or the stored vectors) and one sparse product for the whole assignment
+    with profile.measure('tfidf'):
+        if len(valid_rows) >= 2:
+            if tfidf_vectors is not None:
+                tfidf_matrix = tfidf_vectors
+            else:
+                tfidf_matrix = build_tfidf_matrix([documents[i] for i in valid_rows])
+                profile.count('tfidf', tokens=all_tokens)
+            if tfidf_matrix is not None:
+                if focus is None:
+                    products = (tfidf_matrix @ tfidf_matrix.T).toarray()
+                    matrices['tfidf'][np.ix_(valid_rows, valid_rows)] = products * 100
+                elif valid[focus]:
+                    position = valid_rows.index(focus)
+                    products = (tfidf_matrix[position] @ tfidf_matrix.T).toarray()[0] * 100
+                    matrices['tfidf'][focus, valid_rows] = products
+                    matrices['tfidf'][valid_rows, focus] = products
+    
+    # Method 3: Fingerprint Jaccard from the document x fingerprint incidence matrix
+    with profile.measure('fingerprint'):
+        columns = {}
+        indices, indptr = [], [0]
+        for doc_fingerprints in fingerprints:
+            hashes = {fingerprint.hash for fingerprint in doc_fingerprints}
+            indices.extend(columns.setdefault(fingerprint_hash, len(columns)) for fingerprint_hash in hashes)
+            indptr.append(len(indices))
+        if columns:
+            incidence = csr_matrix((np.ones(len(indices)), indices, indptr), shape=(n, len(columns)))
+            shared = (incidence[rows] @ incidence.T).toarray()
+            sizes = np.diff(indptr)
+            union = sizes[rows][:, None] + sizes[None, :] - shared
+            similarities = np.divide(shared, union, out=np.zeros(shared.shape), where=union > 0) * 100
+            matrices['fingerprint'][rows] = similarities
+            if focus is not None:
+                matrices['fingerprint'][:, focus] = similarities[0]
+    for method in ('tfidf', 'fingerprint'):
+        profile.count(method, compared=compared)
+    
+    # Methods 2, 4 and 5 compare prepared documents pair by pair
+    with profile.measure('semantic'):
+        contexts = [get_semantic_contexts(doc) for doc in documents]
+    with profile.measure('phrase'):
+        phrases = [extract_phrases(doc) for doc in documents]
+    with profile.measure('structure'):
+        structures = [analyze_structure(doc) for doc in documents]
+    for method in ('semantic', 'phrase', 'structure'):
+        profile.count(method, tokens=all_tokens)
+    if subtrees is None:
+        subtrees = [None] * n
+    
+    workers = app.config.get('PLAGIARISM_WORKERS') or default_workers()
+    if focus is None and workers > 1 and n >= app.config.get('PLAGIARISM_PARALLEL_MIN_DOCUMENTS', 100):
+        try:
+            with profile.measure('pairwise'):
+                matrices.update(pairwise_matrices(contexts, phrases, structures, subtrees, workers, stats))
+            profile.count('pairwise', compared=compared)
+            return matrices
+        except Exception as e:
+            print(f"⚠️ Parallel engine failed ({e}), scoring pairs sequentially")
+    
+    if focus is None:
+        pairs = [(i, j) for i in range(n) for j in range(n) if i != j]
+    else:
+        pairs = [(focus, j) for j in range(n) if j != focus] + [(j, focus) for j in range(n) if j != focus]
+    # Timed with bare counters, a context manager per pair would cost more than the cheap pairs
+    clock = time.perf_counter
+    semantic_time = phrase_time = structure_time = 0.0
+    for i, j in pairs:
+        started = clock()
+        matrices['semantic'][i, j] = semantic_pair_similarity(contexts[i], contexts[j]) * 100
+        semantic_time += clock() - started
+        if j > i:
+            # Phrase and structure similarity are symmetric
+            started = clock()
+            matrices['phrase'][i, j] = matrices['phrase'][j, i] = phrase_pair_similarity(phrases[i], phrases[j]) * 100
+            phrase_time += clock() - started
+            started = clock()
+            if subtrees[i] and subtrees[j]:
+                structure = clone_similarity(subtrees[i], subtrees[j])
+            else:
+                structure = structure_pair_similarity(structures[i], structures[j])
+            matrices['structure'][i, j] = matrices['structure'][j, i] = structure * 100
+            structure_time += clock() - started
+    profile.add_time('semantic', semantic_time)
+    profile.add_time('phrase', phrase_time)
+    profile.add_time('structure', structure_time)
+    for method in ('semantic', 'phrase', 'structure'):
+        profile.count(method, compared=compared)
+    
+    return matrices
+
+def build_plagiarism_result(scores, match_id=None, match_score=0.0, compared=0, mode='single',
+                            timings=None, document=None, content=None, fragments=None):
+    """Structured result of a check from its per-method scores
+    
+    document (preprocessed) supplies the content statistics of the report; content
+    keeps statistics computed earlier, e.g. when raising a stored result. fragments
+    are the character ranges matched in the best peer (see fragment_ranges).
+    """
+    score, weights = combine_plagiarism_scores(scores)
+    if document is not None:
+        content = content_statistics(document)
+    return PlagiarismResult(
+        round(score, 2), scores, weights, match_id=match_id, match_score=match_score, compared=compared,
+        mode=mode, engine_version=PLAGIARISM_ENGINE_VERSION, timings=timings, content=content,
+        fragments=fragments
+    )
+
+def store_plagiarism_scores(submission, scores, match=None, match_score=0.0, compared=0, mode='single',
+                            timings=None, document=None, content=None, fragments=None):
+    """Save the structured result of a check and its one line report, returns the result (caller commits)"""
+    result = build_plagiarism_result(scores, match.id if match else None, match_score, compared, mode,
+                                     timings, document, content, fragments)
+    
+    submission.plagiarism_score = result.score
+    submission.plagiarism_match_id = result.match_id
+    submission.plagiarism_report = result.summary()
+    submission.plagiarism_details = result.to_json()
+    
+    return result
+
+def get_match_fragments(submission, match, records=None):
+    """Character ranges copied between a submission and its match, from their stored fingerprints"""
+    if match is None:
+        return []
+    if records is None or submission.id not in records or match.id not in records:
+        records = load_fingerprint_records([submission, match])
+    return fragment_ranges(build_fragments(
+        unpack_fingerprints(records[submission.id].data), unpack_fingerprints(records[match.id].data)
+    ))
+
+def load_plagiarism_result(submission):
+    """Stored result of a submission's last local check, None if it has none"""
+    return PlagiarismResult.from_json(submission.plagiarism_details, submission.plagiarism_score or 0.0)
+
+def summarize_plagiarism_row(matrices, i, peers):
+    """Per-method maxima of document i over its peers, plus the best peer index and its weighted score"""
+    import numpy as np
+    
+    if not peers:
+        return {method: 0.0 for method in PLAGIARISM_METHODS}, None, 0.0
+    
+    scores = {method: float(matrices[method][i, peers].max()) for method in PLAGIARISM_METHODS}
+    _, weights = combine_plagiarism_scores(scores)
+    pair_scores = sum(matrices[method][i, peers] * weights[method] for method in PLAGIARISM_METHODS)
+    best = int(np.argmax(pair_scores))
+    return scores, peers[best], float(pair_scores[best])
+
+def calculate_pair_scores(matrices, indexes):
+    """Weighted score (%) of every pair of the given documents, the higher of both directions
+    
+    Each pair is weighted like a single check scoring that pair (get_plagiarism_weights
+    on the pair's own TF-IDF score).
+    """
+    import numpy as np
+    
+    indexes = np.asarray(indexes, dtype=np.int64)
+    scores = {method: matrices[method][np.ix_(indexes, indexes)] for method in PLAGIARISM_METHODS}
+    low, high = get_plagiarism_weights(0.0), get_plagiarism_weights(100.0)
+    reliable = scores['tfidf'] >= 1.0  # Same switch as get_plagiarism_weights
+    pair_scores = sum(np.where(reliable, high[method], low[method]) * scores[method] for method in PLAGIARISM_METHODS)
+    return np.maximum(pair_scores, pair_scores.T)
+
+def find_plagiarism_groups(pair_scores, submissions, threshold):
+    """Union-find groups of submissions over the pairs scoring at least threshold"""
+    import numpy as np
+    
+    first, second = np.nonzero(np.triu(pair_scores >= threshold, 1))
+    edges = ((submissions[a].id, submissions[b].id, float(pair_scores[a, b])) for a, b in zip(first, second))
+    return cluster_pairs(edges, threshold)
+
+def store_plagiarism_groups(assignment_id, submissions, groups, threshold):
+    """Replace the stored groups of an assignment (caller commits)"""
+    for sub in submissions:
+        sub.plagiarism_group_id = None
+    db.session.flush()
+    PlagiarismGroup.query.filter_by(assignment_id=assignment_id).delete()
+    
+    by_id = {sub.id: sub for sub in submissions}
+    for members, max_score in groups:
+        group = PlagiarismGroup(assignment_id=assignment_id, size=len(members), max_score=max_score, threshold=threshold)
+        db.session.add(group)
+        db.session.flush()
+        for submission_id in members:
+            by_id[submission_id].plagiarism_group_id = group.id
+
+def merge_plagiarism_group(submission, linked, max_score, threshold):
+    """Join a new submission and the peers it matches into one group, merging their groups (caller commits)
+    
+    The incremental counterpart of find_plagiarism_groups: adding a submission's edges
+    can only merge existing groups.
+    """
+    if not linked:
+        return None
+    
+    groups = {peer.plagiarism_group for peer in linked if peer.plagiarism_group is not None}
+    if groups:
+        group = max(groups, key=lambda group: (group.size, -group.id))
+    else:
+        group = PlagiarismGroup(assignment_id=submission.assignment_id, size=0, max_score=0.0, threshold=threshold)
+        db.session.add(group)
+        db.session.flush()
+    
+    members = {submission.id: submission}
+    members.update((peer.id, peer) for peer in linked)
+    for other in groups:
+        members.update((member.id, member) for member in other.members)
+        group.max_score = max(group.max_score, other.max_score)
+    for member in members.values():
+        member.plagiarism_group_id = group.id
+    for other in groups - {group}:
+        db.session.delete(other)
+    
+    group.size = len(members)
+    group.max_score = max(group.max_score, max_score)
+    return group
+
+def pair_memo_hash(record, language):
+    """Key of a submission's side of a SubmissionPair
+    
+    The content alone is not enough: fingerprint scores also depend on the template
+    fingerprints left out and on the fingerprint parameters of the language.
+    """
+    key = f'{record.content_hash}:{record.template_digest}:{record.kgram_length}:{record.window_size}:{language or ""}'
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+def calculate_memoized_plagiarism_scores(submission, other_submissions, content=None, profile=None):
+    """Per-method scores of a submission against its peers, reusing memoized pair scores
+    
+    Pairs are looked up in SubmissionPair by memo hashes, so only pairs whose
+    documents, templates or fingerprint parameters (or the engine) changed are computed. TF-IDF depends on the whole
+    corpus, so it comes from the assignment's incremental model instead of the memo.
+    Returns (scores, best matching peer, weighted score of that pair, stats, preprocessed
+    submission); stats include per-method timings in milliseconds. Stage metrics go
+    to profile (a new CheckProfile when None), which is finished and recorded in the
+    engine histograms.
+    """
+    profile = profile or CheckProfile()
     try:
-        import re
-        
-        def analyze_structure(text):
-            """Analyze document structure"""
-            structure = {
-                'paragraphs': len(re.split(r'\n\s*\n', text)),
-                'sentences': len(re.split(r'[.!?]+', text)),
-                'words': len(text.split()),
-                'avg_sentence_length': 0,
-                'avg_paragraph_length': 0
-            }
-            
-            if structure['sentences'] > 0:
-                structure['avg_sentence_length'] = structure['words'] / structure['sentences']
-            
-            if structure['paragraphs'] > 0:
-                structure['avg_paragraph_length'] = structure['words'] / structure['paragraphs']
+        return memoized_plagiarism_scores(submission, other_submissions, content, profile)
+    finally:
+        profile.finish()
+        plagiarism_metrics.record(profile)
+
+def memoized_plagiarism_scores(submission, other_submissions, content, profile):
+    """Body of calculate_memoized_plagiarism_scores, stages measured into profile"""
+    submissions = [submission] + list(other_submissions)
+    contents = [content] + [None] * len(other_submissions)
+    records = load_fingerprint_records(submissions, contents)
+    
+    # Same peer filter as the single submission checks
+    peers = [sub for sub in other_submissions if (records[sub.id].text_length or 0) > 10]
+    stats = {'peers_compared': len(peers), 'pairs_cached': 0, 'pairs_computed': 0,
+             'timings': profile.timings(PLAGIARISM_METHODS)}
+    if not peers:
+        return {method: 0.0 for method in PLAGIARISM_METHODS}, None, 0.0, stats, None
+    
+    own_hash = pair_memo_hash(records[submission.id], submission_language(submission))
+    peer_hashes = [pair_memo_hash(records[peer.id], submission_language(peer)) for peer in peers]
+    
+    # Method 1: one sparse product against the assignment's stored TF-IDF vectors
+    with profile.measure('tfidf'):
+        tfidf_vectors = get_tfidf_vectors(submission.assignment_id, [submission] + peers, records)
+        tfidf_scores = (tfidf_vectors[1:] @ tfidf_vectors[0].T).toarray().ravel() * 100
+    profile.count('tfidf', compared=len(peers))
+    
+    stored = SubmissionPair.query.filter(
+        SubmissionPair.engine_version == PLAGIARISM_ENGINE_VERSION,
+        (SubmissionPair.hash_a == own_hash) | (SubmissionPair.hash_b == own_hash)
+    ).all()
+    pairs = {(pair.hash_a, pair.hash_b): pair for pair in stored}
+    keys = [(min(own_hash, peer_hash), max(own_hash, peer_hash)) for peer_hash in peer_hashes]
+    
+    missing = [i for i, key in enumerate(keys) if key not in pairs]
+    stats['pairs_computed'] = len({keys[i] for i in missing})
+    stats['pairs_cached'] = len(set(keys)) - stats['pairs_computed']
+    
+    with profile.measure(EXTRACTION):
+        if content is None:
+            content = read_file_content(submission.file_path)
+        peer_contents = {i: read_file_content(peers[i].file_path) for i in missing}
+    with profile.measure(PREPROCESS):
+        documents = preprocess_documents([content] + [peer_contents[i] for i in missing])
+    profile.count(PREPROCESS, tokens=sum(len(doc) for doc in documents))
+    
+    # Peers served from the memo skip every pairwise method
+    for method in PLAGIARISM_METHODS[1:]:
+        profile.count(method, pruned=len(peers) - len(missing))
+    
+    if missing:
+        peer_documents = dict(zip(missing, documents[1:]))
+        
+        own_fingerprints = {fingerprint.hash for fingerprint in unpack_fingerprints(records[submission.id].data)}
+        with profile.measure('semantic'):
+            own_context = get_semantic_contexts(documents[0])
+        with profile.measure('phrase'):
+            own_phrases = extract_phrases(documents[0])
+        with profile.measure('structure'):
+            own_structure = analyze_structure(documents[0])
+            own_subtrees = unpack_subtrees(records[submission.id].ast_subtrees)
+        for method in ('semantic', 'phrase', 'structure'):
+            profile.count(method, tokens=len(documents[0]))
+        
+        for i in missing:
+            if keys[i] in pairs:
+                # Same content as an earlier peer
+                for method in PLAGIARISM_METHODS[1:]:
+                    profile.count(method, pruned=1)
+                continue
+            peer_doc = peer_documents[i]
+            with profile.measure('semantic'):
+                peer_context = get_semantic_contexts(peer_doc)
+                forward = semantic_pair_similarity(own_context, peer_context) * 100
+                backward = semantic_pair_similarity(peer_context, own_context) * 100
             
-            return structure
-        
-        if len(documents) < 2:
-            return 0.0
-        
-        main_structure = analyze_structure(documents[0])
-        max_similarity = 0.0
-        
-        for doc in documents[1:]:
-            other_structure = analyze_structure(doc)
+            with profile.measure('fingerprint'):
+                peer_fingerprints = {fingerprint.hash for fingerprint in unpack_fingerprints(records[peers[i].id].data)}
+                union = len(own_fingerprints | peer_fingerprints)
+                fingerprint_score = len(own_fingerprints & peer_fingerprints) / union * 100 if union else 0.0
             
-            # Calculate structural similarity
-            similarities = []
+            with profile.measure('structure'):
+                peer_subtrees = unpack_subtrees(records[peers[i].id].ast_subtrees)
+                if own_subtrees and peer_subtrees:
+                    structure = clone_similarity(own_subtrees, peer_subtrees)
+                else:
+                    structure = structure_pair_similarity(own_structure, analyze_structure(peer_doc))
             
-            # Compare ratios
-            if other_structure['avg_sentence_length'] > 0 and main_structure['avg_sentence_length'] > 0:
-                sent_sim = 1 - abs(main_structure['avg_sentence_length'] - other_structure['avg_sentence_length']) / max(main_structure['avg_sentence_length'], other_structure['avg_sentence_length'])
-                similarities.append(sent_sim)
+            with profile.measure('phrase'):
+                phrase = phrase_pair_similarity(own_phrases, extract_phrases(peer_doc)) * 100
             
-            if other_structure['avg_paragraph_length'] > 0 and main_structure['avg_paragraph_length'] > 0:
-                para_sim = 1 - abs(main_structure['avg_paragraph_length'] - other_structure['avg_paragraph_length']) / max(main_structure['avg_paragraph_length'], other_structure['avg_paragraph_length'])
-                similarities.append(para_sim)
+            for method in ('semantic', 'phrase', 'structure'):
+                profile.count(method, tokens=len(peer_doc), compared=1)
+            profile.count('fingerprint', compared=1)
             
-            if similarities:
-                avg_similarity = sum(similarities) / len(similarities)
-                max_similarity = max(max_similarity, avg_similarity)
-        
-        return max_similarity * 100
-        
-    except Exception as e:
-        print(f"Structure similarity error: {e}")
-        return 0.0
+            own_is_a = keys[i][0] == own_hash
+            pair = SubmissionPair(
+                hash_a=keys[i][0], hash_b=keys[i][1], engine_version=PLAGIARISM_ENGINE_VERSION,
+                semantic_ab=forward if own_is_a else backward,
+                semantic_ba=backward if own_is_a else forward,
+                fingerprint=fingerprint_score,
+                phrase=phrase,
+                structure=structure * 100
+            )
+            db.session.add(pair)
+            pairs[keys[i]] = pair
+    
+    pair_scores = []
+    for key, tfidf_score in zip(keys, tfidf_scores):
+        pair = pairs[key]
+        pair_scores.append({
+            'tfidf': float(tfidf_score),
+            'semantic': pair.semantic_ab if key[0] == own_hash else pair.semantic_ba,
+            'fingerprint': pair.fingerprint,
+            'phrase': pair.phrase,
+            'structure': pair.structure
+        })
+    
+    scores = {method: max(pair[method] for pair in pair_scores) for method in PLAGIARISM_METHODS}
+    _, weights = combine_plagiarism_scores(scores)
+    weighted = [sum(pair[method] * weights[method] for method in PLAGIARISM_METHODS) for pair in pair_scores]
+    best = max(range(len(peers)), key=lambda i: weighted[i])
+    
+    if missing:
+        try:
+            db.session.commit()
+        except Exception as e:
+            # Another check stored the same pairs concurrently, the scores are still valid
+            print(f"⚠️ Could not store pair scores: {e}")
+            db.session.rollback()
+    
+    stats['timings'] = profile.timings(PLAGIARISM_METHODS)
+    return scores, peers[best], weighted[best], stats, documents[0]
 
-def generate_detailed_plagiarism_report(content, other_contents, plagiarism_score):
-    """Generate detailed plagiarism report with analysis"""
+def check_assignment_plagiarism(assignment):
+    """Score every submission of an assignment against all the others in one pass
+    
+    Stores each submission's overall score and best matching peer in a single
+    transaction and returns a list of per-submission result dicts.
+    """
+    submissions = Submission.query.filter_by(assignment_id=assignment.id).order_by(Submission.id).all()
+    if len(submissions) < 2:
+        return []
+    
+    profile = CheckProfile(trace_memory=app.config.get('PLAGIARISM_TRACE_MEMORY', False))
     try:
-        report = f"COMPREHENSIVE PLAGIARISM ANALYSIS REPORT\n"
-        report += "=" * 50 + "\n\n"
-        
-        # Basic information
-        report += f"📊 Overall Plagiarism Score: {plagiarism_score:.2f}%\n"
-        report += f"📝 Documents Compared: {len(other_contents) + 1}\n"
-        report += f"🔍 Analysis Methods: 5 (TF-IDF, Semantic, Fingerprint, Phrase, Structure)\n\n"
-        
-        # Risk assessment
-        if plagiarism_score >= 80:
-            report += "🚨 HIGH RISK: Significant similarity detected\n"
-            report += "   Recommendation: Immediate review required\n"
-        elif plagiarism_score >= 50:
-            report += "⚠️  MEDIUM RISK: Moderate similarity detected\n"
-            report += "   Recommendation: Manual review recommended\n"
-        elif plagiarism_score >= 20:
-            report += "🔍 LOW RISK: Minor similarity detected\n"
-            report += "   Recommendation: Quick review suggested\n"
-        else:
-            report += "✅ LOW RISK: Minimal similarity detected\n"
-            report += "   Recommendation: Content appears original\n"
-        
-        report += "\n"
-        
-        # Analysis breakdown
-        report += "📋 ANALYSIS BREAKDOWN:\n"
-        report += "-" * 30 + "\n"
-        
-        # Calculate individual method scores for breakdown
-        try:
-            documents = [content] + other_contents
-            tfidf_score = calculate_tfidf_similarity(documents)
-            semantic_score = calculate_semantic_similarity(documents)
-            fingerprint_score = calculate_fingerprint_similarity(documents)
-            phrase_score = calculate_phrase_similarity(documents)
-            structure_score = calculate_structure_similarity(documents)
-            
-            report += f"• TF-IDF Similarity: {tfidf_score:.1f}% (Word frequency analysis)\n"
-            report += f"• Semantic Similarity: {semantic_score:.1f}% (Context and meaning)\n"
-            report += f"• Fingerprint Match: {fingerprint_score:.1f}% (Content fingerprinting)\n"
-            report += f"• Phrase Overlap: {phrase_score:.1f}% (Common phrases)\n"
-            report += f"• Structure Similarity: {structure_score:.1f}% (Document structure)\n"
-        except:
-            report += "• Analysis breakdown unavailable\n"
-        
-        report += "\n"
-        
-        # Content analysis
-        report += "📄 CONTENT ANALYSIS:\n"
-        report += "-" * 30 + "\n"
-        report += f"• Word Count: {len(content.split())} words\n"
-        report += f"• Character Count: {len(content)} characters\n"
-        report += f"• Sentence Count: {len([s for s in content.split('.') if s.strip()])} sentences\n"
-        
-        # Common words analysis
+        return assignment_plagiarism_results(assignment, submissions, profile)
+    finally:
+        profile.finish()
+        plagiarism_metrics.record(profile)
+
+def assignment_plagiarism_results(assignment, submissions, profile):
+    """Body of check_assignment_plagiarism for its submissions, stages measured into profile"""
+    with profile.measure(EXTRACTION):
+        contents = [read_file_content(sub.file_path) for sub in submissions]
+    records = load_fingerprint_records(submissions, contents)
+    fingerprints = [unpack_fingerprints(records[sub.id].data) for sub in submissions]
+    
+    # Same peer filter as the single submission checks
+    valid = [bool(content and len(content.strip()) > 10) for content in contents]
+    valid_submissions = [sub for sub, is_valid in zip(submissions, valid) if is_valid]
+    tfidf_vectors = get_tfidf_vectors(assignment.id, valid_submissions, records) if valid_submissions else None
+    with profile.measure(PREPROCESS):
+        documents = preprocess_documents(contents)
+    profile.count(PREPROCESS, tokens=sum(len(doc) for doc in documents))
+    engine_stats = {}
+    matrices = calculate_similarity_matrices(documents, fingerprints, valid, tfidf_vectors=tfidf_vectors,
+                                             subtrees=get_ast_subtrees(submissions, records), stats=engine_stats,
+                                             profile=profile)
+    if engine_stats:
+        print(f"⚡ Parallel engine: {engine_stats}")
+    
+    # Incremental updates that read the scores before this write start over
+    claim_assignment_scores(assignment.id)
+    results = []
+    for i, sub in enumerate(submissions):
+        peers = [j for j in range(len(submissions)) if j != i and valid[j]] if contents[i] else []
+        scores, best, match_score = summarize_plagiarism_row(matrices, i, peers)
+        match = submissions[best] if best is not None else None
+        fragments = fragment_ranges(build_fragments(fingerprints[i], fingerprints[best])) if match else None
+        store_plagiarism_scores(sub, scores, match, match_score, compared=len(peers), mode='assignment',
+                                document=documents[i], fragments=fragments)
+        
+        results.append({
+            'submission_id': sub.id,
+            'plagiarism_score': sub.plagiarism_score,
+            'match_id': sub.plagiarism_match_id
+        })
+    
+    # Collusion groups over all pairs of the assignment
+    threshold = app.config.get('PLAGIARISM_GROUP_THRESHOLD', 50.0)
+    indexes = [i for i, is_valid in enumerate(valid) if is_valid]
+    groups = find_plagiarism_groups(calculate_pair_scores(matrices, indexes), [submissions[i] for i in indexes],
+                                    threshold) if indexes else []
+    store_plagiarism_groups(assignment.id, submissions, groups, threshold)
+    for result, sub in zip(results, submissions):
+        result['group_id'] = sub.plagiarism_group_id
+    
+    db.session.commit()
+    return results
+
+class ScoresChanged(Exception):
+    """Another check wrote an assignment's scores after they were read"""
+
+def assignment_scores_version(assignment_id):
+    """Version of an assignment's stored scores, see claim_assignment_scores (may commit to create its model row)"""
+    from sqlalchemy.exc import IntegrityError
+    
+    query = db.session.query(AssignmentTfidfModel.scores_version).filter_by(assignment_id=assignment_id)
+    version = query.scalar()
+    if version is None:
+        # Submissions indexed before the model existed, load_assignment_tfidf fills it in
+        db.session.add(AssignmentTfidfModel(assignment_id=assignment_id))
         try:
-            import re
-            from collections import Counter
-            words = re.findall(r'\b\w+\b', content.lower())
-            word_freq = Counter(words)
-            common_words = word_freq.most_common(5)
-            report += f"• Most Common Words: {', '.join([f'{word}({count})' for word, count in common_words])}\n"
-        except:
-            pass
-        
-        report += "\n"
-        
-        # Recommendations
-        report += "💡 RECOMMENDATIONS:\n"
-        report += "-" * 30 + "\n"
-        
-        if plagiarism_score >= 50:
-            report += "• Review the submission for potential plagiarism\n"
-            report += "• Check for proper citations and references\n"
-            report += "• Consider discussing with the student\n"
-        elif plagiarism_score >= 20:
-            report += "• Verify originality of similar sections\n"
-            report += "• Check for proper attribution\n"
+            db.session.commit()
+        except IntegrityError:
+            # Created by another worker meanwhile
+            db.session.rollback()
+        version = query.scalar()
+    return version
+
+def claim_assignment_scores(assignment_id, version=None):
+    """Bump the scores version of an assignment, False if it is no longer version (caller commits)
+    
+    The UPDATE holds the lock of the assignment's model row until the transaction
+    ends, so a writer in any worker process waits for it and then finds the version
+    changed. Without version the claim is unconditional (full checks).
+    """
+    query = AssignmentTfidfModel.query.filter_by(assignment_id=assignment_id)
+    if version is not None:
+        query = query.filter_by(scores_version=version)
+    return query.update({'scores_version': AssignmentTfidfModel.scores_version + 1}, synchronize_session=False) > 0
+
+# Optimistic attempts of an incremental update before it locks the assignment for the whole update
+INCREMENTAL_UPDATE_ATTEMPTS = 3
+
+# Guards the document cache below between the threads of a worker; checks in other
+# worker processes are serialized by the database (claim_assignment_scores)
+incremental_plagiarism_lock = threading.Lock()
+
+# Per process preprocessed submissions of recently updated assignments, used under the lock
+# above: assignment id -> (scores version, shared vocabulary, {content hash: document}), most recent last
+assignment_documents_cache = {}
+ASSIGNMENT_DOCUMENTS_CACHE_SIZE = 8
+
+def get_assignment_documents(assignment_id, submissions, records, contents, profile, version=None):
+    """Preprocessed documents of an assignment's submissions, kept between incremental checks
+    
+    Documents share one vocabulary per assignment and are keyed by the stored content
+    hash, so an unchanged submission is neither re-read nor re-tokenized and keeps the
+    context matrix and phrase counts computed by an earlier check. contents (None
+    entries allowed) are used for documents that are not cached, other files are read.
+    The cache is dropped when the assignment's scores version is no longer the one
+    this worker last wrote (another worker updated the assignment meanwhile).
+    """
+    cached = assignment_documents_cache.pop(assignment_id, None)
+    if cached is not None and cached[0] != version:
+        cached = None
+    _, vocabulary, documents = cached if cached is not None else (version, Vocabulary(), {})
+    assignment_documents_cache[assignment_id] = (version, vocabulary, documents)
+    if len(assignment_documents_cache) > ASSIGNMENT_DOCUMENTS_CACHE_SIZE:
+        assignment_documents_cache.pop(next(iter(assignment_documents_cache)))
+    
+    hashes = [records[sub.id].content_hash for sub in submissions]
+    missing = sorted({content_hash: i for i, content_hash in enumerate(hashes) if content_hash not in documents}.values())
+    with profile.measure(EXTRACTION):
+        texts = [
+            contents[i] if contents[i] is not None else read_file_content(submissions[i].file_path) for i in missing
+        ]
+    with profile.measure(PREPROCESS):
+        for i, document in zip(missing, preprocess_documents(texts, vocabulary)):
+            documents[hashes[i]] = document
+    profile.count(PREPROCESS, tokens=sum(len(documents[hashes[i]]) for i in missing))
+    
+    # Documents of replaced or deleted submissions are dropped
+    for content_hash in set(documents) - set(hashes):
+        del documents[content_hash]
+    return [documents[content_hash] for content_hash in hashes]
+
+def update_plagiarism_scores_incrementally(submission, content=None):
+    """Score a new submission and raise the stored scores of the earlier submissions it matches
+    
+    Only the pairs involving the new submission are computed, so an upload costs O(N)
+    instead of a full assignment re-check. Earlier submissions come from their stored
+    fingerprint records and TF-IDF vectors, and from the per process document cache
+    (get_assignment_documents): only the new file is extracted and tokenized unless the
+    worker has not seen the assignment yet. Earlier submissions keep their per-method
+    maxima in plagiarism_details; each one is raised by its score against the newcomer.
+    
+    Concurrent updates of the same assignment, in any worker process, are serialized
+    by its scores version: an update that finds it changed before writing starts over,
+    and the last attempt holds the assignment's lock from the start.
+    """
+    profile = CheckProfile(trace_memory=app.config.get('PLAGIARISM_TRACE_MEMORY', False))
+    try:
+        with incremental_plagiarism_lock:
+            for _ in range(INCREMENTAL_UPDATE_ATTEMPTS):
+                try:
+                    return incremental_plagiarism_update(submission, content, profile)
+                except ScoresChanged:
+                    db.session.rollback()
+                    print(f"🔄 Assignment {submission.assignment_id} scores changed meanwhile, retrying")
+            return incremental_plagiarism_update(submission, content, profile, exclusive=True)
+    finally:
+        profile.finish()
+        plagiarism_metrics.record(profile)
+
+def incremental_plagiarism_update(submission, content, profile, exclusive=False):
+    """Body of update_plagiarism_scores_incrementally, stages measured into profile
+    
+    Raises ScoresChanged when another check wrote the assignment's scores first,
+    unless exclusive, which claims them before reading anything.
+    """
+    with profile.measure(EXTRACTION):
+        if content is None:
+            content = read_file_content(submission.file_path)
+    if not content:
+        return None
+    
+    # Everything below is read after the version, so a write by another check in between is noticed
+    version = assignment_scores_version(submission.assignment_id)
+    if exclusive:
+        # Waits for the checks writing meanwhile, then holds the assignment's row until commit
+        claim_assignment_scores(submission.assignment_id)
+        version = assignment_scores_version(submission.assignment_id) - 1
+    peers = Submission.query.filter(
+        Submission.assignment_id == submission.assignment_id,
+        Submission.id != submission.id
+    ).order_by(Submission.id).all()
+    records = load_fingerprint_records([submission] + peers, [content] + [None] * len(peers))
+    
+    # Same peer filter as the single submission checks, from the stored text lengths
+    peers = [peer for peer in peers if (records[peer.id].text_length or 0) > 10]
+    if not peers:
+        return None
+    
+    submissions = [submission] + peers
+    valid = [len(content.strip()) > 10] + [True] * len(peers)
+    valid_submissions = [sub for sub, is_valid in zip(submissions, valid) if is_valid]
+    documents = get_assignment_documents(submission.assignment_id, submissions, records,
+                                         [content] + [None] * len(peers), profile, version)
+    fingerprints = [unpack_fingerprints(records[sub.id].data) for sub in submissions]
+    matrices = calculate_similarity_matrices(
+        documents, fingerprints, valid, focus=0,
+        tfidf_vectors=get_tfidf_vectors(submission.assignment_id, valid_submissions, records),
+        subtrees=get_ast_subtrees(submissions, records), profile=profile
+    )
+    
+    # Writes start here, once no other check wrote the assignment since the reads above
+    if not exclusive and not claim_assignment_scores(submission.assignment_id, version):
+        raise ScoresChanged()
+    
+    # The newcomer: an ordinary check against every existing submission
+    peer_indexes = list(range(1, len(submissions)))
+    scores, best, match_score = summarize_plagiarism_row(matrices, 0, peer_indexes)
+    store_plagiarism_scores(submission, scores, submissions[best], match_score,
+                            compared=len(peers), mode='incremental', document=documents[0],
+                            timings=profile.timings(PLAGIARISM_METHODS),
+                            fragments=fragment_ranges(build_fragments(fingerprints[0], fingerprints[best])))
+    
+    # Collusion groups: the new pairs can only merge existing groups
+    threshold = app.config.get('PLAGIARISM_GROUP_THRESHOLD', 50.0)
+    pair_scores = calculate_pair_scores(matrices, range(len(submissions)))[0]
+    linked = [j for j in range(1, len(submissions)) if pair_scores[j] >= threshold]
+    if linked:
+        merge_plagiarism_group(submission, [submissions[j] for j in linked],
+                               float(max(pair_scores[j] for j in linked)), threshold)
+    
+    # Earlier submissions: raise their maxima with the new pair
+    for j, peer in enumerate(peers, start=1):
+        details = json.loads(peer.plagiarism_details) if peer.plagiarism_details else {}
+        old_scores = details.get('scores', {})
+        pair_scores = {method: float(matrices[method][j, 0]) for method in PLAGIARISM_METHODS}
+        raised = {method: max(old_scores.get(method, 0.0), pair_scores[method]) for method in PLAGIARISM_METHODS}
+        if raised == old_scores:
+            continue
+        
+        _, weights = combine_plagiarism_scores(raised)
+        pair_score = sum(pair_scores[method] * weights[method] for method in PLAGIARISM_METHODS)
+        if details.get('match_id') is None or pair_score > details.get('match_score', 0.0):
+            match, best_score = submission, pair_score
+            fragments = fragment_ranges(build_fragments(fingerprints[j], fingerprints[0]))
         else:
-            report += "• Content appears to be original\n"
-            report += "• No immediate action required\n"
-        
-        report += "\n"
-        report += "🔧 TECHNICAL DETAILS:\n"
-        report += "-" * 30 + "\n"
-        report += "• Detection Engine: Multi-method Local Analysis\n"
-        report += "• Comparison Database: Student submissions only\n"
-        report += "• Analysis Date: " + str(datetime.now().strftime("%Y-%m-%d %H:%M:%S")) + "\n"
-        report += "• Confidence Level: High (Local analysis)\n"
-        
-        return report
+            match, best_score = peer.plagiarism_match, details.get('match_score', 0.0)
+            fragments = details.get('fragments')
+        
+        previous_score = peer.plagiarism_score or 0.0
+        store_plagiarism_scores(peer, raised, match, best_score,
+                                compared=details.get('compared', 0) + 1, mode='incremental',
+                                timings=details.get('timings'), content=details.get('content'),
+                                fragments=fragments)
+        if not details and previous_score > peer.plagiarism_score:
+            # Checked before per-method scores were stored, never lower that result
+            peer.plagiarism_score = previous_score
+    
+    db.session.commit()
+    # This worker's own write keeps its documents current
+    cached = assignment_documents_cache.get(submission.assignment_id)
+    if cached is not None:
+        assignment_documents_cache[submission.assignment_id] = (version + 1,) + cached[1:]
+    return submission.plagiarism_score
+
+def start_incremental_plagiarism_check(submission_id, content=None):
+    """Run the incremental plagiarism update for a new submission in a background thread"""
+    def run_incremental_check(app, submission_id, content):
+        with app.app_context():
+            try:
+                submission = Submission.query.get(submission_id)
+                if submission:
+                    score = update_plagiarism_scores_incrementally(submission, content)
+                    print(f"🔍 Incremental plagiarism check for submission {submission_id} - Score: {score}%")
+            except Exception as e:
+                db.session.rollback()
+                print(f"❌ Incremental plagiarism check failed: {e}")
+            finally:
+                db.session.remove()
+    
+    thread = threading.Thread(target=run_incremental_check, args=(app, submission_id, content))
+    thread.daemon = True
+    thread.start()
+    return thread
+
+def start_assignment_reindex(assignment_id):
+    """Re-check an assignment in a background thread after its templates changed
+    
+    The stored fingerprints no longer match the template digest, so the check
+    re-indexes every submission before scoring it.
+    """
+    def run_reindex(app, assignment_id):
+        with app.app_context():
+            try:
+                assignment = Assignment.query.get(assignment_id)
+                if assignment:
+                    results = check_assignment_plagiarism(assignment)
+                    print(f"🔄 Re-indexed assignment {assignment_id} templates, re-checked {len(results)} submissions")
+            except Exception as e:
+                db.session.rollback()
+                print(f"❌ Template re-index failed: {e}")
+            finally:
+                db.session.remove()
+    
+    thread = threading.Thread(target=run_reindex, args=(app, assignment_id))
+    thread.daemon = True
+    thread.start()
+    return thread
+
+def generate_detailed_plagiarism_report(content, other_contents, plagiarism_score=None, result=None):
+    """Generate detailed plagiarism report with analysis
+    
+    Renders a stored or freshly computed PlagiarismResult; without one the local methods
+    run once on the given contents. plagiarism_score overrides the overall score shown
+    (e.g. a Dolos score).
+    """
+    try:
+        if result is None:
+            from types import SimpleNamespace
+            result = calculate_local_plagiarism_result(content, [SimpleNamespace(content=other) for other in other_contents])
+        if result is None:
+            result = build_plagiarism_result({method: 0.0 for method in PLAGIARISM_METHODS}, mode='local',
+                                             document=preprocess_documents([content or ''])[0])
+        if plagiarism_score is not None:
+            result.score = plagiarism_score
+        return result.render_text()
         
     except Exception as e:
-        return f"Plagiarism Analysis Report\nScore: {plagiarism_score:.2f}%\nError generating detailed report: {str(e)}"
+        return f"Plagiarism Analysis Report\nScore: {plagiarism_score or 0.0:.2f}%\nError generating detailed report: {str(e)}"
 
 def calculate_simple_similarity(content, other_submissions):
     """Simple fallback similarity calculation"""
@@ -1671,6 +3333,20 @@ scheduler.add_job(
     id='overdue_assignments'
 )
 
+scheduler.add_job(
+    func=index_missing_fingerprints,
+    trigger="interval",
+    hours=1,  # Backfill a batch every hour
+    id='fingerprint_backfill'
+)
+
+scheduler.add_job(
+    func=refresh_backend_health,
+    trigger="interval",
+    seconds=app.config['PLAGIARISM_BACKEND_HEALTH_SECONDS'],
+    id='backend_health'
+)
+
 # Routes
 @app.route('/')
 def index():
@@ -2128,7 +3804,10 @@ def submit_assignment(assignment_id):
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_')
             filename = timestamp + filename
             file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(file_path)
+            
+            # Hash the upload while it is written, normalized for text files
+            is_text = filename.rsplit('.', 1)[-1].lower() in TEXT_FILE_EXTENSIONS
+            file_size, stream_digest = save_upload(file.stream, file_path, text=is_text)
             
             # Check if submission is late
             is_late = datetime.utcnow() > assignment.due_date
@@ -2143,9 +3822,10 @@ def submit_assignment(assignment_id):
                     student_id=current_user.id,
                     file_path=file_path,
                     file_name=file.filename,
-                    file_size=os.path.getsize(file_path),
+                    file_size=file_size,
                     is_late=is_late,
-                    content=file_content if len(file_content) < 10000 else file_content[:10000]  # Limit content size
+                    content=file_content if len(file_content) < 10000 else file_content[:10000],  # Limit content size
+                    content_sha256=submission_content_digest(file.filename, file_content, stream_digest)
                 )
             except TypeError:
                 # Fallback if content column doesn't exist
@@ -2154,13 +3834,38 @@ def submit_assignment(assignment_id):
                     student_id=current_user.id,
                     file_path=file_path,
                     file_name=file.filename,
-                    file_size=os.path.getsize(file_path),
+                    file_size=file_size,
                     is_late=is_late
                 )
             
             db.session.add(submission)
             db.session.commit()
             
+            # Fingerprint the full content once so plagiarism checks never re-hash this file
+            try:
+                index_submission_fingerprints(submission, file_content)
+                db.session.commit()
+            except Exception as e:
+                print(f"⚠️ Fingerprint indexing failed: {e}")
+                db.session.rollback()
+            
+            # An identical copy of another student's file is flagged right away, without a pairwise check
+            duplicate = None
+            try:
+                duplicate = find_duplicate_submission(submission)
+                if duplicate:
+                    flag_duplicate_submission(submission, duplicate)
+                    db.session.commit()
+                    print(f"🚨 Submission {submission.id} is identical to submission {duplicate.id}")
+            except Exception as e:
+                print(f"⚠️ Duplicate check failed: {e}")
+                db.session.rollback()
+                duplicate = None
+            
+            # Score only the new pairs and raise earlier submissions this one matches
+            if duplicate is None:
+                start_incremental_plagiarism_check(submission.id, file_content)
+            
             # Send notification to lecturer
             send_notification(
                 assignment.created_by,
@@ -2253,9 +3958,15 @@ def view_assignment_submissions(assignment_id):
     # Get all submissions for this assignment
     submissions = Submission.query.filter_by(assignment_id=assignment_id).all()
     
+    # Collusion groups, largest first
+    plagiarism_groups = PlagiarismGroup.query.filter_by(assignment_id=assignment_id).order_by(
+        PlagiarismGroup.size.desc(), PlagiarismGroup.max_score.desc()
+    ).all()
+    
     return render_template('view_submissions.html', 
                          assignment=assignment, 
-                         submissions=submissions)
+                         submissions=submissions,
+                         plagiarism_groups=plagiarism_groups)
 
 @app.route('/submission/<int:submission_id>/view')
 @login_required
@@ -2275,7 +3986,77 @@ def view_submission_details(submission_id):
         flash('Access denied', 'error')
         return redirect(url_for('dashboard'))
     
-    return render_template('view_submission_details.html', submission=submission)
+    # Copied regions come from the stored result, the texts are only read to display them
+    plagiarism_result = load_plagiarism_result(submission)
+    highlighted_text, match_text = None, None
+    if plagiarism_result and plagiarism_result.fragments:
+        content = read_file_content(submission.file_path)
+        if content:
+            highlighted_text = plagiarism_result.highlight(content)
+        if current_user.role in ['lecturer', 'admin'] and submission.plagiarism_match:
+            match_content = read_file_content(submission.plagiarism_match.file_path)
+            if match_content:
+                match_text = plagiarism_result.match_highlight(match_content)
+    
+    # Reworded paragraphs found anywhere in the corpus, with the paragraph that triggered each match
+    paragraph_matches = []
+    if current_user.role in ['lecturer', 'admin'] and submission_language(submission) is None:
+        matches = find_paragraph_matches(submission)
+        if matches:
+            content = read_file_content(submission.file_path) or ''
+            peers = {peer.id: peer for peer in Submission.query.filter(
+                Submission.id.in_({match['submission_id'] for match in matches})
+            )}
+            for match in matches:
+                excerpt = content[match['char_start']:match['char_end']]
+                paragraph_matches.append(dict(
+                    match, peer=peers[match['submission_id']],
+                    excerpt=excerpt if len(excerpt) <= 200 else excerpt[:200] + '...'
+                ))
+    
+    return render_template('view_submission_details.html', submission=submission,
+                           plagiarism_result=plagiarism_result, highlighted_text=highlighted_text,
+                           match_text=match_text, paragraph_matches=paragraph_matches)
+
+@app.route('/assignment/<int:assignment_id>/compare/<int:left_id>/<int:right_id>')
+@login_required
+def compare_submissions(assignment_id, left_id, right_id):
+    """Side-by-side comparison of two submissions, anchored on their shared fingerprints"""
+    if current_user.role not in ['lecturer', 'admin']:
+        flash('Access denied', 'error')
+        return redirect(url_for('dashboard'))
+    
+    assignment = Assignment.query.get_or_404(assignment_id)
+    if assignment.created_by != current_user.id and current_user.role != 'admin':
+        flash('Access denied', 'error')
+        return redirect(url_for('dashboard'))
+    
+    left = Submission.query.filter_by(id=left_id, assignment_id=assignment_id).first_or_404()
+    right = Submission.query.filter_by(id=right_id, assignment_id=assignment_id).first_or_404()
+    
+    # Stored fingerprints locate the copied regions, difflib only runs between them
+    # (the files are only read here when their fingerprints are missing or stale)
+    records = load_fingerprint_records([left, right])
+    anchors = anchor_chain(build_fragments(
+        unpack_fingerprints(records[left.id].data), unpack_fingerprints(records[right.id].data)
+    ))
+    db.session.commit()
+    left_path, right_path = left.file_path, right.file_path
+    
+    def rows():
+        # Text files are read forward between anchors; extracted documents (PDF, Word)
+        # only exist as a whole once extracted, and are sliced in memory
+        sources = [open_text_file(path) or read_file_content(path) or '' for path in (left_path, right_path)]
+        try:
+            yield from side_by_side_rows(sources[0], sources[1], anchors)
+        finally:
+            for source in sources:
+                if not isinstance(source, str):
+                    source.close()
+    
+    # Rows are rendered as they are produced, the full comparison is never built
+    return stream_template('compare_submissions.html', assignment=assignment, left=left, right=right,
+                           anchors=len(anchors), rows=rows())
 
 @app.route('/assignment/<int:assignment_id>/edit', methods=['GET', 'POST'])
 @login_required
@@ -2293,6 +4074,7 @@ def edit_assignment(assignment_id):
         return redirect(url_for('dashboard'))
     
     if request.method == 'POST':
+        previous_texts = (assignment.description, assignment.instructions)
         assignment.title = request.form['title']
         assignment.description = request.form['description']
         assignment.instructions = request.form['instructions']
@@ -2302,11 +4084,79 @@ def edit_assignment(assignment_id):
         
         db.session.commit()
         
+        # Prompt text is excluded from the plagiarism fingerprints
+        if (assignment.description, assignment.instructions) != previous_texts and assignment.submissions:
+            start_assignment_reindex(assignment.id)
+        
         flash('Assignment updated successfully!', 'success')
         return redirect(url_for('view_assignment_submissions', assignment_id=assignment.id))
     
     return render_template('edit_assignment.html', assignment=assignment)
 
+@app.route('/assignment/<int:assignment_id>/templates', methods=['POST'])
+@login_required
+def add_assignment_template(assignment_id):
+    """Attach template text or a starter file, excluded from every submission's plagiarism fingerprints"""
+    if current_user.role not in ['lecturer', 'admin']:
+        flash('Access denied', 'error')
+        return redirect(url_for('dashboard'))
+    
+    assignment = Assignment.query.get_or_404(assignment_id)
+    if assignment.created_by != current_user.id and current_user.role != 'admin':
+        flash('Access denied', 'error')
+        return redirect(url_for('dashboard'))
+    
+    name = request.form.get('name', '').strip()
+    content = request.form.get('content', '')
+    file = request.files.get('file')
+    if file and file.filename:
+        if not allowed_file(file.filename):
+            flash('File type not supported', 'error')
+            return redirect(url_for('edit_assignment', assignment_id=assignment_id))
+        
+        # Only the extracted text is kept
+        file_path = os.path.join(app.config['UPLOAD_FOLDER'], 'template_' + datetime.now().strftime('%Y%m%d_%H%M%S_') + secure_filename(file.filename))
+        file.save(file_path)
+        try:
+            content = read_file_content(file_path)
+        finally:
+            os.remove(file_path)
+        name = name or file.filename
+    
+    if not content or not content.strip():
+        flash('Template is empty', 'error')
+        return redirect(url_for('edit_assignment', assignment_id=assignment_id))
+    
+    db.session.add(AssignmentTemplate(assignment_id=assignment.id, name=name or 'Template', content=content))
+    db.session.commit()
+    if assignment.submissions:
+        start_assignment_reindex(assignment.id)
+    
+    flash('Template added, submissions are being re-checked without it', 'success')
+    return redirect(url_for('edit_assignment', assignment_id=assignment_id))
+
+@app.route('/assignment/<int:assignment_id>/templates/<int:template_id>/delete', methods=['POST'])
+@login_required
+def delete_assignment_template(assignment_id, template_id):
+    """Remove a template, its text counts towards plagiarism scores again"""
+    if current_user.role not in ['lecturer', 'admin']:
+        flash('Access denied', 'error')
+        return redirect(url_for('dashboard'))
+    
+    assignment = Assignment.query.get_or_404(assignment_id)
+    if assignment.created_by != current_user.id and current_user.role != 'admin':
+        flash('Access denied', 'error')
+        return redirect(url_for('dashboard'))
+    
+    template = AssignmentTemplate.query.filter_by(id=template_id, assignment_id=assignment_id).first_or_404()
+    db.session.delete(template)
+    db.session.commit()
+    if assignment.submissions:
+        start_assignment_reindex(assignment.id)
+    
+    flash('Template removed', 'success')
+    return redirect(url_for('edit_assignment', assignment_id=assignment_id))
+
 @app.route('/api/plagiarism-check/<int:submission_id>')
 @login_required
 def plagiarism_check(submission_id):
@@ -2317,11 +4167,17 @@ def plagiarism_check(submission_id):
         # Get submission
         submission = Submission.query.get_or_404(submission_id)
         
+        scope = request.args.get('scope', 'assignment')
+        if scope not in PLAGIARISM_SCOPES:
+            return jsonify({
+                'error': f'Unknown scope: {scope}',
+                'plagiarism_score': 0.0,
+                'report': 'Plagiarism check failed due to an error',
+                'status': 'error'
+            }), 400
+        
         # Get other submissions for comparison
-        other_submissions = Submission.query.filter(
-            Submission.assignment_id == submission.assignment_id,
-            Submission.id != submission_id
-        ).all()
+        other_submissions = get_comparison_submissions(submission, scope)
         
         if not other_submissions:
             return jsonify({
@@ -2339,27 +4195,22 @@ def plagiarism_check(submission_id):
                 'status': 'error'
             })
         
-        # Create mock submissions for the working plagiarism detection
-        class MockSubmission:
-            def __init__(self, content):
-                self.content = content
-        
-        mock_submissions = [MockSubmission(read_file_content(sub.file_path)) for sub in other_submissions]
-        
-        # Calculate plagiarism score using the working method
-        plagiarism_score = calculate_local_plagiarism_score(content, mock_submissions)
-        
-        # Generate simple report
-        plagiarism_report = f"Plagiarism Score: {plagiarism_score:.2f}% - Local analysis completed"
+        # Calculate plagiarism score, reusing memoized pairs unless a document or the engine changed
+        scores, match, match_score, cache_stats, document = calculate_memoized_plagiarism_scores(
+            submission, other_submissions, content
+        )
         
         # Update submission record
-        submission.plagiarism_score = plagiarism_score
-        submission.plagiarism_report = plagiarism_report
+        result = store_plagiarism_scores(
+            submission, scores, match, match_score, compared=cache_stats['peers_compared'],
+            timings=cache_stats['timings'], document=document, fragments=get_match_fragments(submission, match)
+        )
         db.session.commit()
         
         return jsonify({
-            'plagiarism_score': plagiarism_score,
-            'report': plagiarism_report,
+            'plagiarism_score': result.score,
+            'report': submission.plagiarism_report,
+            'result': result.to_dict(),
             'status': 'completed_comprehensive'
         })
         
@@ -2372,6 +4223,112 @@ def plagiarism_check(submission_id):
             'status': 'error'
         }), 500
 
+@app.route('/api/assignment/<int:assignment_id>/plagiarism-check', methods=['POST'])
+@login_required
+def assignment_plagiarism_check(assignment_id):
+    """Check every submission of an assignment against all the others in one batch"""
+    if current_user.role not in ['lecturer', 'admin']:
+        return jsonify({'success': False, 'error': 'Access denied'}), 403
+    
+    assignment = Assignment.query.get_or_404(assignment_id)
+    if assignment.created_by != current_user.id and current_user.role != 'admin':
+        return jsonify({'success': False, 'error': 'Access denied'}), 403
+    
+    try:
+        start_time = time.time()
+        results = check_assignment_plagiarism(assignment)
+        
+        if not results:
+            return jsonify({
+                'success': False,
+                'error': 'At least two submissions are needed for an assignment-wide check'
+            })
+        
+        return jsonify({
+            'success': True,
+            'results': results,
+            'submissions_checked': len(results),
+            'duration_seconds': round(time.time() - start_time, 2)
+        })
+        
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Assignment plagiarism check error: {e}")
+        return jsonify({
+            'success': False,
+            'error': f'Plagiarism check failed: {str(e)}'
+        }), 500
+
+@app.route('/api/submission/<int:submission_id>/similar')
+@login_required
+def similar_submissions(submission_id):
+    """The closest matches of a submission by shared fingerprints, from the inverted index"""
+    if current_user.role not in ['lecturer', 'admin']:
+        return jsonify({'success': False, 'error': 'Access denied'}), 403
+    
+    submission = Submission.query.get_or_404(submission_id)
+    if submission.assignment.created_by != current_user.id and current_user.role != 'admin':
+        return jsonify({'success': False, 'error': 'Access denied'}), 403
+    
+    scope = request.args.get('scope', 'assignment')
+    if scope not in PLAGIARISM_SCOPES:
+        return jsonify({'success': False, 'error': f'Unknown scope: {scope}'}), 400
+    k = min(max(request.args.get('k', 5, type=int), 1), 50)
+    
+    try:
+        start_time = time.perf_counter()
+        matches = find_similar_submissions(submission, k, scope)
+        db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'submission_id': submission.id,
+            'scope': scope,
+            'matches': [
+                {
+                    'submission_id': peer.id,
+                    'student': f"{peer.student.first_name} {peer.student.last_name}",
+                    'assignment_id': peer.assignment_id,
+                    'assignment': peer.assignment.title,
+                    'file_name': peer.file_name,
+                    'score': score,
+                    'shared_fingerprints': shared
+                }
+                for peer, score, shared in matches
+            ],
+            'elapsed_ms': round((time.perf_counter() - start_time) * 1000, 2)
+        })
+        
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Similar submissions lookup error: {e}")
+        return jsonify({
+            'success': False,
+            'error': f'Similar submissions lookup failed: {str(e)}'
+        }), 500
+
+@app.route('/api/admin/plagiarism-backends')
+@login_required
+def plagiarism_backends_status():
+    """Health, circuit state and latency of every plagiarism backend (admin only)"""
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Access denied'}), 403
+    
+    if request.args.get('refresh') == '1':
+        backend_registry.refresh_health(force=True)
+    return jsonify({'backends': backend_registry.status()})
+
+@app.route('/api/admin/plagiarism-metrics')
+@login_required
+def plagiarism_metrics_summary():
+    """Histograms of per-stage check metrics in this process (admin only), ?stage= and ?metric= filter them"""
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Access denied'}), 403
+    
+    if request.args.get('reset') == '1':
+        plagiarism_metrics.reset()
+    return jsonify(plagiarism_metrics.summary(request.args.get('stage'), request.args.get('metric')))
+
 @app.route('/api/plagiarism-report/<check_id>')
 @login_required
 def get_plagiarism_report_route(check_id):
@@ -3011,11 +4968,15 @@ def force_plagiarism_check(submission_id):
         # Get submission
         submission = Submission.query.get_or_404(submission_id)
         
+        scope = request.args.get('scope', 'assignment')
+        if scope not in PLAGIARISM_SCOPES:
+            return jsonify({
+                'success': False,
+                'error': f'Unknown scope: {scope}'
+            }), 400
+        
         # Get other submissions for comparison
-        other_submissions = Submission.query.filter(
-            Submission.assignment_id == submission.assignment_id,
-            Submission.id != submission_id
-        ).all()
+        other_submissions = get_comparison_submissions(submission, scope)
         
         if not other_submissions:
             return jsonify({
@@ -3023,30 +4984,28 @@ def force_plagiarism_check(submission_id):
                 'error': 'No other submissions to compare against'
             })
         
-        # Read submission content
-        content = read_file_content(submission.file_path)
+        # Read submission content; the check is profiled with memory tracing
+        profile = CheckProfile(trace_memory=True)
+        with profile.measure(EXTRACTION):
+            content = read_file_content(submission.file_path)
         if not content:
+            profile.finish()
             return jsonify({
                 'success': False,
                 'error': 'Could not read submission content'
             })
         
-        # Create mock submissions for testing
-        class MockSubmission:
-            def __init__(self, content):
-                self.content = content
-        
-        mock_submissions = [MockSubmission(read_file_content(sub.file_path)) for sub in other_submissions]
-        
-        # Calculate plagiarism score
-        score = calculate_local_plagiarism_score(content, mock_submissions)
-        
-        # Generate detailed plagiarism report
-        plagiarism_report = f"Plagiarism Score: {score:.2f}% - Local analysis completed using comprehensive multi-method detection"
+        # Calculate plagiarism score, reusing memoized pairs unless a document or the engine changed
+        scores, match, match_score, cache_stats, document = calculate_memoized_plagiarism_scores(
+            submission, other_submissions, content, profile
+        )
         
         # Save results to database
-        submission.plagiarism_score = score
-        submission.plagiarism_report = plagiarism_report
+        result = store_plagiarism_scores(
+            submission, scores, match, match_score, compared=cache_stats['peers_compared'],
+            timings=cache_stats['timings'], document=document, fragments=get_match_fragments(submission, match)
+        )
+        score = result.score
         db.session.commit()
         
         # Get detailed debug information
@@ -3055,13 +5014,27 @@ def force_plagiarism_check(submission_id):
             'content_length': len(content),
             'other_submissions_count': len(other_submissions),
             'file_path': submission.file_path,
-            'file_type': submission.file_path.split('.')[-1] if submission.file_path else 'unknown'
+            'file_type': submission.file_path.split('.')[-1] if submission.file_path else 'unknown',
+            'engine_version': PLAGIARISM_ENGINE_VERSION,
+            'scope': scope,
+            'pair_cache': cache_stats,
+            'profile': profile.to_dict()
         }
+        if submission_language(submission) == 'python':
+            debug_info['structural_clones'] = find_structural_clones(submission)
+        else:
+            started = time.perf_counter()
+            paragraph_matches = find_paragraph_matches(submission, scope)
+            debug_info['paragraph_matches'] = {
+                'matches': paragraph_matches,
+                'elapsed_ms': round((time.perf_counter() - started) * 1000, 2)
+            }
         
         return jsonify({
             'success': True,
             'results': {
                 'overall_score': score,
+                'result': result.to_dict(),
                 'debug_info': debug_info
             }
         })
@@ -3079,5 +5052,8 @@ if __name__ == '__main__':
     # Get port from environment variable (Railway sets this)
     port = int(os.environ.get('PORT', 5000))
     debug = os.environ.get('FLASK_ENV') != 'production'
+    # Pool workers re-import the main script, here that would set the whole application up again
+    if not os.environ.get('PLAGIARISM_WORKERS'):
+        app.config['PLAGIARISM_WORKERS'] = 1
     
     app.run(host='0.0.0.0', port=port, debug=debug)
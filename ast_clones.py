@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Structural clone detection for Python submissions in the E-Assignment plagiarism engine
+Each file is parsed once with ast and its subtrees are hashed bottom-up with
+identifiers and literals normalized, so renamed variables and reordered function
+definitions hash the same. Two files are compared with one hash join of their
+stored subtree hashes, never by re-reading their text.
+"""
+
+import ast
+from array import array
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from fingerprinting import hash_token
+
+# Subtrees smaller than this (e.g. `x = 1`, `return y`) are too common to indicate copying
+AST_MIN_SUBTREE_NODES = 10
+# Lines with syntax errors that are stubbed out before a file counts as unparsable
+MAX_REPAIRED_LINES = 20
+
+# Fields holding names that students are free to choose
+_IDENTIFIER_FIELDS = {'id', 'arg', 'name', 'attr', 'asname', 'vararg', 'kwarg'}
+# Fields ignored altogether (Load/Store contexts, type comments)
+_IGNORED_FIELDS = {'ctx', 'type_comment', 'kind'}
+_DEFINITIONS = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+
+class Subtree(NamedTuple):
+    """A hashed subtree: its hash, node count, enclosing indexed subtree and line span."""
+    hash: int
+    size: int
+    parent: int  # hash of the nearest indexed ancestor, 0 for the module
+    first_line: int
+    last_line: int
+
+
+def _value_label(field: str, value) -> str:
+    if field in _IDENTIFIER_FIELDS:
+        return 'ID'
+    if field == 'value':
+        return type(value).__name__  # Constant: the type, not the literal
+    return repr(value)
+
+
+class _Hasher:
+    """Bottom-up hashing of one module, collecting the subtrees worth indexing."""
+
+    def __init__(self, min_nodes: int):
+        self.min_nodes = min_nodes
+        self.subtrees: List[List[int]] = []  # [hash, size, parent, first line, last line]
+
+    def visit(self, node: ast.AST) -> Tuple[int, int, List[int]]:
+        """Hash and size of node; also returns the indexes of its top-level indexed descendants."""
+        parts = [type(node).__name__]
+        size = 1
+        pending: List[int] = []
+        for field, value in ast.iter_fields(node):
+            if field in _IGNORED_FIELDS:
+                continue
+            if isinstance(value, ast.AST):
+                child_hash, child_size, child_pending = self.visit(value)
+                parts.append(f'{field}={child_hash}')
+                size += child_size
+                pending.extend(child_pending)
+            elif isinstance(value, list):
+                ordered, definitions = [], []
+                for item in value:
+                    if isinstance(item, ast.AST):
+                        child_hash, child_size, child_pending = self.visit(item)
+                        # Moving a function or class around does not change its block
+                        (definitions if isinstance(item, _DEFINITIONS) else ordered).append(child_hash)
+                        size += child_size
+                        pending.extend(child_pending)
+                    elif item is not None:
+                        ordered.append(hash_token(_value_label(field, item)))
+                parts.append(f'{field}=[{",".join(map(str, ordered))}|{",".join(map(str, sorted(definitions)))}]')
+            elif value is not None:
+                parts.append(f'{field}={_value_label(field, value)}')
+
+        node_hash = hash_token(';'.join(parts))
+        if (size >= self.min_nodes and hasattr(node, 'lineno')) or isinstance(node, ast.Module):
+            for index in pending:
+                self.subtrees[index][2] = node_hash
+            self.subtrees.append([node_hash, size, 0, getattr(node, 'lineno', 1),
+                                  getattr(node, 'end_lineno', None) or getattr(node, 'lineno', 1)])
+            pending = [len(self.subtrees) - 1]
+        return node_hash, size, pending
+
+
+def _stub(line: str) -> str:
+    if not line.endswith(':'):
+        return 'pass'
+    if line.startswith(('def ', 'async def ')):
+        return 'def _():'
+    if line.startswith('class '):
+        return 'class _:'
+    return 'if True:'
+
+
+def parse_tolerant(source: str, max_repairs: int = MAX_REPAIRED_LINES) -> ast.Module:
+    """
+    ast.parse that survives a few broken lines, as student code often has.
+
+    Each line reported by a SyntaxError is replaced by `pass`, or by an empty header
+    of the same kind when it opens a block, at the same indentation, so the rest of
+    the file (decorators, bodies) keeps its shape.
+    """
+    lines = (source or '').splitlines()
+    for _ in range(max_repairs + 1):
+        try:
+            return ast.parse('\n'.join(lines))
+        except SyntaxError as e:
+            if not e.lineno or e.lineno > len(lines) or max_repairs == 0:
+                raise
+            line = lines[e.lineno - 1]
+            stub = _stub(line.strip())
+            if line.strip() == stub:
+                raise
+            lines[e.lineno - 1] = line[:len(line) - len(line.lstrip())] + stub
+            max_repairs -= 1
+    raise SyntaxError('too many syntax errors')
+
+
+def subtree_hashes(source: str, min_nodes: int = AST_MIN_SUBTREE_NODES) -> Optional[List[Subtree]]:
+    """
+    Normalized subtree hashes of a Python source file.
+
+    Every subtree of at least min_nodes nodes is kept, plus the module itself (the
+    last entry, whose size is the node count of the whole file). None when the
+    source does not parse, even with a few lines repaired.
+    """
+    try:
+        tree = parse_tolerant(source)
+        hasher = _Hasher(min_nodes)
+        hasher.visit(tree)
+    except (SyntaxError, ValueError, RecursionError):
+        return None
+    hasher.subtrees[-1][4] = max(1, len((source or '').splitlines()))  # The module spans the whole file
+    return [Subtree(*subtree) for subtree in hasher.subtrees]
+
+
+def pack_subtrees(subtrees: Optional[List[Subtree]]) -> bytes:
+    """Serialize subtrees into a compact binary blob for the database (empty if unparsable)."""
+    packed = array('q')
+    for subtree in subtrees or []:
+        packed.extend(subtree)
+    return packed.tobytes()
+
+
+def unpack_subtrees(data: Optional[bytes]) -> List[Subtree]:
+    """Inverse of pack_subtrees."""
+    if not data:
+        return []
+    packed = array('q')
+    packed.frombytes(data)
+    fields = len(Subtree._fields)
+    return [Subtree(*packed[i:i + fields]) for i in range(0, len(packed), fields)]
+
+
+def _covered_nodes(subtrees: List[Subtree], shared: Set[int]) -> int:
+    """Nodes of the maximal shared subtrees, nested matches are counted once."""
+    return sum(subtree.size for subtree in subtrees if subtree.hash in shared and subtree.parent not in shared)
+
+
+def clone_similarity(left: List[Subtree], right: List[Subtree]) -> float:
+    """
+    Share of both files' nodes lying in structurally identical subtrees (0-1).
+
+    One hash join of the two subtree sets; a shared subtree only counts when its
+    enclosing subtree is not shared as well.
+    """
+    if not left or not right:
+        return 0.0
+    shared = {subtree.hash for subtree in left} & {subtree.hash for subtree in right}
+    if not shared:
+        return 0.0
+    total = left[-1].size + right[-1].size
+    covered = _covered_nodes(left, shared) + _covered_nodes(right, shared)
+    return min(1.0, covered / total) if total else 0.0
+
+
+def clone_regions(left: List[Subtree], right: List[Subtree]) -> List[Tuple[int, int, int, int]]:
+    """Line spans (left first, left last, right first, right last) of the maximal shared subtrees."""
+    shared = {subtree.hash for subtree in left} & {subtree.hash for subtree in right}
+    by_hash: Dict[int, Subtree] = {}
+    for subtree in right:
+        if subtree.hash in shared and subtree.parent not in shared:
+            by_hash.setdefault(subtree.hash, subtree)
+    regions = []
+    for subtree in left:
+        if subtree.hash in shared and subtree.parent not in shared and subtree.hash in by_hash:
+            match = by_hash[subtree.hash]
+            regions.append((subtree.first_line, subtree.last_line, match.first_line, match.last_line))
+    return sorted(regions)
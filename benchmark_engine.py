@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Benchmark the local plagiarism engine on synthetic assignments
+Builds reproducible corpora of 10, 100, 1,000 and 5,000 submissions from the
+repository's .docx fixtures, the documents of create_test_files.py and the Dolos
+code samples, then times checks of sampled submissions against all the others.
+Reports throughput, p50/p99 latency and peak RSS for every similarity method and
+for the combined (cascade) score, and writes them as JSON so two engine versions
+can be compared with --compare.
+
+Usage:
+    python benchmark_engine.py                              # all sizes, benchmark_results.json
+    python benchmark_engine.py --sizes 10,100 --checks 10
+    python benchmark_engine.py --output new.json --compare old.json
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import platform
+import random
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SIZES = [10, 100, 1000, 5000]
+# Checked submissions per corpus size, each one scored against all the others
+DEFAULT_CHECKS = 20
+# Share of code submissions in an assignment
+CODE_SHARE = 0.3
+# p50 slowdown (new / baseline) reported as a regression by --compare
+REGRESSION_TOLERANCE = 1.2
+
+# Variants of a prose submission and how often they occur
+PROSE_VARIANTS = [('copy', 0.1), ('edited', 0.3), ('mixed', 0.2), ('original', 0.4)]
+CODE_VARIANTS = [('copy', 0.2), ('renamed', 0.4), ('mixed', 0.4)]
+
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+IDENTIFIER = re.compile(r'\b[A-Za-z_][A-Za-z0-9_]{2,}\b')
+
+
+def fixture_documents():
+    """Texts of the .docx fixtures and of the documents create_test_files.py writes"""
+    from app import read_file_content
+    import create_test_files
+
+    paths = sorted(glob.glob(os.path.join(ROOT, '*.docx')))
+    texts = {}
+    with tempfile.TemporaryDirectory() as folder:
+        cwd = os.getcwd()
+        os.chdir(folder)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                for create in (create_test_files.create_original_assignment,
+                               create_test_files.create_plagiarized_assignment,
+                               create_test_files.create_completely_different_assignment):
+                    create()
+            generated = sorted(glob.glob(os.path.join(folder, '*.docx')))
+            for path in paths + generated:
+                text = read_file_content(path)
+                if text and '[WORD EXTRACTED TEXT]' in text:
+                    texts.setdefault(text, os.path.basename(path))
+        finally:
+            os.chdir(cwd)
+    return [text for text in texts]
+
+
+def code_samples():
+    """Source files of the Dolos samples"""
+    samples = []
+    for path in sorted(glob.glob(os.path.join(ROOT, 'dolos-main', 'samples', '**', '*'), recursive=True)):
+        if os.path.isfile(path) and not path.endswith('.md'):
+            with open(path, encoding='utf-8', errors='replace') as f:
+                text = f.read()
+            if len(text.strip()) > 10:
+                samples.append((os.path.basename(path), text))
+    return samples
+
+
+def choose(rng, variants):
+    names, weights = zip(*variants)
+    return rng.choices(names, weights=weights)[0]
+
+
+class CorpusBuilder:
+    """Deterministic synthetic submissions derived from the fixture documents and code samples."""
+
+    def __init__(self, prose, code, seed=0):
+        self.prose = prose
+        self.code = code
+        self.sentences = [sentence for text in prose for sentence in SENTENCE_END.split(text) if len(sentence) > 20]
+        self.vocabulary = sorted({word for text in prose for word in re.findall(r'[a-z]{4,}', text.lower())})
+        self.rng = random.Random(seed)
+
+    def essay(self, words):
+        """An original essay of about this many words: bank sentences in a fresh order and grouping"""
+        paragraphs, paragraph, count = [], [], 0
+        while count < words:
+            sentence = self.rng.choice(self.sentences)
+            paragraph.append(sentence)
+            count += len(sentence.split())
+            if len(paragraph) >= self.rng.randint(3, 6):
+                paragraphs.append(' '.join(paragraph))
+                paragraph = []
+        if paragraph:
+            paragraphs.append(' '.join(paragraph))
+        return '\n\n'.join(paragraphs)
+
+    def edited(self, text):
+        """Light rewrite: about 5% of the words replaced, some sentences dropped or repeated"""
+        words = text.split(' ')
+        for i in self.rng.sample(range(len(words)), len(words) // 20):
+            words[i] = self.rng.choice(self.vocabulary)
+        sentences = SENTENCE_END.split(' '.join(words))
+        kept = [s for s in sentences if self.rng.random() > 0.1]
+        kept += self.rng.sample(sentences, min(2, len(sentences)))
+        return ' '.join(kept)
+
+    def prose_submission(self):
+        base = self.rng.choice(self.prose)
+        # Long-tailed lengths: most essays a few hundred words, some several thousand
+        words = int(min(20000, self.rng.lognormvariate(6.2, 0.7)))
+        variant = choose(self.rng, PROSE_VARIANTS)
+        if variant == 'copy':
+            return variant, base
+        if variant == 'edited':
+            return variant, self.edited(base + '\n\n' + self.essay(max(0, words - len(base.split()))))
+        if variant == 'mixed':
+            other = self.rng.choice(self.prose)
+            half = lambda text: '\n\n'.join(text.split('\n\n')[:max(1, text.count('\n\n') // 2)])
+            return variant, half(base) + '\n\n' + half(other) + '\n\n' + self.essay(words // 3)
+        return variant, self.essay(words)
+
+    def code_submission(self):
+        name, base = self.rng.choice(self.code)
+        variant = choose(self.rng, CODE_VARIANTS)
+        if variant == 'copy':
+            return variant, name, base
+        if variant == 'renamed':
+            identifiers = sorted(set(IDENTIFIER.findall(base)))
+            renames = {word: f'{word}_{self.rng.randint(0, 99)}' for word in self.rng.sample(
+                identifiers, len(identifiers) // 3)}
+            return variant, name, IDENTIFIER.sub(lambda m: renames.get(m.group(), m.group()), base)
+        _, other = self.rng.choice(self.code)
+        return variant, name, base + '\n\n' + other
+
+    def build(self, size):
+        """size submissions as dicts with file_name, variant and content"""
+        submissions = []
+        for i in range(size):
+            if self.code and self.rng.random() < CODE_SHARE:
+                variant, name, content = self.code_submission()
+                submissions.append({'file_name': f'{i:05d}_{name}', 'variant': variant, 'content': content})
+            else:
+                variant, content = self.prose_submission()
+                submissions.append({'file_name': f'{i:05d}_essay.txt', 'variant': variant, 'content': content})
+        return submissions
+
+
+def reset_peak_rss():
+    """Reset the kernel's peak RSS of this process; False where that is not supported"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def rss_mb():
+    """(current, peak) RSS in MB; the peak falls back to getrusage (never reset) without /proc"""
+    try:
+        with open('/proc/self/status') as f:
+            status = f.read()
+        current = int(re.search(r'VmRSS:\s+(\d+)', status).group(1))
+        peak = int(re.search(r'VmHWM:\s+(\d+)', status).group(1))
+        return current / 1024, peak / 1024
+    except (OSError, AttributeError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak = peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+        return peak, peak
+
+
+class MethodTimer:
+    """Latencies and peak RSS of one method over the checks of one corpus size"""
+
+    def __init__(self):
+        self.latencies = []
+        self.peak_rss = 0.0
+        self.rss_growth = 0.0
+
+    @contextlib.contextmanager
+    def measure(self):
+        reset_peak_rss()
+        before, _ = rss_mb()
+        started = time.perf_counter()
+        yield
+        self.latencies.append((time.perf_counter() - started) * 1000)
+        _, peak = rss_mb()
+        self.peak_rss = max(self.peak_rss, peak)
+        self.rss_growth = max(self.rss_growth, peak - before)
+
+    def summary(self, peers):
+        latencies = np.array(self.latencies)
+        mean = float(latencies.mean())
+        return {
+            'checks': len(latencies),
+            'mean_ms': round(mean, 3),
+            'p50_ms': round(float(np.percentile(latencies, 50)), 3),
+            'p99_ms': round(float(np.percentile(latencies, 99)), 3),
+            'max_ms': round(float(latencies.max()), 3),
+            'checks_per_second': round(1000 / mean, 3) if mean else None,
+            'pairs_per_second': round(1000 * peers / mean, 1) if mean else None,
+            'peak_rss_mb': round(self.peak_rss, 1),
+            'rss_growth_mb': round(self.rss_growth, 1),
+        }
+
+
+def benchmark_size(submissions, checks, rng):
+    """Time checks of sampled submissions against all the others, per method and combined"""
+    from types import SimpleNamespace
+    from app import (
+        calculate_tfidf_similarity, calculate_semantic_similarity, calculate_fingerprint_similarity,
+        calculate_phrase_similarity, calculate_structure_similarity, calculate_local_plagiarism_result
+    )
+    from text_preprocessing import preprocess_documents
+
+    methods = {
+        'tfidf': calculate_tfidf_similarity,
+        'semantic': calculate_semantic_similarity,
+        'fingerprint': calculate_fingerprint_similarity,
+        'phrase': calculate_phrase_similarity,
+        'structure': calculate_structure_similarity,
+    }
+    timers = {name: MethodTimer() for name in ['preprocess'] + list(methods) + ['combined']}
+    contents = [submission['content'] for submission in submissions]
+    checked = sorted(rng.sample(range(len(submissions)), min(checks, len(submissions))))
+    tokens = []
+
+    for i in checked:
+        others = contents[:i] + contents[i + 1:]
+        # Every method on every peer, from freshly preprocessed documents as in a single check
+        with timers['preprocess'].measure():
+            documents = preprocess_documents([contents[i]] + others)
+        tokens.append(len(documents[0]))
+        with contextlib.redirect_stdout(io.StringIO()):
+            for name, calculate in methods.items():
+                with timers[name].measure():
+                    calculate(documents)
+        del documents
+
+        # The production local check: preprocessing, cascade and weighting
+        peers = [SimpleNamespace(content=other) for other in others]
+        with contextlib.redirect_stdout(io.StringIO()):
+            with timers['combined'].measure():
+                calculate_local_plagiarism_result(contents[i], peers)
+
+    return {
+        'submissions': len(submissions),
+        'checks': len(checked),
+        'mean_tokens_checked': round(float(np.mean(tokens)), 1),
+        'mean_words_corpus': round(float(np.mean([len(content.split()) for content in contents])), 1),
+        'variants': {variant: sum(1 for s in submissions if s['variant'] == variant)
+                     for variant in sorted({s['variant'] for s in submissions})},
+        'methods': {name: timer.summary(len(submissions) - 1) for name, timer in timers.items()},
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True,
+                              timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_benchmark(sizes=DEFAULT_SIZES, checks=DEFAULT_CHECKS, seed=0, verbose=True):
+    """Benchmark results for every corpus size as a JSON-serializable dict"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        from app import PLAGIARISM_ENGINE_VERSION
+    prose = fixture_documents()
+    code = code_samples()
+    if not prose:
+        raise RuntimeError("No .docx fixtures could be read")
+
+    results = []
+    for size in sizes:
+        # Each size gets its own seeded corpus, so a size benchmarks the same documents in every run
+        submissions = CorpusBuilder(prose, code, seed=seed + size).build(size)
+        started = time.perf_counter()
+        result = benchmark_size(submissions, checks, random.Random(seed + size))
+        result['elapsed_seconds'] = round(time.perf_counter() - started, 2)
+        results.append(result)
+        if verbose:
+            print_size(result)
+
+    return {
+        'engine_version': PLAGIARISM_ENGINE_VERSION,
+        'git_commit': git_commit(),
+        'created_at': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'seed': seed,
+        'peak_rss_reset': reset_peak_rss(),
+        'corpus': {'prose_documents': len(prose), 'code_samples': len(code), 'code_share': CODE_SHARE},
+        'results': results,
+    }
+
+
+def print_size(result):
+    print(f"\n📊 {result['submissions']} submissions, {result['checks']} checks "
+          f"({result['mean_words_corpus']} words on average, {result['elapsed_seconds']}s)")
+    print(f"   {'method':<12}{'p50 ms':>11}{'p99 ms':>11}{'checks/s':>11}{'pairs/s':>12}{'peak RSS MB':>13}")
+    for name, stats in result['methods'].items():
+        print(f"   {name:<12}{stats['p50_ms']:>11.2f}{stats['p99_ms']:>11.2f}{stats['checks_per_second']:>11.2f}"
+              f"{stats['pairs_per_second']:>12.0f}{stats['peak_rss_mb']:>13.1f}")
+
+
+def compare_results(current, baseline, tolerance=REGRESSION_TOLERANCE):
+    """(size, method, baseline p50, current p50, ratio) of every method slower than tolerance x baseline"""
+    regressions = []
+    previous = {result['submissions']: result for result in baseline.get('results', [])}
+    for result in current['results']:
+        old = previous.get(result['submissions'])
+        if not old:
+            continue
+        for name, stats in result['methods'].items():
+            old_stats = old['methods'].get(name)
+            if old_stats and old_stats['p50_ms'] > 0:
+                ratio = stats['p50_ms'] / old_stats['p50_ms']
+                if ratio > tolerance:
+                    regressions.append((result['submissions'], name, old_stats['p50_ms'], stats['p50_ms'], ratio))
+    return regressions
+
+
+def main():
+    """Run the benchmark from the command line"""
+    parser = argparse.ArgumentParser(description="Benchmark the local plagiarism engine")
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help="comma separated submission counts")
+    parser.add_argument('--checks', type=int, default=DEFAULT_CHECKS, help="checked submissions per size")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='benchmark_results.json', help="JSON results file")
+    parser.add_argument('--compare', help="earlier results file to report p50 regressions against")
+    parser.add_argument('--tolerance', type=float, default=REGRESSION_TOLERANCE,
+                        help="p50 slowdown ratio reported as a regression")
+    args = parser.parse_args()
+
+    print("🧪 PLAGIARISM ENGINE BENCHMARK")
+    print("=" * 60)
+    report = run_benchmark([int(size) for size in args.sizes.split(',')], args.checks, args.seed)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Results written to {args.output} (engine {report['engine_version']})")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare_results(report, baseline, args.tolerance)
+        print(f"\n🔍 Compared with {args.compare} (engine {baseline.get('engine_version')})")
+        for size, name, old, new, ratio in regressions:
+            print(f"   ❌ {size} submissions, {name}: p50 {old:.2f}ms -> {new:.2f}ms ({ratio:.2f}x)")
+        if regressions:
+            return 1
+        print("   ✅ No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
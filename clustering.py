@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Clustering of plagiarism pairs for the E-Assignment plagiarism engine
+Union-find over the pairs scoring above a threshold, so a group of students
+sharing one source shows up as one group instead of many pairwise matches.
+"""
+
+from typing import Dict, Hashable, Iterable, List, Tuple
+
+
+class UnionFind:
+    """
+    Disjoint sets with path halving and union by size.
+
+    Any sequence of n unions and finds costs O(n α(n)), near-linear in the number
+    of edges.
+    """
+
+    def __init__(self):
+        self.parent: Dict[Hashable, Hashable] = {}
+        self.size: Dict[Hashable, int] = {}
+
+    def add(self, item: Hashable):
+        """Start a singleton set for item, if it has none yet."""
+        if item not in self.parent:
+            self.parent[item] = item
+            self.size[item] = 1
+
+    def find(self, item: Hashable) -> Hashable:
+        """Representative of item's set."""
+        self.add(item)
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def union(self, a: Hashable, b: Hashable) -> Hashable:
+        """Merge the sets of a and b, returns the new representative."""
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return root_a
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size.pop(root_b)
+        return root_a
+
+    def groups(self, min_size: int = 1) -> List[List[Hashable]]:
+        """All sets with at least min_size members."""
+        members: Dict[Hashable, List[Hashable]] = {}
+        for item in self.parent:
+            members.setdefault(self.find(item), []).append(item)
+        return [group for group in members.values() if len(group) >= min_size]
+
+
+def cluster_pairs(edges: Iterable[Tuple[Hashable, Hashable, float]], threshold: float,
+                  min_size: int = 2) -> List[Tuple[List[Hashable], float]]:
+    """
+    Groups of items connected by pairs scoring at least threshold.
+
+    Args:
+        edges: (a, b, score) pairs, each pair once
+        threshold: minimum score of a pair to join its items
+
+    Returns:
+        (members, highest pair score inside the group) per group, largest groups first
+    """
+    sets = UnionFind()
+    best: Dict[Hashable, float] = {}
+    for a, b, score in edges:
+        if score < threshold:
+            continue
+        root = sets.union(a, b)
+        best[root] = max(best.get(root, 0.0), score)
+    # Scores were recorded under the representative at the time, collect per final set
+    scores: Dict[Hashable, float] = {}
+    for item, score in best.items():
+        root = sets.find(item)
+        scores[root] = max(scores.get(root, 0.0), score)
+
+    groups = [(sorted(group), scores.get(sets.find(group[0]), 0.0)) for group in sets.groups(min_size)]
+    groups.sort(key=lambda group: (-len(group[0]), -group[1]))
+    return groups
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Code-aware tokenization for the E-Assignment plagiarism engine
+A small regex lexer per language family that turns source code into normalized
+token streams: comments dropped, identifiers and literals abstracted, keywords
+and operators kept. Renaming variables or changing strings and numbers therefore
+leaves the stream (and its fingerprints) unchanged. Runs in-process, unlike the
+Node based Dolos integration.
+"""
+
+import keyword
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+from fingerprinting import Fingerprint, hash_token, winnow
+
+# Code tokens are much finer than words (every bracket is a token), so longer
+# k-grams are needed before a shared fingerprint means shared code
+CODE_KGRAM_LENGTH = 12
+CODE_WINDOW_SIZE = 8
+
+# Abstract tokens for identifiers and literals
+IDENTIFIER = 'ID'
+STRING = 'STR'
+NUMBER = 'NUM'
+
+LANGUAGE_EXTENSIONS = {
+    'python': ['py', 'pyw', 'pyi', 'pyx'],
+    'c': ['c', 'h'],
+    'cpp': ['cpp', 'cc', 'cxx', 'hpp'],
+    'java': ['java'],
+    'javascript': ['js', 'jsx', 'mjs'],
+    'typescript': ['ts', 'tsx'],
+    'csharp': ['cs'],
+    'go': ['go'],
+    'rust': ['rs'],
+    'php': ['php'],
+    'ruby': ['rb'],
+    'kotlin': ['kt'],
+    'swift': ['swift'],
+    'scala': ['scala'],
+    'shell': ['sh'],
+    'r': ['r'],
+    'sql': ['sql'],
+}
+EXTENSION_LANGUAGES = {
+    extension: language for language, extensions in LANGUAGE_EXTENSIONS.items() for extension in extensions
+}
+
+_C_KEYWORDS = (
+    'auto break case char const continue default do double else enum extern float for goto if int long '
+    'register return short signed sizeof static struct switch typedef union unsigned void volatile while '
+    'bool true false inline'
+)
+_CPP_KEYWORDS = _C_KEYWORDS + (
+    ' class namespace template typename public private protected virtual new delete this try catch throw '
+    'using operator friend nullptr auto const_cast static_cast dynamic_cast override'
+)
+_JAVA_KEYWORDS = (
+    'abstract assert boolean break byte case catch char class const continue default do double else enum '
+    'extends final finally float for if implements import instanceof int interface long native new package '
+    'private protected public return short static super switch synchronized this throw throws try void '
+    'volatile while true false null var record'
+)
+_JAVASCRIPT_KEYWORDS = (
+    'async await break case catch class const continue debugger default delete do else export extends '
+    'finally for from function if import in instanceof let new of return super switch this throw try '
+    'typeof var void while with yield true false null undefined'
+)
+_TYPESCRIPT_KEYWORDS = _JAVASCRIPT_KEYWORDS + (
+    ' interface type enum implements private protected public readonly abstract as any number string '
+    'boolean namespace declare'
+)
+_CSHARP_KEYWORDS = _JAVA_KEYWORDS + ' namespace using struct foreach in out ref string object bool async await'
+_GO_KEYWORDS = (
+    'break case chan const continue default defer else fallthrough for func go goto if import interface '
+    'map package range return select struct switch type var true false nil'
+)
+_RUST_KEYWORDS = (
+    'as break const continue crate else enum extern false fn for if impl in let loop match mod move mut pub '
+    'ref return self Self static struct super trait true type unsafe use where while async await dyn'
+)
+_PHP_KEYWORDS = (
+    'abstract and array as break case catch class clone const continue declare default do echo else elseif '
+    'empty extends final finally for foreach function global if implements include interface isset list '
+    'namespace new or print private protected public require return static switch throw trait try unset '
+    'use var while true false null'
+)
+_RUBY_KEYWORDS = (
+    'alias and begin break case class def defined do else elsif end ensure false for if in module next nil '
+    'not or redo rescue retry return self super then true undef unless until when while yield'
+)
+_KOTLIN_KEYWORDS = (
+    'as break class continue do else false for fun if in interface is null object package return super '
+    'this throw true try typealias val var when while override open private public protected data'
+)
+_SWIFT_KEYWORDS = (
+    'class deinit enum extension func import init let protocol struct subscript typealias var break case '
+    'continue default do else fallthrough for guard if in repeat return switch where while as catch false '
+    'is nil self super throw throws true try'
+)
+_SCALA_KEYWORDS = (
+    'abstract case catch class def do else extends false final finally for if implicit import lazy match '
+    'new null object override package private protected return sealed super this throw trait try true '
+    'type val var while with yield'
+)
+_SHELL_KEYWORDS = 'if then else elif fi case esac for while until do done in function select return local export'
+_R_KEYWORDS = 'if else repeat while function for in next break TRUE FALSE NULL Inf NaN NA return'
+_SQL_KEYWORDS = (
+    'select from where insert into values update set delete create table drop alter add primary key foreign '
+    'references join inner left right outer on group by order having limit offset as and or not null is in '
+    'like between distinct union all exists case when then else end count sum avg min max index view'
+)
+
+# (keywords, line comment, block comment (start, end) or None, extra string delimiters, case insensitive)
+_LANGUAGES = {
+    'python': (' '.join(keyword.kwlist), '#', None, ['"""', "'''"], False),
+    'c': (_C_KEYWORDS, '//', ('/*', '*/'), [], False),
+    'cpp': (_CPP_KEYWORDS, '//', ('/*', '*/'), [], False),
+    'java': (_JAVA_KEYWORDS, '//', ('/*', '*/'), ['"""'], False),
+    'javascript': (_JAVASCRIPT_KEYWORDS, '//', ('/*', '*/'), ['`'], False),
+    'typescript': (_TYPESCRIPT_KEYWORDS, '//', ('/*', '*/'), ['`'], False),
+    'csharp': (_CSHARP_KEYWORDS, '//', ('/*', '*/'), [], False),
+    'go': (_GO_KEYWORDS, '//', ('/*', '*/'), ['`'], False),
+    'rust': (_RUST_KEYWORDS, '//', ('/*', '*/'), [], False),
+    'php': (_PHP_KEYWORDS, '//|#', ('/*', '*/'), [], True),
+    'ruby': (_RUBY_KEYWORDS, '#', ('=begin', '=end'), [], False),
+    'kotlin': (_KOTLIN_KEYWORDS, '//', ('/*', '*/'), ['"""'], False),
+    'swift': (_SWIFT_KEYWORDS, '//', ('/*', '*/'), ['"""'], False),
+    'scala': (_SCALA_KEYWORDS, '//', ('/*', '*/'), ['"""'], False),
+    'shell': (_SHELL_KEYWORDS, '#', None, [], False),
+    'r': (_R_KEYWORDS, '#', None, [], False),
+    'sql': (_SQL_KEYWORDS, '--', ('/*', '*/'), [], True),
+}
+
+_LEXERS: Dict[str, Tuple[re.Pattern, frozenset, bool]] = {}
+
+
+def _lexer(language: str) -> Tuple[re.Pattern, frozenset, bool]:
+    """Compiled master pattern, keyword set and case flag of a language."""
+    if language not in _LEXERS:
+        keywords, line_comment, block_comment, delimiters, case_insensitive = _LANGUAGES[language]
+        comments = [f'(?:{line_comment})[^\\n]*']
+        if block_comment:
+            comments.append(re.escape(block_comment[0]) + r'[\s\S]*?(?:' + re.escape(block_comment[1]) + r'|\Z)')
+        strings = [re.escape(delimiter) + r'[\s\S]*?(?:' + re.escape(delimiter) + r'|\Z)' for delimiter in delimiters]
+        strings += [r'"(?:[^"\\\n]|\\.)*"?', r"'(?:[^'\\\n]|\\.)*'?"]
+        pattern = re.compile(
+            f"(?P<comment>{'|'.join(comments)})"
+            f"|(?P<string>{'|'.join(strings)})"
+            r"|(?P<number>\b\d[\w.]*|\.\d[\w]*)"
+            r"|(?P<word>[^\W\d]\w*)"
+            r"|(?P<operator>[^\w\s])"
+        )
+        words = keywords.lower().split() if case_insensitive else keywords.split()
+        _LEXERS[language] = (pattern, frozenset(words), case_insensitive)
+    return _LEXERS[language]
+
+
+def language_for_file(filename: Optional[str]) -> Optional[str]:
+    """Programming language of a file name by its extension, None for prose and unknown types."""
+    if not filename or '.' not in filename:
+        return None
+    return EXTENSION_LANGUAGES.get(os.path.basename(filename).rsplit('.', 1)[1].lower())
+
+
+def tokenize_code(text: str, language: str) -> Tuple[List[str], List[Tuple[int, int]]]:
+    """
+    Normalized token stream of source code.
+
+    Comments are dropped, identifiers become ID, string literals STR and numbers
+    NUM; keywords and operators are kept as written (lowercased for SQL and PHP).
+
+    Returns:
+        Tuple of (tokens, character spans of each token in the original text),
+        like fingerprinting.tokenize
+    """
+    if not text:
+        return [], []
+
+    pattern, keywords, case_insensitive = _lexer(language)
+    tokens = []
+    spans = []
+    for match in pattern.finditer(text):
+        kind = match.lastgroup
+        if kind == 'comment':
+            continue
+        if kind == 'string':
+            token = STRING
+        elif kind == 'number':
+            token = NUMBER
+        elif kind == 'word':
+            word = match.group().lower() if case_insensitive else match.group()
+            token = word if word in keywords else IDENTIFIER
+        else:
+            token = match.group()
+        tokens.append(token)
+        spans.append(match.span())
+    return tokens, spans
+
+
+def compute_code_fingerprints(text: str, language: str, k: int = CODE_KGRAM_LENGTH,
+                              window_size: int = CODE_WINDOW_SIZE) -> List[Fingerprint]:
+    """Tokenize, hash and winnow source code, like fingerprinting.compute_fingerprints for text."""
+    tokens, spans = tokenize_code(text, language)
+    hashes = {token: hash_token(token) for token in set(tokens)}
+    return winnow([hashes[token] for token in tokens], spans, k, window_size)
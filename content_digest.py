@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Content digests for duplicate detection in the E-Assignment plagiarism engine
+Uploads are hashed while they are written to disk. Text is hashed with every run
+of whitespace collapsed to one space and the ends stripped, so a copy that only
+differs in line endings, indentation or spacing has the same SHA-256 as the
+original and is found with one indexed lookup at submit time. Text too short for
+the plagiarism checks to compare (empty files, image-only PDFs) gets no digest,
+so such uploads never match each other.
+"""
+
+import codecs
+import hashlib
+import re
+from typing import BinaryIO, Optional, Tuple
+
+# Upload chunk size; the whole file is never held in memory
+CHUNK_SIZE = 64 * 1024
+# Normalized text of at most this many characters gets no digest (the peer filter skips it too)
+MIN_TEXT_LENGTH = 10
+
+WHITESPACE = re.compile(r'\s+')
+# Prefix read_file_content puts before text extracted from PDF, Word and ODT files
+EXTRACTED_TEXT_MARKER = re.compile(r'^\[[A-Z]+ EXTRACTED TEXT\]\n')
+
+
+class NormalizedHasher:
+    """
+    Streaming SHA-256 of text with whitespace runs collapsed to single spaces.
+
+    Text (or UTF-8 bytes) can be fed in chunks of any size; the digest equals
+    normalized_sha256 of the concatenated text wherever the chunks are cut, and
+    is None when that text is no longer than MIN_TEXT_LENGTH.
+    """
+
+    def __init__(self):
+        self.sha = hashlib.sha256()
+        self.decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self.pending_space = False  # whitespace seen since the last word
+        self.started = False        # any word written yet (leading whitespace is dropped)
+        self.length = 0             # characters hashed
+
+    def update_text(self, text: str):
+        for i, part in enumerate(WHITESPACE.split(text)):
+            if i > 0:
+                self.pending_space = True
+            if part:
+                if self.pending_space and self.started:
+                    self.sha.update(b' ')
+                    self.length += 1
+                self.sha.update(part.encode('utf-8', errors='replace'))
+                self.length += len(part)
+                self.started = True
+                self.pending_space = False
+
+    def update(self, data: bytes):
+        """Feed raw bytes, decoded as UTF-8 (invalid sequences are replaced, not dropped)."""
+        self.update_text(self.decoder.decode(data))
+
+    def hexdigest(self) -> Optional[str]:
+        self.update_text(self.decoder.decode(b'', final=True))
+        return self.sha.hexdigest() if self.length > MIN_TEXT_LENGTH else None
+
+
+def normalized_sha256(text: str) -> Optional[str]:
+    """SHA-256 of text with whitespace normalized and any extraction marker removed, None for too little text."""
+    hasher = NormalizedHasher()
+    hasher.update_text(EXTRACTED_TEXT_MARKER.sub('', text or ''))
+    return hasher.hexdigest()
+
+
+def save_upload(stream: BinaryIO, path: str, text: bool = True,
+                chunk_size: int = CHUNK_SIZE) -> Tuple[int, Optional[str]]:
+    """
+    Copy an upload to path in chunks, hashing it on the way; returns (size in bytes, SHA-256).
+
+    Text files get the whitespace-normalized digest (None when they hold too
+    little text), anything else (PDF, Word, archives) the digest of its raw bytes.
+    """
+    hasher = NormalizedHasher() if text else hashlib.sha256()
+    size = 0
+    with open(path, 'wb') as f:
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            f.write(chunk)
+            hasher.update(chunk)
+            size += len(chunk)
+    return size, hasher.hexdigest()
+
+
+def extracted_text_digest(content: Optional[str]) -> Optional[str]:
+    """Normalized digest of text extracted from a document, None when extraction produced too little text."""
+    if content and EXTRACTED_TEXT_MARKER.match(content):
+        return normalized_sha256(content)
+    return None
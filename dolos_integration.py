@@ -33,6 +33,7 @@ class DolosIntegration:
         self.dolos_path = dolos_path or os.path.join(os.getcwd(), "dolos-main")
         self.temp_dir = None
         self.node_available = self._check_node_availability()
+        self.installed = self._check_dolos_installation()
         
     def _check_node_availability(self) -> bool:
         """Check if Node.js is available on the system."""
@@ -58,9 +59,17 @@ class DolosIntegration:
         if not os.path.exists(package_json):
             logger.error(f"Dolos package.json not found: {package_json}")
             return False
+        
+        # The CLI must be built, otherwise every analysis fails in the subprocess
+        if not os.path.exists(self._cli_path()):
+            logger.error(f"Dolos CLI not built: {self._cli_path()}")
+            return False
             
         return True
     
+    def _cli_path(self) -> str:
+        return os.path.join(self.dolos_path, 'cli', 'dist', 'cli.js')
+    
     def _install_dolos_dependencies(self) -> bool:
         """Install Dolos dependencies using npm."""
         if not self.node_available:
@@ -190,7 +199,7 @@ class DolosIntegration:
             raise ValueError("Need at least 2 files for plagiarism analysis")
         
         # Build Dolos command
-        cmd = ['node', os.path.join(self.dolos_path, 'cli', 'dist', 'cli.js'), 'run']
+        cmd = ['node', self._cli_path(), 'run']
         
         # Add language if specified
         if language:
@@ -252,13 +261,14 @@ class DolosIntegration:
         Returns:
             Analysis results with plagiarism scores and details
         """
+        # Availability as last probed, see refresh_availability
         if not self.node_available:
             return {
                 "error": "Node.js not available",
                 "fallback": "Use local plagiarism detection instead"
             }
         
-        if not self._check_dolos_installation():
+        if not self.installed:
             return {
                 "error": "Dolos not properly installed",
                 "fallback": "Use local plagiarism detection instead"
@@ -369,9 +379,15 @@ class DolosIntegration:
             "sql", "html", "css", "bash", "powershell"
         ]
     
+    def refresh_availability(self) -> bool:
+        """Probe Node.js and the Dolos installation again and cache the result."""
+        self.node_available = self._check_node_availability()
+        self.installed = self._check_dolos_installation()
+        return self.is_available()
+    
     def is_available(self) -> bool:
-        """Check if Dolos integration is available."""
-        return self.node_available and self._check_dolos_installation()
+        """Check if Dolos integration is available (cached, see refresh_availability)."""
+        return self.node_available and self.installed
 
 
 def test_dolos_integration():
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Engine instrumentation for the E-Assignment plagiarism engine
+A CheckProfile records, for each stage of one check (text extraction,
+preprocessing and every similarity method), the wall time, tokens processed,
+peers compared and pruned and, when memory tracing is on, the peak Python
+allocation. Profiles are folded into process-wide log2 histograms so the stage
+that dominates at real document sizes can be read off without a profiler.
+"""
+
+import math
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional
+
+# Stages timed around the similarity methods
+EXTRACTION = 'extraction'
+PREPROCESS = 'preprocess'
+
+# Histogram buckets: 0, (0, 1], (1, 2], (2, 4], ... doubling; the last one is open-ended
+HISTOGRAM_BUCKETS = 40
+
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+
+
+def start_tracing():
+    """Start tracemalloc for a check; shared by concurrent checks, see stop_tracing."""
+    global _tracing_users
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _tracing_users += 1
+
+
+def stop_tracing():
+    global _tracing_users
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+class CheckProfile:
+    """
+    Stage metrics of one plagiarism check.
+
+    A stage may be measured several times (e.g. once per peer); wall times, tokens
+    and peer counts add up, the peak is the largest of the measurements. Peaks are
+    allocations above what was live when the measurement started; with checks
+    running concurrently in other threads they include those threads' allocations.
+    """
+
+    def __init__(self, trace_memory: bool = False):
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.trace_memory = trace_memory
+        self.started = time.perf_counter()
+        self.finished = None
+        if trace_memory:
+            start_tracing()
+
+    def stage(self, name: str) -> Dict[str, float]:
+        if name not in self.stages:
+            self.stages[name] = {'wall_ms': 0.0, 'tokens': 0, 'peers_compared': 0, 'peers_pruned': 0}
+            if self.trace_memory:
+                self.stages[name]['peak_kb'] = 0.0
+        return self.stages[name]
+
+    @contextmanager
+    def measure(self, name: str):
+        """Time a block (and its peak allocation when tracing) as part of a stage."""
+        stage = self.stage(name)
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        try:
+            yield stage
+        finally:
+            stage['wall_ms'] += (time.perf_counter() - started) * 1000
+            if tracing:
+                peak = (tracemalloc.get_traced_memory()[1] - baseline) / 1024
+                stage['peak_kb'] = max(stage['peak_kb'], peak)
+
+    def add_time(self, name: str, seconds: float):
+        """Add time measured by the caller, for loops too tight for measure()."""
+        self.stage(name)['wall_ms'] += seconds * 1000
+
+    def count(self, name: str, tokens: int = 0, compared: int = 0, pruned: int = 0):
+        stage = self.stage(name)
+        stage['tokens'] += tokens
+        stage['peers_compared'] += compared
+        stage['peers_pruned'] += pruned
+
+    def timings(self, methods: Iterable[str]) -> Dict[str, float]:
+        """Wall milliseconds of the given methods, as stored with plagiarism results."""
+        return {method: self.stage(method)['wall_ms'] for method in methods}
+
+    def finish(self):
+        """Stop memory tracing for this check; metrics stay readable."""
+        if self.finished is None:
+            self.finished = time.perf_counter()
+            if self.trace_memory:
+                stop_tracing()
+
+    def to_dict(self) -> Dict:
+        stages = {
+            name: {metric: round(value, 2) if isinstance(value, float) else value for metric, value in stage.items()}
+            for name, stage in self.stages.items()
+        }
+        end = self.finished if self.finished is not None else time.perf_counter()
+        return {
+            'stages': stages,
+            'total_ms': round((end - self.started) * 1000, 2),
+            'memory_traced': self.trace_memory,
+            'slowest_stage': max(stages, key=lambda name: stages[name]['wall_ms']) if stages else None,
+        }
+
+
+def bucket_index(value: float) -> int:
+    """Histogram bucket of a non-negative value, see HISTOGRAM_BUCKETS."""
+    if value <= 0:
+        return 0
+    return min(HISTOGRAM_BUCKETS - 1, 1 + max(0, math.ceil(math.log2(value))))
+
+
+def bucket_bound(index: int) -> float:
+    """Upper bound of a bucket (inf for the last one)."""
+    if index == 0:
+        return 0.0
+    return math.inf if index == HISTOGRAM_BUCKETS - 1 else float(2 ** (index - 1))
+
+
+class Histogram:
+    """Counts of values in power-of-two buckets, with count, sum and max."""
+
+    def __init__(self):
+        self.buckets = [0] * HISTOGRAM_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value: float):
+        self.buckets[bucket_index(value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (capped at the largest value seen)."""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(bucket_bound(index), self.max)
+        return self.max
+
+    def summary(self) -> Dict:
+        return {
+            'count': self.count,
+            'mean': round(self.total / self.count, 2) if self.count else 0.0,
+            'p50': round(self.quantile(0.5), 2),
+            'p95': round(self.quantile(0.95), 2),
+            'max': round(self.max, 2),
+            'buckets': [
+                {'le': bucket_bound(index) if index < HISTOGRAM_BUCKETS - 1 else 'inf', 'count': count}
+                for index, count in enumerate(self.buckets) if count
+            ],
+        }
+
+
+class EngineHistograms:
+    """Histograms of every stage metric over the checks run by this process."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms: Dict[str, Dict[str, Histogram]] = {}
+        self.checks = 0
+
+    def record(self, profile: CheckProfile):
+        with self.lock:
+            self.checks += 1
+            for name, stage in profile.stages.items():
+                histograms = self.histograms.setdefault(name, {})
+                for metric, value in stage.items():
+                    histograms.setdefault(metric, Histogram()).add(value)
+
+    def summary(self, stage: Optional[str] = None, metric: Optional[str] = None) -> Dict:
+        """Histogram summaries by stage and metric, optionally of one stage and/or metric."""
+        with self.lock:
+            return {
+                'checks': self.checks,
+                'stages': {
+                    name: {
+                        name_metric: histogram.summary() for name_metric, histogram in histograms.items()
+                        if metric is None or name_metric == metric
+                    }
+                    for name, histograms in self.histograms.items() if stage is None or name == stage
+                },
+            }
+
+    def reset(self):
+        with self.lock:
+            self.histograms = {}
+            self.checks = 0
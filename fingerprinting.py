@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+Fingerprinting for the E-Assignment plagiarism engine
+Rolling k-gram hashing, winnowing, a fingerprint index and matched fragments, modelled
+on the Dolos core (hashing/rollingHash.ts, hashing/winnowFilter.ts,
+algorithm/fingerprintIndex.ts, algorithm/fragment.ts and algorithm/pair.ts).
+"""
+
+import re
+import heapq
+import hashlib
+from array import array
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+
+# Same tokenization as the text based similarity methods in app.py
+TOKEN_PATTERN = re.compile(r'\w+')
+
+# k-gram length matches the 5-gram fingerprints the engine used before winnowing
+DEFAULT_KGRAM_LENGTH = 5
+# Every run of (k + window - 1) shared tokens is guaranteed to produce a shared fingerprint
+DEFAULT_WINDOW_SIZE = 4
+
+# Fingerprints repeated more often than this in one document (boilerplate, repeated
+# lines) are left out of fragments, which keeps paired occurrences linear in length
+MAX_FRAGMENT_OCCURRENCES = 8
+
+# Largest Mersenne prime below 2^63, so a hash always fits a signed 64-bit integer
+HASH_MOD = (1 << 61) - 1
+HASH_BASE = 4194301
+
+_MAX_HASH = HASH_MOD + 1
+
+# Odd multiplier for n-gram hashes computed with wrapping 64-bit arithmetic
+NGRAM_HASH_BASE = np.uint64(0x9E3779B97F4A7C15)
+
+
+class Fingerprint(NamedTuple):
+    """A selected k-gram hash and where it occurs in the document."""
+    hash: int
+    start: int        # index of the first token of the k-gram
+    stop: int         # index of the last token of the k-gram
+    char_start: int   # character offset of the first token
+    char_end: int     # character offset just past the last token
+
+
+class Fragment(NamedTuple):
+    """
+    A run of consecutive fingerprints shared by two documents.
+
+    Fingerprint ranges index the winnowed fingerprint lists (stop exclusive),
+    character ranges point into the original texts.
+    """
+    left_start: int
+    left_stop: int
+    right_start: int
+    right_stop: int
+    left_char_start: int
+    left_char_end: int
+    right_char_start: int
+    right_char_end: int
+    occurrences: int  # paired fingerprints merged into the fragment
+
+
+def iter_tokens(text: str) -> Iterator[Tuple[str, int, int]]:
+    """Lowercase word tokens of text with their character spans, one at a time."""
+    if not text:
+        return
+
+    lowered = text.lower()
+    # Lowercasing only changes lengths for a handful of exotic characters;
+    # spans must point into the original text so highlight offsets stay valid.
+    source = lowered if len(lowered) == len(text) else text
+
+    for match in TOKEN_PATTERN.finditer(source):
+        start, end = match.span()
+        yield match.group().lower(), start, end
+
+
+def tokenize(text: str) -> Tuple[List[str], List[Tuple[int, int]]]:
+    """
+    Split text into lowercase word tokens.
+
+    Returns:
+        Tuple of (tokens, character spans of each token in the original text)
+    """
+    tokens = []
+    spans = []
+    for token, start, end in iter_tokens(text):
+        tokens.append(token)
+        spans.append((start, end))
+    return tokens, spans
+
+
+def hash_token(token: str) -> int:
+    """Stable 64-bit token hash (Python's hash() is randomized per process)."""
+    digest = hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little') % HASH_MOD
+
+
+class RollingHash:
+    """
+    Rabin-Karp rolling hash over a sliding window of k token hashes.
+    """
+
+    def __init__(self, k: int, base: int = HASH_BASE, mod: int = HASH_MOD):
+        self.k = k
+        self.base = base
+        self.mod = mod
+        self.max_base = mod - pow(base, k, mod)
+        self.memory = [0] * k
+        self.i = 0
+        self.hash = 0
+
+    def next_hash(self, token: int) -> int:
+        """Add the next token hash and return the hash of the last k tokens."""
+        self.hash = (self.base * self.hash + token + self.max_base * self.memory[self.i]) % self.mod
+        self.memory[self.i] = token
+        self.i = (self.i + 1) % self.k
+        return self.hash
+
+
+def ngram_hashes(token_hashes: np.ndarray, min_length: int, max_length: int,
+                 starts: Optional[int] = None) -> np.ndarray:
+    """
+    64-bit polynomial hashes of every n-gram of token hashes, min_length <= n <= max_length.
+
+    Each length extends the hashes of the previous one by a token, so all lengths
+    together cost O(tokens * max_length) array operations. The length is folded into
+    the final hash so n-grams of different lengths never compare equal. With starts,
+    only n-grams starting at the first starts tokens are returned (the rest of the
+    array is the overlap with the next window of a longer stream).
+
+    Returns:
+        uint64 array with (tokens - n + 1) hashes per length n
+    """
+    token_hashes = np.asarray(token_hashes).astype(np.uint64)
+    hashes = []
+    current = token_hashes
+    with np.errstate(over='ignore'):
+        for length in range(1, min(max_length, len(token_hashes)) + 1):
+            if length > 1:
+                current = current[:-1] * NGRAM_HASH_BASE + token_hashes[length - 1:]
+            if length >= min_length:
+                hashes.append((current * NGRAM_HASH_BASE + np.uint64(length))[:starts])
+    if not hashes:
+        return np.zeros(0, dtype=np.uint64)
+    return np.concatenate(hashes)
+
+
+def winnow(token_hashes: List[int], spans: List[Tuple[int, int]],
+           k: int = DEFAULT_KGRAM_LENGTH, window_size: int = DEFAULT_WINDOW_SIZE) -> List[Fingerprint]:
+    """
+    Select fingerprints from a token hash stream using robust winnowing.
+
+    Port of the Dolos WinnowFilter, based on the pseudocode from
+    http://theory.stanford.edu/~aiken/publications/papers/sigmod03.pdf
+    """
+    rolling = RollingHash(k)
+    buffer = [_MAX_HASH] * window_size
+    buffer_pos = 0
+    min_pos = 0
+    file_pos = -k
+    fingerprints = []
+
+    def selected(position):
+        start = file_pos + _offset(position, buffer_pos, window_size)
+        stop = start + k - 1
+        return Fingerprint(buffer[position], start, stop, spans[start][0], spans[stop][1])
+
+    for token_hash in token_hashes:
+        file_pos += 1
+        if file_pos < 0:
+            rolling.next_hash(token_hash)
+            continue
+
+        buffer_pos = (buffer_pos + 1) % window_size
+        buffer[buffer_pos] = rolling.next_hash(token_hash)
+
+        if min_pos == buffer_pos:
+            # The previous minimum left the window, rescan for the rightmost minimum
+            i = (buffer_pos + 1) % window_size
+            while i != buffer_pos:
+                if buffer[i] <= buffer[min_pos]:
+                    min_pos = i
+                i = (i + 1) % window_size
+            fingerprints.append(selected(min_pos))
+        elif buffer[buffer_pos] <= buffer[min_pos]:
+            min_pos = buffer_pos
+            fingerprints.append(selected(min_pos))
+
+    return fingerprints
+
+
+def _offset(position: int, buffer_pos: int, window_size: int) -> int:
+    """Distance (<= 0) from the newest k-gram back to the k-gram at position."""
+    return -((buffer_pos - position) % window_size)
+
+
+def compute_fingerprints(text: str, k: int = DEFAULT_KGRAM_LENGTH,
+                         window_size: int = DEFAULT_WINDOW_SIZE) -> List[Fingerprint]:
+    """Tokenize, hash and winnow a document."""
+    tokens, spans = tokenize(text)
+    return winnow([hash_token(token) for token in tokens], spans, k, window_size)
+
+
+def pack_fingerprints(fingerprints: List[Fingerprint]) -> bytes:
+    """Serialize fingerprints into a compact binary blob for the database."""
+    packed = array('q')
+    for fingerprint in fingerprints:
+        packed.extend(fingerprint)
+    return packed.tobytes()
+
+
+def unpack_fingerprints(data: Optional[bytes]) -> List[Fingerprint]:
+    """Inverse of pack_fingerprints."""
+    if not data:
+        return []
+    packed = array('q')
+    packed.frombytes(data)
+    fields = len(Fingerprint._fields)
+    return [Fingerprint(*packed[i:i + fields]) for i in range(0, len(packed), fields)]
+
+
+class FingerprintIndex:
+    """
+    Inverted index of fingerprint hashes to the documents that contain them.
+
+    Comparing a document against every indexed document only walks the postings of
+    its own hashes, so no document is re-tokenized or re-hashed.
+    """
+
+    def __init__(self):
+        self.index: Dict[int, Set] = {}
+        self.hash_sets: Dict[object, Set[int]] = {}
+
+    def add(self, doc_id, fingerprints: Iterable[Fingerprint]):
+        """Add (or replace) the fingerprints of a document."""
+        if doc_id in self.hash_sets:
+            self.remove(doc_id)
+        hashes = {fingerprint.hash for fingerprint in fingerprints}
+        self.hash_sets[doc_id] = hashes
+        for fingerprint_hash in hashes:
+            self.index.setdefault(fingerprint_hash, set()).add(doc_id)
+
+    def remove(self, doc_id):
+        """Remove a document from the index."""
+        for fingerprint_hash in self.hash_sets.pop(doc_id, ()):
+            postings = self.index.get(fingerprint_hash)
+            if postings is not None:
+                postings.discard(doc_id)
+                if not postings:
+                    del self.index[fingerprint_hash]
+
+    def __contains__(self, doc_id) -> bool:
+        return doc_id in self.hash_sets
+
+    def __len__(self) -> int:
+        return len(self.hash_sets)
+
+    def shared_counts(self, hashes: Set[int], exclude=None) -> Dict[object, int]:
+        """Number of shared fingerprint hashes per indexed document."""
+        counts: Dict[object, int] = {}
+        for fingerprint_hash in hashes:
+            for doc_id in self.index.get(fingerprint_hash, ()):
+                if doc_id != exclude:
+                    counts[doc_id] = counts.get(doc_id, 0) + 1
+        return counts
+
+    def similarities(self, fingerprints: Iterable[Fingerprint], exclude=None) -> Dict[object, float]:
+        """Jaccard similarity (0-1) between the given fingerprints and every indexed document."""
+        hashes = {fingerprint.hash for fingerprint in fingerprints}
+        result = {doc_id: 0.0 for doc_id in self.hash_sets if doc_id != exclude}
+        for doc_id, shared in self.shared_counts(hashes, exclude).items():
+            union = len(hashes) + len(self.hash_sets[doc_id]) - shared
+            result[doc_id] = shared / union if union else 0.0
+        return result
+
+    def top_k(self, fingerprints: Iterable[Fingerprint], k: int, exclude=None) -> List[Tuple[object, float, int]]:
+        """The k indexed documents most similar to the given fingerprints, see top_k_by_shared."""
+        hashes = {fingerprint.hash for fingerprint in fingerprints}
+        shared = self.shared_counts(hashes, exclude)
+        return top_k_by_shared(len(hashes), shared, {doc_id: len(self.hash_sets[doc_id]) for doc_id in shared}, k)
+
+    def max_similarity(self, fingerprints: Iterable[Fingerprint], exclude=None) -> Tuple[Optional[object], float]:
+        """Best matching indexed document and its Jaccard similarity (0-1)."""
+        best_id, best = None, 0.0
+        for doc_id, similarity in self.similarities(fingerprints, exclude).items():
+            if best_id is None or similarity > best:
+                best_id, best = doc_id, similarity
+        return best_id, best
+
+
+def top_k_by_shared(hash_count: int, shared_counts: Dict[object, int], hash_counts: Dict[object, int],
+                    k: int) -> List[Tuple[object, float, int]]:
+    """
+    (doc id, Jaccard similarity 0-1, shared hashes) of the k most similar documents, best first.
+
+    shared_counts holds, per document, the number of hashes it shares with the query,
+    as accumulated from the postings of the query's hashes; hash_counts the number of
+    distinct hashes of each document. Documents sharing nothing never appear.
+    """
+    def similarity(doc_id):
+        union = hash_count + hash_counts.get(doc_id, 0) - shared_counts[doc_id]
+        return shared_counts[doc_id] / union if union > 0 else 0.0
+
+    best = heapq.nlargest(k, shared_counts, key=lambda doc_id: (similarity(doc_id), shared_counts[doc_id]))
+    return [(doc_id, similarity(doc_id), shared_counts[doc_id]) for doc_id in best]
+
+
+def build_fragments(left: List[Fingerprint], right: List[Fingerprint], minimum_occurrences: int = 1,
+                    max_occurrences: int = MAX_FRAGMENT_OCCURRENCES) -> List[Fragment]:
+    """
+    Matched fragments between two fingerprint lists, like Pair.buildFragments in Dolos.
+
+    A shared fingerprint pairs its occurrences in both documents; a pair extends the
+    fragment ending right before it in both lists. Walking the left list in order,
+    only the fragment ending at (i, j) can be extended by pair (i, j), so building
+    costs one dictionary lookup per paired occurrence. Hashes occurring more than
+    max_occurrences times in either document are skipped, so there are at most
+    max_occurrences pairs per fingerprint. Fragments contained in a bigger one on
+    both sides are then dropped.
+
+    Returns:
+        Fragments sorted by their position in the left document
+    """
+    positions: Dict[int, List[int]] = {}
+    for j, fingerprint in enumerate(right):
+        positions.setdefault(fingerprint.hash, []).append(j)
+    left_counts: Dict[int, int] = {}
+    for fingerprint in left:
+        left_counts[fingerprint.hash] = left_counts.get(fingerprint.hash, 0) + 1
+    positions = {
+        fingerprint_hash: right_positions for fingerprint_hash, right_positions in positions.items()
+        if len(right_positions) <= max_occurrences and left_counts.get(fingerprint_hash, 0) <= max_occurrences
+    }
+
+    # [left_start, left_stop, right_start, right_stop, char ranges..., occurrences]
+    fragments = []
+    ends: Dict[Tuple[int, int], list] = {}
+    for i, fingerprint in enumerate(left):
+        for j in positions.get(fingerprint.hash, ()):
+            other = right[j]
+            fragment = ends.pop((i, j), None)
+            if fragment is None:
+                fragment = [i, i + 1, j, j + 1, fingerprint.char_start, fingerprint.char_end,
+                            other.char_start, other.char_end, 1]
+                fragments.append(fragment)
+            else:
+                fragment[1], fragment[3] = i + 1, j + 1
+                fragment[4] = min(fragment[4], fingerprint.char_start)
+                fragment[5] = max(fragment[5], fingerprint.char_end)
+                fragment[6] = min(fragment[6], other.char_start)
+                fragment[7] = max(fragment[7], other.char_end)
+                fragment[8] += 1
+            ends[(i + 1, j + 1)] = fragment
+
+    kept = _squash(fragments)
+    return sorted(
+        (Fragment(*fragment) for fragment in kept if fragment[8] >= minimum_occurrences),
+        key=lambda fragment: (fragment.left_start, fragment.left_stop)
+    )
+
+
+def _squash(fragments: List[list]) -> List[list]:
+    """Drop fragments contained in a bigger one on both sides, in O(n log n) (Pair.squash)."""
+    by_start = sorted(fragments, key=lambda fragment: (fragment[0], fragment[1]))
+    by_end = sorted(by_start, key=lambda fragment: (fragment[1], fragment[0]))
+    seen, removed = set(), set()
+    j = 0
+    for started in by_start:
+        if id(started) in seen:
+            continue
+        # Fragments ending before this one ends and not yet visited start inside it
+        while by_end[j] is not started:
+            candidate = by_end[j]
+            seen.add(id(candidate))
+            if (started[0] <= candidate[0] and candidate[1] <= started[1]
+                    and started[2] <= candidate[2] and candidate[3] <= started[3]):
+                removed.add(id(candidate))
+            j += 1
+        j += 1
+    return [fragment for fragment in by_start if id(fragment) not in removed]
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+MinHash signatures and banded LSH for the E-Assignment plagiarism engine
+Estimates the fingerprint Jaccard similarity of two submissions from fixed size
+signatures, and finds candidate near-duplicates without comparing every pair.
+"""
+
+import hashlib
+import random
+from typing import Dict, Hashable, Iterable, List, Set
+
+import numpy as np
+
+# 128 hash functions in 32 bands of 4 rows: pairs with a Jaccard similarity of
+# about 0.42 or more become candidates with probability > 50%, 0.6 with > 98%
+DEFAULT_NUM_PERMUTATIONS = 128
+DEFAULT_BANDS = 32
+
+# Fixed seed, signatures are stored and must stay comparable across restarts
+MINHASH_SEED = 20240101
+
+EMPTY_SLOT = np.uint32(0xFFFFFFFF)
+
+# Hashes permuted at a time, bounds the temporaries to 128 x 16k uint64 (16 MB)
+CHUNK_SIZE = 16 * 1024
+
+
+def _hash_parameters(num_permutations: int, seed: int = MINHASH_SEED):
+    """Multipliers (odd) and offsets of the multiply-shift hash family."""
+    generator = random.Random(seed)
+    multipliers = np.array([generator.getrandbits(64) | 1 for _ in range(num_permutations)], dtype=np.uint64)
+    offsets = np.array([generator.getrandbits(64) for _ in range(num_permutations)], dtype=np.uint64)
+    return multipliers, offsets
+
+
+_PARAMETERS = {}
+
+
+def minhash_signature(hashes: Iterable[int], num_permutations: int = DEFAULT_NUM_PERMUTATIONS) -> np.ndarray:
+    """
+    MinHash signature of a set of 64-bit hashes (e.g. winnowed fingerprint hashes).
+
+    Returns:
+        uint32 array of num_permutations minima, all EMPTY_SLOT for an empty set
+    """
+    if num_permutations not in _PARAMETERS:
+        _PARAMETERS[num_permutations] = _hash_parameters(num_permutations)
+    multipliers, offsets = _PARAMETERS[num_permutations]
+
+    values = np.fromiter(set(hashes), dtype=np.uint64)
+    if len(values) == 0:
+        return np.full(num_permutations, EMPTY_SLOT, dtype=np.uint32)
+
+    # (a * x + b) mod 2^64, keep the high 32 bits; minima folded over chunks of the set
+    minima = np.full(num_permutations, np.iinfo(np.uint64).max, dtype=np.uint64)
+    for start in range(0, len(values), CHUNK_SIZE):
+        chunk = values[None, start:start + CHUNK_SIZE]
+        with np.errstate(over='ignore'):
+            hashed = (multipliers[:, None] * chunk + offsets[:, None]) >> np.uint64(32)
+        np.minimum(minima, hashed.min(axis=1), out=minima)
+    return minima.astype(np.uint32)
+
+
+def pack_signature(signature: np.ndarray) -> bytes:
+    """Serialize a signature for storage."""
+    return np.asarray(signature, dtype='<u4').tobytes()
+
+
+def unpack_signature(data: bytes) -> np.ndarray:
+    """Inverse of pack_signature."""
+    if not data:
+        return np.full(DEFAULT_NUM_PERMUTATIONS, EMPTY_SLOT, dtype=np.uint32)
+    return np.frombuffer(data, dtype='<u4').astype(np.uint32)
+
+
+def estimate_jaccard(signature_a: np.ndarray, signature_b: np.ndarray) -> float:
+    """Fraction of equal slots, an unbiased estimate of the Jaccard similarity (0-1)."""
+    if len(signature_a) != len(signature_b) or len(signature_a) == 0:
+        return 0.0
+    if (signature_a == EMPTY_SLOT).all() or (signature_b == EMPTY_SLOT).all():
+        return 0.0
+    return float((signature_a == signature_b).mean())
+
+
+def band_buckets(signature: np.ndarray, bands: int = DEFAULT_BANDS) -> List[int]:
+    """
+    One bucket key per band: a signed 64-bit hash of the band's rows.
+
+    Two signatures share a bucket in some band when all rows of that band agree.
+    Empty documents get no buckets, they would otherwise all collide.
+    """
+    if (signature == EMPTY_SLOT).all():
+        return []
+    rows = len(signature) // bands
+    buckets = []
+    for band in range(bands):
+        digest = hashlib.blake2b(np.asarray(signature[band * rows:(band + 1) * rows], dtype='<u4').tobytes(),
+                                 digest_size=8).digest()
+        buckets.append(int.from_bytes(digest, 'little', signed=True))
+    return buckets
+
+
+class LSHIndex:
+    """
+    In-memory banded LSH index over MinHash signatures.
+
+    Mirrors the band/bucket table the application persists, for use on corpora
+    that are not stored (e.g. benchmarks or one-off batches).
+    """
+
+    def __init__(self, bands: int = DEFAULT_BANDS):
+        self.bands = bands
+        self._buckets: List[Dict[int, Set[Hashable]]] = [{} for _ in range(bands)]
+        self._keys: Dict[Hashable, List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._keys
+
+    def add(self, key: Hashable, signature: np.ndarray):
+        """Index a signature under key, replacing any previous one."""
+        if key in self._keys:
+            self.remove(key)
+        buckets = band_buckets(signature, self.bands)
+        for band, bucket in enumerate(buckets):
+            self._buckets[band].setdefault(bucket, set()).add(key)
+        self._keys[key] = buckets
+
+    def remove(self, key: Hashable):
+        """Drop a key from the index."""
+        for band, bucket in enumerate(self._keys.pop(key, [])):
+            members = self._buckets[band].get(bucket)
+            if members is not None:
+                members.discard(key)
+                if not members:
+                    del self._buckets[band][bucket]
+
+    def candidates(self, signature: np.ndarray, exclude: Hashable = None) -> Set[Hashable]:
+        """Keys sharing at least one band bucket with the signature."""
+        found = set()
+        for band, bucket in enumerate(band_buckets(signature, self.bands)):
+            found.update(self._buckets[band].get(bucket, ()))
+        found.discard(exclude)
+        return found
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Pairwise similarity kernels of the E-Assignment plagiarism engine
+The per-pair semantic, phrase and structure comparisons on prepared document
+features. Kept free of Flask and the database so the parallel engine's worker
+processes can import them without loading the application.
+"""
+
+import numpy as np
+
+
+def shared_rows(main_contexts, other_contexts):
+    """Rows in both documents of the words they share, in the main document's first-use order"""
+    other_rows = other_contexts.lookup(main_contexts.words)
+    present = other_rows >= 0
+    return main_contexts.lookup(main_contexts.words[present]), other_rows[present]
+
+
+def entry_keys(contexts):
+    """(word id, context word id) of every stored count, packed into one sortable integer"""
+    return (np.repeat(contexts.rows, np.diff(contexts.counts.indptr)) << 32) | contexts.counts.indices
+
+
+def semantic_pair_similarity(main_contexts, other_contexts):
+    """Average context Jaccard similarity (0-1) of the words both documents use"""
+    main_rows, other_rows = shared_rows(main_contexts, other_contexts)
+    if len(main_rows) == 0:
+        return 0.0
+
+    # Jaccard similarity of contexts: sum of minimum counts over sum of maximum counts.
+    # Counts present in both documents are joined on their keys, so the cost follows the
+    # documents' own counts and not the size of the shared vocabulary
+    _, main_index, other_index = np.intersect1d(
+        entry_keys(main_contexts), entry_keys(other_contexts), assume_unique=True, return_indices=True
+    )
+    common = np.minimum(main_contexts.counts.data[main_index], other_contexts.counts.data[other_index])
+    owners = np.repeat(np.arange(len(main_contexts.rows)), np.diff(main_contexts.counts.indptr))[main_index]
+    intersection = np.bincount(owners, weights=common, minlength=len(main_contexts.rows))[main_rows]
+    union = main_contexts.sizes[main_rows] + other_contexts.sizes[other_rows] - intersection
+    ratios = np.divide(intersection, union, out=np.zeros(len(main_rows)), where=union > 0)
+
+    # Sequential sum, same rounding as adding word by word
+    return float(np.cumsum(ratios)[-1]) / len(main_rows)
+
+
+def phrase_pair_similarity(main_phrases, other_phrases):
+    """Share (0-1) of phrase occurrences two documents have in common"""
+    # Documents sampled under the memory budget are compared at the coarser of the two rates
+    rate = max(main_phrases.sample_rate, other_phrases.sample_rate)
+    main_phrases, other_phrases = main_phrases.at_rate(rate), other_phrases.at_rate(rate)
+    if main_phrases.total + other_phrases.total == 0:
+        return 0.0
+
+    # Calculate phrase overlap: sorted keys are merged, common occurrences are the smaller counts
+    _, main_index, other_index = np.intersect1d(
+        main_phrases.keys, other_phrases.keys, assume_unique=True, return_indices=True
+    )
+    common_phrases = int(np.minimum(main_phrases.counts[main_index], other_phrases.counts[other_index]).sum())
+    total_phrases = main_phrases.total + other_phrases.total - common_phrases
+
+    return common_phrases / total_phrases
+
+
+def structure_pair_similarity(main_structure, other_structure):
+    """Structural similarity (0-1) of two analyzed documents"""
+    similarities = []
+
+    # Compare ratios
+    if other_structure['avg_sentence_length'] > 0 and main_structure['avg_sentence_length'] > 0:
+        sent_sim = 1 - abs(main_structure['avg_sentence_length'] - other_structure['avg_sentence_length']) / max(main_structure['avg_sentence_length'], other_structure['avg_sentence_length'])
+        similarities.append(sent_sim)
+
+    if other_structure['avg_paragraph_length'] > 0 and main_structure['avg_paragraph_length'] > 0:
+        para_sim = 1 - abs(main_structure['avg_paragraph_length'] - other_structure['avg_paragraph_length']) / max(main_structure['avg_paragraph_length'], other_structure['avg_paragraph_length'])
+        similarities.append(para_sim)
+
+    if similarities:
+        return sum(similarities) / len(similarities)
+    return 0.0
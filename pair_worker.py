@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Worker side of the parallel all-pairs engine (see parallel_engine)
+Imported by the pool's worker processes, which start from a fresh interpreter:
+only numpy, scipy and the similarity kernels are loaded, never Flask, the
+database or the application, and nothing is inherited from the threads of the
+web server.
+"""
+
+from multiprocessing import shared_memory
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from ast_clones import Subtree, clone_similarity
+from pair_similarity import semantic_pair_similarity, phrase_pair_similarity, structure_pair_similarity
+from text_preprocessing import ContextMatrix, PhraseCounts
+
+# Methods computed pair by pair, in the order of the output matrix
+PAIRWISE_METHODS = ['semantic', 'phrase', 'structure']
+
+
+def attach_field(memory: shared_memory.SharedMemory, entry: Tuple) -> Tuple[np.ndarray, np.ndarray]:
+    """Views (values, offsets) of one field of a SharedArrays block, without copying."""
+    dtype, values_at, length, offsets_at, offsets_length = entry
+    values = np.ndarray((length,), dtype=np.dtype(dtype), buffer=memory.buf, offset=values_at)
+    offsets = np.ndarray((offsets_length,), dtype=np.int64, buffer=memory.buf, offset=offsets_at)
+    return values, offsets
+
+
+class _Job:
+    """A worker's attachment to one check's shared blocks, with features rebuilt lazily per document."""
+
+    def __init__(self, input_name: str, layout: Dict, output_name: str, n: int):
+        self.input = shared_memory.SharedMemory(name=input_name)
+        self.output = shared_memory.SharedMemory(name=output_name)
+        self.fields = {name: attach_field(self.input, entry) for name, entry in layout.items()}
+        self.matrices = np.ndarray((len(PAIRWISE_METHODS), n, n), dtype=np.float64, buffer=self.output.buf)
+        self.n = n
+        self.cache: Dict[int, Tuple] = {}
+
+    def field(self, name: str, i: int) -> np.ndarray:
+        values, offsets = self.fields[name]
+        return values[offsets[i]:offsets[i + 1]]
+
+    def features(self, i: int) -> Tuple:
+        """(contexts, phrases, structure, subtrees) of document i, built on views of the shared block."""
+        if i not in self.cache:
+            rows = self.field('context_rows', i)
+            counts = csr_matrix((self.field('context_data', i), self.field('context_indices', i),
+                                 self.field('context_indptr', i)),
+                                shape=(len(rows), int(self.field('context_width', i)[0])), copy=False)
+            contexts = ContextMatrix(counts, rows, self.field('context_words', i), self.field('context_sizes', i))
+            phrases = PhraseCounts(self.field('phrase_keys', i), self.field('phrase_counts', i),
+                                   int(self.field('phrase_total', i)[0]), int(self.field('phrase_rate', i)[0]))
+            sentence_length, paragraph_length = self.field('structure', i)
+            structure = {'avg_sentence_length': float(sentence_length), 'avg_paragraph_length': float(paragraph_length)}
+            subtrees = [Subtree(*row) for row in self.field('subtrees', i).reshape(-1, len(Subtree._fields)).tolist()]
+            self.cache[i] = (contexts, phrases, structure, subtrees or None)
+        return self.cache[i]
+
+    def close(self):
+        self.cache.clear()
+        self.fields.clear()
+        self.matrices = None
+        self.input.close()
+        self.output.close()
+
+
+_job: Optional[_Job] = None
+
+
+def score_rows(task: Tuple) -> int:
+    """Worker: score all pairs (i, j > i) of a row range into the shared output, returns the pair count."""
+    global _job
+    input_name, layout, output_name, n, start, stop = task
+    if _job is None or _job.input.name != input_name:
+        if _job is not None:
+            _job.close()
+        _job = _Job(input_name, layout, output_name, n)
+
+    semantic, phrase, structure = _job.matrices
+    pairs = 0
+    for i in range(start, stop):
+        contexts_i, phrases_i, structure_i, subtrees_i = _job.features(i)
+        for j in range(i + 1, n):
+            contexts_j, phrases_j, structure_j, subtrees_j = _job.features(j)
+            semantic[i, j] = semantic_pair_similarity(contexts_i, contexts_j) * 100
+            semantic[j, i] = semantic_pair_similarity(contexts_j, contexts_i) * 100
+            phrase[i, j] = phrase[j, i] = phrase_pair_similarity(phrases_i, phrases_j) * 100
+            if subtrees_i and subtrees_j:
+                value = clone_similarity(subtrees_i, subtrees_j)
+            else:
+                value = structure_pair_similarity(structure_i, structure_j)
+            structure[i, j] = structure[j, i] = value * 100
+            pairs += 1
+    return pairs
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Multi-process all-pairs engine for the E-Assignment plagiarism engine
+The per-pair methods (semantic, phrase, structure) dominate a full assignment
+re-check at O(N^2). Every document's feature arrays are published once in a
+multiprocessing.shared_memory block, the upper triangle of the pair space is
+split into row ranges of equal pair counts, and a persistent process pool fills
+a shared output matrix in place. Tasks carry only block names and row ranges,
+no document is pickled or copied per task. Workers are started from a fork
+server (spawned where there is none) and run pair_worker, so they never
+inherit the web server's threads or locks.
+"""
+
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ast_clones import Subtree
+from pair_worker import PAIRWISE_METHODS, attach_field, score_rows
+from text_preprocessing import ContextMatrix, PhraseCounts
+
+# Smaller tasks balance better between workers, larger ones cost fewer round trips
+TASKS_PER_WORKER = 4
+
+
+def default_workers() -> int:
+    """Worker processes to use: the cores available."""
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError:
+        return max(1, os.cpu_count() or 1)
+
+
+def pool_context():
+    """Start method for the workers: a fork server where available, never a fork of this process."""
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        # Workers are forked from a server that has the kernels imported already
+        context.set_forkserver_preload(['pair_worker'])
+        return context
+    return multiprocessing.get_context('spawn')
+
+
+class SharedArrays:
+    """
+    Ragged per-document numpy arrays packed into one shared memory block.
+
+    Every field is stored as the concatenation of its per-document arrays plus
+    an offsets array, so the layout is a handful of (dtype, offset, length)
+    entries however many documents there are.
+    """
+
+    def __init__(self, fields: Dict[str, List[np.ndarray]]):
+        layout = {}
+        size = 0
+        packed = {}
+        for name, arrays in fields.items():
+            dtype = np.result_type(*[array.dtype for array in arrays]) if arrays else np.dtype(np.int64)
+            lengths = np.array([array.size for array in arrays], dtype=np.int64)
+            offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+            values_at = size
+            size += int(offsets[-1]) * dtype.itemsize
+            size += -size % 8  # Keep every region 8-byte aligned
+            offsets_at = size
+            size += offsets.nbytes
+            layout[name] = (dtype.str, values_at, int(offsets[-1]), offsets_at, len(offsets))
+            packed[name] = (arrays, offsets)
+
+        self.memory = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        self.layout = layout
+        for name, (arrays, offsets) in packed.items():
+            values, offsets_view = attach_field(self.memory, layout[name])
+            offsets_view[:] = offsets
+            for array, start, stop in zip(arrays, offsets[:-1], offsets[1:]):
+                values[start:stop] = array.ravel()
+
+    @property
+    def name(self) -> str:
+        return self.memory.name
+
+    def close(self):
+        """Release and remove the block."""
+        self.memory.close()
+        self.memory.unlink()
+
+
+def partition_pairs(n: int, parts: int) -> List[Tuple[int, int]]:
+    """
+    Row ranges [start, stop) of the upper triangle (pairs i < j) with about equal pair counts.
+
+    Row i holds n - 1 - i pairs, so early ranges span fewer rows.
+    """
+    total = n * (n - 1) // 2
+    if total == 0:
+        return []
+    parts = max(1, min(parts, n - 1))
+    target = total / parts
+    ranges = []
+    start, covered = 0, 0
+    for i in range(n - 1):
+        covered += n - 1 - i
+        if covered >= target * (len(ranges) + 1) or i == n - 2:
+            ranges.append((start, i + 1))
+            start = i + 1
+    return ranges
+
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def get_pool(workers: int):
+    """The process pool of this process, started on first use and kept for later checks."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.terminate()
+            _pool = pool_context().Pool(workers)
+            _pool_workers = workers
+        return _pool
+
+
+@atexit.register
+def shutdown_pool():
+    """Stop the worker processes."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.terminate()
+            _pool = None
+
+
+def _feature_fields(contexts: List[ContextMatrix], phrases: List[PhraseCounts], structures: List[Dict],
+                    subtrees: List[Optional[List[Subtree]]]) -> Dict[str, List[np.ndarray]]:
+    return {
+        'context_data': [matrix.counts.data for matrix in contexts],
+        'context_indices': [matrix.counts.indices for matrix in contexts],
+        'context_indptr': [matrix.counts.indptr for matrix in contexts],
+        'context_rows': [matrix.rows for matrix in contexts],
+        'context_width': [np.array([matrix.counts.shape[1]], dtype=np.int64) for matrix in contexts],
+        'context_words': [matrix.words for matrix in contexts],
+        'context_sizes': [matrix.sizes for matrix in contexts],
+        'phrase_keys': [counts.keys for counts in phrases],
+        'phrase_counts': [counts.counts for counts in phrases],
+        'phrase_total': [np.array([counts.total], dtype=np.int64) for counts in phrases],
+        'phrase_rate': [np.array([counts.sample_rate], dtype=np.int64) for counts in phrases],
+        'structure': [
+            np.array([structure['avg_sentence_length'], structure['avg_paragraph_length']], dtype=np.float64)
+            for structure in structures
+        ],
+        'subtrees': [np.array(document_subtrees or [], dtype=np.int64).ravel() for document_subtrees in subtrees],
+    }
+
+
+def pairwise_matrices(contexts: List[ContextMatrix], phrases: List[PhraseCounts], structures: List[Dict],
+                      subtrees: Optional[List[Optional[List[Subtree]]]] = None,
+                      workers: Optional[int] = None, stats: Optional[Dict] = None) -> Dict[str, np.ndarray]:
+    """
+    Semantic, phrase and structure scores (0-100) of every ordered pair of documents.
+
+    Entry [i, j] equals the sequential computation of calculate_similarity_matrices
+    (Python pairs use AST clone similarity for structure). stats, when given, is
+    filled with the worker count, task count, pairs and elapsed milliseconds.
+    """
+    n = len(contexts)
+    workers = workers or default_workers()
+    if subtrees is None:
+        subtrees = [None] * n
+
+    started = time.perf_counter()
+    inputs = SharedArrays(_feature_fields(contexts, phrases, structures, subtrees))
+    output = shared_memory.SharedMemory(create=True, size=max(len(PAIRWISE_METHODS) * n * n * 8, 1))
+    try:
+        matrices = np.ndarray((len(PAIRWISE_METHODS), n, n), dtype=np.float64, buffer=output.buf)
+        matrices.fill(0.0)
+        tasks = [
+            (inputs.name, inputs.layout, output.name, n, start, stop)
+            for start, stop in partition_pairs(n, workers * TASKS_PER_WORKER)
+        ]
+        pairs = sum(get_pool(workers).imap_unordered(score_rows, tasks)) if tasks else 0
+        result = {method: matrices[k].copy() for k, method in enumerate(PAIRWISE_METHODS)}
+        del matrices
+    finally:
+        output.close()
+        output.unlink()
+        inputs.close()
+
+    if stats is not None:
+        stats.update({
+            'workers': workers,
+            'tasks': len(tasks),
+            'pairs': pairs,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 2)
+        })
+    return result
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Plagiarism backend registry for the E-Assignment plagiarism engine
+Every detection backend (Dolos, PlagiarismCheck.org, the local engine)
+is registered once with the kinds of files it handles and a health probe. Probes
+run off the request path (at startup and from the scheduler) and their result is
+cached, calls are timed, and a circuit breaker stops routing to a backend after
+repeated failures until a trial call succeeds again. Routing a check is then a
+few attribute reads: a broken backend costs nothing.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from code_tokenizer import language_for_file
+
+# Consecutive failures that open a backend's circuit
+FAILURE_THRESHOLD = 3
+# Seconds an open circuit rejects calls before one trial call is let through
+RESET_TIMEOUT = 60.0
+# Seconds a health probe result is trusted
+HEALTH_TTL = 300.0
+# Latest call durations kept per backend for latency statistics
+LATENCY_SAMPLES = 100
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+
+class BackendUnavailable(Exception):
+    """A backend failed, or was skipped because it is unhealthy or its circuit is open."""
+
+
+def file_kind(file_name: Optional[str]) -> Optional[str]:
+    """'code' or 'text' by file extension, None when the file name is unknown."""
+    if not file_name:
+        return None
+    return 'code' if language_for_file(file_name) else 'text'
+
+
+class CircuitBreaker:
+    """
+    Closed: calls pass. FAILURE_THRESHOLD consecutive failures open it; open, it
+    rejects calls until reset_timeout has passed, then lets one trial call through
+    (half open) which closes it on success and opens it again on failure.
+    """
+
+    def __init__(self, failure_threshold: int = FAILURE_THRESHOLD, reset_timeout: float = RESET_TIMEOUT,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+
+    def allow(self) -> bool:
+        """Whether a call may go through now (an expired open circuit lets one trial call through)."""
+        if self.state == CLOSED:
+            return True
+        # A trial granted but never made (another backend answered) is granted again after the timeout
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            self.state = HALF_OPEN
+            self.opened_at = self.clock()
+            return True
+        return False
+
+    def record_success(self):
+        self.state = CLOSED
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = OPEN
+            self.opened_at = self.clock()
+
+
+class Backend:
+    """One detection backend: the files it handles, its cached health and its call history."""
+
+    def __init__(self, name: str, role: str, kinds: Iterable[str], probe: Callable[[], bool],
+                 priority: int = 0, health_ttl: float = HEALTH_TTL, clock: Callable[[], float] = time.monotonic,
+                 **breaker_options):
+        self.name = name
+        self.role = role              # 'peer' compares with other submissions, 'web' with the internet
+        self.kinds = frozenset(kinds)  # file kinds handled, see file_kind
+        self.probe = probe
+        self.priority = priority      # lower is tried first
+        self.health_ttl = health_ttl
+        self.clock = clock
+        self.breaker = CircuitBreaker(clock=clock, **breaker_options)
+        self.lock = threading.Lock()
+        self.healthy = False
+        self.checked_at = None
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.calls = 0
+        self.errors = 0
+        self.last_error = None
+
+    def check_health(self) -> bool:
+        """Run the probe and cache its result; a raising probe counts as unhealthy."""
+        try:
+            healthy = bool(self.probe())
+        except Exception as e:
+            healthy = False
+            self.last_error = f'Health check failed: {e}'
+        with self.lock:
+            self.healthy = healthy
+            self.checked_at = self.clock()
+        return healthy
+
+    @property
+    def health_stale(self) -> bool:
+        return self.checked_at is None or self.clock() - self.checked_at >= self.health_ttl
+
+    def handles(self, kind: Optional[str]) -> bool:
+        return kind is None or kind in self.kinds
+
+    def allow(self) -> bool:
+        """Healthy by the cached probe and not cut off by the circuit breaker; never probes."""
+        with self.lock:
+            return self.healthy and self.breaker.allow()
+
+    def record(self, elapsed: float, error: Optional[str] = None):
+        with self.lock:
+            self.calls += 1
+            self.latencies.append(elapsed)
+            if error is None:
+                self.breaker.record_success()
+            else:
+                self.errors += 1
+                self.last_error = error
+                self.breaker.record_failure()
+
+    def status(self) -> Dict[str, Any]:
+        """Health, circuit and latency summary (milliseconds) for monitoring."""
+        with self.lock:
+            latencies = sorted(self.latencies)
+            status = {
+                'name': self.name,
+                'role': self.role,
+                'kinds': sorted(self.kinds),
+                'priority': self.priority,
+                'healthy': self.healthy,
+                'health_checked_seconds_ago': (
+                    None if self.checked_at is None else round(self.clock() - self.checked_at, 1)
+                ),
+                'circuit': self.breaker.state,
+                'consecutive_failures': self.breaker.failures,
+                'calls': self.calls,
+                'errors': self.errors,
+                'last_error': self.last_error,
+            }
+        if latencies:
+            status['latency_ms'] = {
+                'last': round(self.latencies[-1] * 1000, 2),
+                'mean': round(sum(latencies) / len(latencies) * 1000, 2),
+                'p50': round(latencies[len(latencies) // 2] * 1000, 2),
+                'p95': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 2),
+            }
+        return status
+
+
+class BackendRegistry:
+    """Backends by name, with routing by role and file kind."""
+
+    def __init__(self):
+        self.backends: Dict[str, Backend] = {}
+
+    def register(self, backend: Backend, check: bool = True) -> Backend:
+        """Add (or replace) a backend, probing it once unless check is False."""
+        self.backends[backend.name] = backend
+        if check:
+            backend.check_health()
+        return backend
+
+    def get(self, name: str) -> Optional[Backend]:
+        return self.backends.get(name)
+
+    def refresh_health(self, force: bool = False) -> Dict[str, bool]:
+        """Re-probe backends whose health result expired (all of them when force); meant for a background job."""
+        return {
+            name: backend.check_health() if force or backend.health_stale else backend.healthy
+            for name, backend in self.backends.items()
+        }
+
+    def route(self, role: str, file_name: Optional[str] = None) -> List[Backend]:
+        """Backends to try for a file, in order: usable ones of the role handling its kind, by priority then latency."""
+        kind = file_kind(file_name)
+        usable = [
+            backend for backend in self.backends.values()
+            if backend.role == role and backend.handles(kind) and backend.allow()
+        ]
+        return sorted(usable, key=lambda backend: (
+            backend.priority, sum(backend.latencies) / len(backend.latencies) if backend.latencies else 0.0
+        ))
+
+    def call(self, backend: Backend, func: Callable, *args, **kwargs):
+        """
+        Run func for a backend, timing it. An exception (BackendUnavailable for a
+        reported failure) is recorded against the backend's circuit and re-raised.
+        """
+        started = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            backend.record(time.perf_counter() - started, error=str(e) or type(e).__name__)
+            raise
+        backend.record(time.perf_counter() - started)
+        return result
+
+    def status(self) -> List[Dict[str, Any]]:
+        return [backend.status() for backend in sorted(self.backends.values(), key=lambda b: (b.role, b.priority))]
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Structured plagiarism check results for the E-Assignment plagiarism engine
+One object per check holding everything a report needs (per-method scores,
+weights, best matching peer and the regions copied from it, timings, engine
+version and content statistics), persisted as compact JSON so reports render
+without recomputing any method.
+"""
+
+import json
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+# Methods combined by the local engine, in reporting order, with their report labels
+METHOD_LABELS = {
+    'tfidf': ('TF-IDF Similarity', 'Word frequency analysis'),
+    'semantic': ('Semantic Similarity', 'Context and meaning'),
+    'fingerprint': ('Fingerprint Match', 'Content fingerprinting'),
+    'phrase': ('Phrase Overlap', 'Common phrases'),
+    'structure': ('Structure Similarity', 'Document structure'),
+}
+
+MODE_DESCRIPTIONS = {
+    'assignment': 'Assignment-wide analysis against {compared} submissions',
+    'incremental': 'Incremental analysis against {compared} submissions',
+    'duplicate': 'Identical content to an earlier submission, detected at upload',
+}
+
+
+def content_statistics(doc, common_words: int = 5) -> Dict:
+    """Word, character and sentence counts plus the most common words of a preprocessed document"""
+    return {
+        'words': doc.word_count,
+        'characters': len(doc.text),
+        'sentences': len([s for s in doc.text.split('.') if s.strip()]),
+        'common_words': [[word, count] for word, count in Counter(doc.tokens).most_common(common_words)],
+    }
+
+
+def fragment_ranges(fragments) -> List[List[int]]:
+    """Character ranges of matched fragments as stored: [start, end, match start, match end]"""
+    return [[fragment.left_char_start, fragment.left_char_end, fragment.right_char_start, fragment.right_char_end]
+            for fragment in fragments]
+
+
+def highlight_segments(text: str, ranges) -> List[Tuple[str, bool]]:
+    """Split text into (segment, matched) pieces for the given (start, end) character ranges"""
+    segments = []
+    position = 0
+    for start, end in sorted((max(0, start), min(len(text), end)) for start, end in ranges):
+        if end <= position:
+            continue
+        if start <= position and segments and segments[-1][1]:
+            # Overlaps the previous range, extend its segment
+            segments[-1] = (segments[-1][0] + text[position:end], True)
+        else:
+            start = max(start, position)
+            if start > position:
+                segments.append((text[position:start], False))
+            segments.append((text[start:end], True))
+        position = end
+    if position < len(text):
+        segments.append((text[position:], False))
+    return segments
+
+
+def risk_level(score: float) -> Tuple[str, str]:
+    """Risk heading and recommendation for an overall score (0-100)"""
+    if score >= 80:
+        return "🚨 HIGH RISK: Significant similarity detected", "Immediate review required"
+    if score >= 50:
+        return "⚠️  MEDIUM RISK: Moderate similarity detected", "Manual review recommended"
+    if score >= 20:
+        return "🔍 LOW RISK: Minor similarity detected", "Quick review suggested"
+    return "✅ LOW RISK: Minimal similarity detected", "Content appears original"
+
+
+class PlagiarismResult:
+    """
+    Outcome of one plagiarism check.
+
+    scores and weights are keyed by method name (scores in %), match_id is the id
+    of the best matching peer (None when unknown) and match_score its weighted pair
+    score, fragments the character ranges copied from it (see fragment_ranges) and
+    timings per-stage milliseconds.
+    """
+
+    def __init__(self, score: float, scores: Dict[str, float], weights: Dict[str, float],
+                 match_id: Optional[int] = None, match_score: float = 0.0, compared: int = 0,
+                 mode: str = 'single', engine_version: Optional[str] = None,
+                 timings: Optional[Dict[str, float]] = None, content: Optional[Dict] = None,
+                 fragments: Optional[List[List[int]]] = None, checked_at: Optional[str] = None):
+        self.score = score
+        self.scores = scores
+        self.weights = weights
+        self.match_id = match_id
+        self.match_score = match_score
+        self.compared = compared
+        self.mode = mode
+        self.engine_version = engine_version
+        self.timings = {stage: round(value, 2) for stage, value in (timings or {}).items()}
+        self.content = content
+        self.fragments = fragments or []
+        self.checked_at = checked_at or datetime.utcnow().isoformat()
+
+    def to_dict(self) -> Dict:
+        """Plain dict with rounded values, as stored and returned by the API"""
+        return {
+            'mode': self.mode,
+            'score': round(self.score, 2),
+            'scores': {method: round(value, 4) for method, value in self.scores.items()},
+            'weights': self.weights,
+            'match_id': self.match_id,
+            'match_score': round(self.match_score, 4),
+            'compared': self.compared,
+            'engine_version': self.engine_version,
+            'timings': self.timings,
+            'content': self.content,
+            'fragments': self.fragments,
+            'checked_at': self.checked_at,
+        }
+
+    def to_json(self) -> str:
+        """Compact JSON for Submission.plagiarism_details"""
+        return json.dumps(self.to_dict(), separators=(',', ':'))
+
+    @classmethod
+    def from_json(cls, data: Optional[str], score: float = 0.0) -> Optional['PlagiarismResult']:
+        """Inverse of to_json, None for missing or unreadable details
+
+        score is used for details stored before the overall score was included.
+        """
+        if not data:
+            return None
+        try:
+            details = json.loads(data)
+        except ValueError:
+            return None
+        scores = details.get('scores')
+        if not scores:
+            return None
+        return cls(
+            score=details.get('score', score),
+            scores=scores,
+            weights=details.get('weights', {}),
+            match_id=details.get('match_id'),
+            match_score=details.get('match_score', 0.0),
+            compared=details.get('compared', 0),
+            mode=details.get('mode', 'single'),
+            engine_version=details.get('engine_version'),
+            timings=details.get('timings'),
+            content=details.get('content'),
+            fragments=details.get('fragments'),
+            checked_at=details.get('checked_at'),
+        )
+
+    @property
+    def risk(self) -> str:
+        return risk_level(self.score)[0]
+
+    @property
+    def total_time(self) -> float:
+        """Milliseconds spent in all stages"""
+        return sum(self.timings.values())
+
+    @property
+    def copied_characters(self) -> int:
+        """Characters of the submission covered by fragments matched in the best peer"""
+        covered, position = 0, 0
+        for start, end in sorted((fragment[0], fragment[1]) for fragment in self.fragments):
+            if end > position:
+                covered += end - max(start, position)
+                position = end
+        return covered
+
+    def highlight(self, text: str) -> List[Tuple[str, bool]]:
+        """The submission's text split into (segment, copied) pieces"""
+        return highlight_segments(text, [(fragment[0], fragment[1]) for fragment in self.fragments])
+
+    def match_highlight(self, text: str) -> List[Tuple[str, bool]]:
+        """The best match's text split into (segment, copied) pieces"""
+        return highlight_segments(text, [(fragment[2], fragment[3]) for fragment in self.fragments])
+
+    def breakdown(self) -> List[Dict]:
+        """Per-method rows (label, description, score, weight) in reporting order"""
+        rows = []
+        for method, (label, description) in METHOD_LABELS.items():
+            if method in self.scores:
+                rows.append({'method': method, 'label': label, 'description': description,
+                             'score': self.scores[method], 'weight': self.weights.get(method, 0.0)})
+        return rows
+
+    def summary(self) -> str:
+        """One line report, stored in Submission.plagiarism_report"""
+        description = MODE_DESCRIPTIONS.get(self.mode, 'Local analysis completed').format(compared=self.compared)
+        return f"Plagiarism Score: {self.score:.2f}% - {description}"
+
+    def render_text(self) -> str:
+        """Detailed plain text report"""
+        heading, recommendation = risk_level(self.score)
+        report = "COMPREHENSIVE PLAGIARISM ANALYSIS REPORT\n"
+        report += "=" * 50 + "\n\n"
+
+        # Basic information
+        report += f"📊 Overall Plagiarism Score: {self.score:.2f}%\n"
+        report += f"📝 Documents Compared: {self.compared + 1}\n"
+        report += f"🔍 Analysis Methods: 5 (TF-IDF, Semantic, Fingerprint, Phrase, Structure)\n\n"
+
+        # Risk assessment
+        report += heading + "\n"
+        report += f"   Recommendation: {recommendation}\n\n"
+
+        # Analysis breakdown
+        report += "📋 ANALYSIS BREAKDOWN:\n"
+        report += "-" * 30 + "\n"
+        for row in self.breakdown():
+            report += f"• {row['label']}: {row['score']:.1f}% ({row['description']})\n"
+        if self.match_id is not None:
+            report += f"• Best Match: submission {self.match_id} ({self.match_score:.1f}% weighted)\n"
+        if self.fragments:
+            report += f"• Matched Fragments: {len(self.fragments)} ({self.copied_characters} characters)\n"
+        report += "\n"
+
+        # Content analysis
+        if self.content:
+            report += "📄 CONTENT ANALYSIS:\n"
+            report += "-" * 30 + "\n"
+            report += f"• Word Count: {self.content['words']} words\n"
+            report += f"• Character Count: {self.content['characters']} characters\n"
+            report += f"• Sentence Count: {self.content['sentences']} sentences\n"
+            if self.content.get('common_words'):
+                common = ', '.join(f'{word}({count})' for word, count in self.content['common_words'])
+                report += f"• Most Common Words: {common}\n"
+            report += "\n"
+
+        # Recommendations
+        report += "💡 RECOMMENDATIONS:\n"
+        report += "-" * 30 + "\n"
+        if self.score >= 50:
+            report += "• Review the submission for potential plagiarism\n"
+            report += "• Check for proper citations and references\n"
+            report += "• Consider discussing with the student\n"
+        elif self.score >= 20:
+            report += "• Verify originality of similar sections\n"
+            report += "• Check for proper attribution\n"
+        else:
+            report += "• Content appears to be original\n"
+            report += "• No immediate action required\n"
+        report += "\n"
+
+        report += "🔧 TECHNICAL DETAILS:\n"
+        report += "-" * 30 + "\n"
+        report += "• Detection Engine: Multi-method Local Analysis\n"
+        if self.engine_version:
+            report += f"• Engine Version: {self.engine_version}\n"
+        report += "• Comparison Database: Student submissions only\n"
+        report += f"• Analysis Date: {self.checked_at[:19].replace('T', ' ')}\n"
+        if self.timings:
+            stages = ', '.join(f'{stage} {value:.1f}ms' for stage, value in self.timings.items())
+            report += f"• Timings: {stages}\n"
+        report += "• Confidence Level: High (Local analysis)\n"
+
+        return report
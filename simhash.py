@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Paragraph SimHash for the E-Assignment plagiarism engine
+Every paragraph of a document is reduced to a 64-bit SimHash of its stemmed words,
+so a reworded paragraph (sentences reordered, words inflected differently, a word
+replaced here and there) lands within a few bits of the original. A permuted-table
+index (Manku et al., "Detecting Near-Duplicates for Web Crawling") finds all stored
+hashes within Hamming distance k of a query with a few binary searches instead of a
+scan of the corpus.
+"""
+
+import re
+from collections import Counter
+from itertools import combinations
+from typing import List, NamedTuple, Tuple
+
+import numpy as np
+
+from fingerprinting import TOKEN_PATTERN, hash_token
+
+SIMHASH_BITS = 64
+# Largest Hamming distance the index answers; reworded paragraphs typically stay within 3 bits
+MAX_HAMMING_DISTANCE = 3
+# Paragraphs with fewer words (headings, greetings, list items) match too easily
+MIN_PARAGRAPH_WORDS = 15
+# Words shorter than this (articles, prepositions) carry no signal
+MIN_WORD_LENGTH = 3
+# Words are cut to this many letters, a crude stemmer so "adapting" and "adapted" agree
+STEM_LENGTH = 5
+# Hashes added since the last rebuild of the sorted tables, scanned linearly until then
+MAX_PENDING_HASHES = 4096
+
+BLANK_LINE = re.compile(r'\n\s*\n')
+LINE_BREAK = re.compile(r'\n')
+
+_BIT_POSITIONS = np.arange(SIMHASH_BITS, dtype=np.uint64)
+_M1, _M2, _M4, _H01 = (np.uint64(0x5555555555555555), np.uint64(0x3333333333333333),
+                       np.uint64(0x0F0F0F0F0F0F0F0F), np.uint64(0x0101010101010101))
+
+
+class ParagraphHash(NamedTuple):
+    """SimHash of one paragraph and where the paragraph is in the document."""
+    position: int     # index of the paragraph among the hashed ones
+    simhash: int      # unsigned 64-bit
+    char_start: int
+    char_end: int
+
+
+def simhash(features: List[str]) -> int:
+    """64-bit SimHash of weighted features: bit i is set when the features with bit i set outweigh the rest."""
+    counts = Counter(features)
+    if not counts:
+        return 0
+    hashes = np.array([hash_token(feature) for feature in counts], dtype=np.uint64)
+    weights = np.array(list(counts.values()), dtype=np.int64)
+    bits = ((hashes[:, None] >> _BIT_POSITIONS) & np.uint64(1)).astype(np.int64)
+    totals = weights @ (2 * bits - 1)
+    return int(np.sum(np.left_shift(np.uint64(1), _BIT_POSITIONS[totals > 0]), dtype=np.uint64))
+
+
+def split_paragraphs(text: str) -> List[Tuple[int, int]]:
+    """Character spans of the non-empty paragraphs of a text.
+
+    Paragraphs are separated by blank lines; text without any (as extracted from
+    some Word and PDF files) is split at line breaks instead.
+    """
+    text = text or ''
+    boundary = BLANK_LINE if BLANK_LINE.search(text) else LINE_BREAK
+    spans, start = [], 0
+    for match in list(boundary.finditer(text)) + [None]:
+        end = match.start() if match else len(text)
+        stripped = text[start:end].strip()
+        if stripped:
+            offset = text.index(stripped, start)
+            spans.append((offset, offset + len(stripped)))
+        if match:
+            start = match.end()
+    return spans
+
+
+def paragraph_features(paragraph: str) -> List[str]:
+    """Lowercased, stemmed words of a paragraph that take part in its SimHash."""
+    return [word[:STEM_LENGTH] for word in TOKEN_PATTERN.findall(paragraph.lower()) if len(word) >= MIN_WORD_LENGTH]
+
+
+def paragraph_simhashes(text: str, min_words: int = MIN_PARAGRAPH_WORDS) -> List[ParagraphHash]:
+    """SimHash of every paragraph of at least min_words words."""
+    paragraphs = []
+    for start, end in split_paragraphs(text):
+        features = paragraph_features(text[start:end])
+        if len(features) >= min_words:
+            paragraphs.append(ParagraphHash(len(paragraphs), simhash(features), start, end))
+    return paragraphs
+
+
+def popcount(values: np.ndarray) -> np.ndarray:
+    """Set bits of each uint64 value."""
+    values = values - ((values >> np.uint64(1)) & _M1)
+    values = (values & _M2) + ((values >> np.uint64(2)) & _M2)
+    values = (values + (values >> np.uint64(4))) & _M4
+    return (values * _H01) >> np.uint64(56)
+
+
+def hamming_distance(left: int, right: int) -> int:
+    """Differing bits of two hashes."""
+    return bin((left ^ right) & 0xFFFFFFFFFFFFFFFF).count('1')
+
+
+def to_signed(value: int) -> int:
+    """Unsigned 64-bit hash as stored in a signed BIGINT column."""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def to_unsigned(value: int) -> int:
+    """Inverse of to_signed."""
+    return value & 0xFFFFFFFFFFFFFFFF
+
+
+def table_masks(max_distance: int = MAX_HAMMING_DISTANCE) -> List[int]:
+    """Bit masks of the permuted tables for distance k.
+
+    The hash is cut into k + 3 blocks; two hashes within k bits differ in at most k
+    blocks, so they agree exactly on at least 3 of them, i.e. on one of the
+    C(k + 3, 3) masks (20 tables of 32 bits for k = 3).
+    """
+    blocks = max_distance + 3
+    bounds = [round(i * SIMHASH_BITS / blocks) for i in range(blocks + 1)]
+    block_masks = [((1 << (bounds[i + 1] - bounds[i])) - 1) << bounds[i] for i in range(blocks)]
+    return [sum(chosen) for chosen in combinations(block_masks, 3)]
+
+
+class SimHashIndex:
+    """
+    Permuted-table Hamming index of 64-bit hashes with integer labels.
+
+    Each table keeps the hashes sorted by their bits under one mask, so the hashes
+    agreeing with a query on that mask form one contiguous run found by binary
+    search. Candidates from all tables are then checked by exact Hamming distance.
+    Added hashes go to a small pending buffer that is merged into the tables once it
+    grows past MAX_PENDING_HASHES.
+    """
+
+    def __init__(self, max_distance: int = MAX_HAMMING_DISTANCE):
+        self.max_distance = max_distance
+        self.masks = [np.uint64(mask) for mask in table_masks(max_distance)]
+        self.hashes = np.zeros(0, dtype=np.uint64)
+        self.labels = np.zeros(0, dtype=np.int64)
+        self.tables: List[Tuple[np.ndarray, np.ndarray]] = []  # (sorted masked keys, positions)
+        self.indexed = 0  # hashes covered by the tables, the rest are pending
+        self._rebuild()
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def add(self, hashes: List[int], labels: List[int]):
+        """Add unsigned 64-bit hashes with their labels."""
+        if not len(hashes):
+            return
+        self.hashes = np.concatenate([self.hashes, np.array(hashes, dtype=np.uint64)])
+        self.labels = np.concatenate([self.labels, np.array(labels, dtype=np.int64)])
+        if len(self.hashes) - self.indexed > MAX_PENDING_HASHES:
+            self._rebuild()
+
+    def _rebuild(self):
+        self.tables = []
+        for mask in self.masks:
+            keys = self.hashes & mask
+            order = np.argsort(keys, kind='stable')
+            self.tables.append((keys[order], order))
+        self.indexed = len(self.hashes)
+
+    def query(self, value: int, max_distance: int = None) -> List[Tuple[int, int]]:
+        """(label, distance) of every stored hash within max_distance bits of value, closest first."""
+        max_distance = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        value = np.uint64(value)
+        candidates = [np.arange(self.indexed, len(self.hashes))]
+        for mask, (keys, order) in zip(self.masks, self.tables):
+            key = value & mask
+            start, stop = np.searchsorted(keys, key, side='left'), np.searchsorted(keys, key, side='right')
+            if stop > start:
+                candidates.append(order[start:stop])
+        positions = np.unique(np.concatenate(candidates))
+        if not len(positions):
+            return []
+        distances = popcount(self.hashes[positions] ^ value).astype(np.int64)
+        close = distances <= max_distance
+        matches = sorted(zip(distances[close].tolist(), self.labels[positions[close]].tolist()))
+        return [(label, distance) for distance, label in matches]
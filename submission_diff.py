@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Side-by-side comparison of two submissions for the E-Assignment plagiarism engine
+Matched fragments serve as anchors, so difflib only runs on the (small) gaps
+between them and rows are produced one at a time for streaming. Each side is
+read forward from its file between anchors, so neither text is held whole.
+"""
+
+import bisect
+import difflib
+import heapq
+from itertools import chain, islice, zip_longest
+from typing import IO, Iterable, Iterator, List, Optional, Tuple, Union
+
+from fingerprinting import Fragment
+
+# Gaps with more lines than this on either side are shown as replaced, not diffed;
+# difflib's worst case is quadratic in the number of lines
+MAX_DIFF_LINES = 1000
+# Characters read from a submission file at a time
+READ_CHUNK_CHARS = 64 * 1024
+
+
+def anchor_chain(fragments: List[Fragment]) -> List[Fragment]:
+    """
+    Heaviest chain of fragments that is ordered and non-overlapping in both documents.
+
+    Fragments are visited by their start in the left document; a fragment becomes
+    available as a predecessor once the left position passes its end, and the best
+    predecessor ending before the fragment's start on the right comes from a prefix
+    maximum (Fenwick) tree, so the chain costs O(n log n).
+
+    Returns:
+        Fragments in document order
+    """
+    if not fragments:
+        return []
+
+    ends = sorted({fragment.right_char_end for fragment in fragments})
+    tree = [(0, -1)] * (len(ends) + 1)  # (chain weight, fragment index) per right end rank
+
+    def update(rank: int, value: Tuple[int, int]):
+        rank += 1
+        while rank <= len(ends):
+            if value > tree[rank]:
+                tree[rank] = value
+            rank += rank & -rank
+
+    def query(position: int) -> Tuple[int, int]:
+        # Best chain over fragments whose right end is <= position
+        rank = bisect.bisect_right(ends, position)
+        best = (0, -1)
+        while rank > 0:
+            if tree[rank] > best:
+                best = tree[rank]
+            rank -= rank & -rank
+        return best
+
+    order = sorted(range(len(fragments)), key=lambda i: fragments[i].left_char_start)
+    weights = [0] * len(fragments)
+    previous = [-1] * len(fragments)
+    pending: List[Tuple[int, int]] = []  # (left end, fragment index) not yet usable as predecessors
+
+    for i in order:
+        fragment = fragments[i]
+        while pending and pending[0][0] <= fragment.left_char_start:
+            _, j = heapq.heappop(pending)
+            update(bisect.bisect_right(ends, fragments[j].right_char_end) - 1, (weights[j], j))
+        weight, j = query(fragment.right_char_start)
+        weights[i] = weight + fragment.occurrences
+        previous[i] = j
+        heapq.heappush(pending, (fragment.left_char_end, i))
+
+    i = max(range(len(fragments)), key=lambda i: weights[i])
+    chain = []
+    while i != -1:
+        chain.append(fragments[i])
+        i = previous[i]
+    return chain[::-1]
+
+
+class TextCursor:
+    """
+    Forward reader of a text, given as a string or an open text file.
+
+    Positions are character offsets, as in fingerprint fragments; a file must be
+    opened the way its fingerprinted content was read (same encoding, universal
+    newlines). Only one chunk of a file is held at a time.
+    """
+
+    def __init__(self, source: Union[str, IO[str]]):
+        self.source = source
+        self.position = 0
+
+    def _chunks(self, end: Optional[int]) -> Iterator[str]:
+        """The text from the current position to end (None for the end of the text), chunk by chunk"""
+        if isinstance(self.source, str):
+            stop = len(self.source) if end is None else max(end, self.position)
+            yield self.source[self.position:stop]
+            self.position = stop
+            return
+        while end is None or self.position < end:
+            size = READ_CHUNK_CHARS if end is None else min(READ_CHUNK_CHARS, end - self.position)
+            chunk = self.source.read(size)
+            if not chunk:
+                break
+            self.position += len(chunk)
+            yield chunk
+
+    def lines(self, end: Optional[int] = None) -> Iterator[str]:
+        """Lines of the text up to end, the same as str.splitlines() of that slice"""
+        pending = ''
+        for chunk in self._chunks(end):
+            # The last piece may continue (or be a \r followed by \n) in the next chunk
+            pieces = (pending + chunk).splitlines(keepends=True)
+            pending = pieces.pop() if pieces else ''
+            for piece in pieces:
+                yield piece.splitlines()[0]
+        if pending:
+            yield pending.splitlines()[0]
+
+
+def _paired(tag: str, left_lines: Iterable[str], right_lines: Iterable[str]) -> Iterator[Tuple[str, Optional[str], Optional[str]]]:
+    for left_line, right_line in zip_longest(left_lines, right_lines):
+        yield tag, left_line, right_line
+
+
+def _diff_gap(left_lines: Iterator[str], right_lines: Iterator[str],
+              max_diff_lines: int) -> Iterator[Tuple[str, Optional[str], Optional[str]]]:
+    """Line diff of the text between two anchors"""
+    left_head = list(islice(left_lines, max_diff_lines + 1))
+    right_head = list(islice(right_lines, max_diff_lines + 1))
+    if len(left_head) > max_diff_lines or len(right_head) > max_diff_lines:
+        # Too long to diff, the rest of the gap is paired as it is read
+        yield from _paired('replace', chain(left_head, left_lines), chain(right_head, right_lines))
+        return
+    matcher = difflib.SequenceMatcher(None, left_head, right_head, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        yield from _paired(tag, left_head[i1:i2], right_head[j1:j2])
+
+
+def side_by_side_rows(left_text: Union[str, IO[str]], right_text: Union[str, IO[str]], anchors: List[Fragment],
+                      max_diff_lines: int = MAX_DIFF_LINES) -> Iterator[Tuple[str, Optional[str], Optional[str]]]:
+    """
+    Rows (tag, left line, right line) of a side-by-side comparison.
+
+    Anchored regions are tagged 'copied'; text between anchors is diffed line by
+    line and tagged like difflib opcodes ('equal', 'replace', 'delete', 'insert').
+    A missing side is None. Either text may be an open text file (see TextCursor),
+    which is read forward one gap or anchor at a time.
+    """
+    left, right = TextCursor(left_text), TextCursor(right_text)
+    for anchor in list(anchors) + [None]:
+        yield from _diff_gap(left.lines(anchor.left_char_start if anchor else None),
+                             right.lines(anchor.right_char_start if anchor else None), max_diff_lines)
+        if anchor is None:
+            break
+        yield from _paired('copied', left.lines(anchor.left_char_end), right.lines(anchor.right_char_end))
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Test the assignment-wide similarity matrices against single submission checks
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+DOCUMENTS = [
+    "Artificial Intelligence has revolutionized education. Machine learning algorithms help students "
+    "learn better by adapting lessons to their pace. Teachers receive insights about difficult topics.",
+    "Artificial Intelligence has transformed education. Machine learning algorithms help students "
+    "learn better by adapting lessons to their pace. Teachers get insights about difficult topics.",
+    "Renewable energy technologies are transforming the power sector. Solar panels are becoming more "
+    "efficient.\n\nWind farms now supply a large share of electricity in many countries.",
+    "Online learning platforms give students flexible access to courses. Video lectures and quizzes "
+    "let learners study at their own pace from anywhere in the world.",
+]
+
+def test_matrices_match_single_checks():
+    """Row maxima of every matrix equal the per-method scores of a single check"""
+    print("🔍 Testing similarity matrices against single checks...")
+    from app import (
+        calculate_similarity_matrices, calculate_tfidf_similarity, calculate_semantic_similarity,
+        calculate_fingerprint_similarity, calculate_phrase_similarity, calculate_structure_similarity
+    )
+    single_methods = {
+        'tfidf': calculate_tfidf_similarity,
+        'semantic': calculate_semantic_similarity,
+        'fingerprint': calculate_fingerprint_similarity,
+        'phrase': calculate_phrase_similarity,
+        'structure': calculate_structure_similarity,
+    }
+
+    matrices = calculate_similarity_matrices(DOCUMENTS)
+    for i in range(len(DOCUMENTS)):
+        documents = [DOCUMENTS[i]] + DOCUMENTS[:i] + DOCUMENTS[i + 1:]
+        peers = [j for j in range(len(DOCUMENTS)) if j != i]
+        for method, calculate in single_methods.items():
+            expected = calculate(documents)
+            actual = matrices[method][i, peers].max()
+            assert abs(expected - actual) < 1e-9, f"{method} differs for document {i}: {expected} != {actual}"
+    print("✅ Matrices agree with single checks")
+
+def test_best_match():
+    """The near copy is the best matching peer of the original"""
+    print("🔍 Testing best matching peer...")
+    from app import calculate_similarity_matrices, combine_plagiarism_scores, PLAGIARISM_METHODS
+
+    matrices = calculate_similarity_matrices(DOCUMENTS)
+    peers = [1, 2, 3]
+    scores = {method: matrices[method][0, peers].max() for method in PLAGIARISM_METHODS}
+    score, weights = combine_plagiarism_scores(scores)
+    pair_scores = sum(matrices[method][0, peers] * weights[method] for method in PLAGIARISM_METHODS)
+    print(f"📊 Overall score: {score:.2f}%, pair scores: {[round(value, 1) for value in pair_scores]}")
+    assert peers[int(pair_scores.argmax())] == 1
+    assert score > 50
+    print("✅ Best match found")
+
+def test_focus_matches_full_matrices():
+    """Scoring only the pairs of a new submission gives the same values as the full matrices"""
+    print("🔍 Testing incremental (focused) similarity matrices...")
+    from app import calculate_similarity_matrices, PLAGIARISM_METHODS
+
+    full = calculate_similarity_matrices(DOCUMENTS)
+    for focus in range(len(DOCUMENTS)):
+        focused = calculate_similarity_matrices(DOCUMENTS, focus=focus)
+        for method in PLAGIARISM_METHODS:
+            assert abs(full[method][focus] - focused[method][focus]).max() < 1e-9, f"{method} row {focus}"
+            assert abs(full[method][:, focus] - focused[method][:, focus]).max() < 1e-9, f"{method} column {focus}"
+    print("✅ Focused matrices agree with the full matrices")
+
+def main():
+    """Run all tests"""
+    print("🧪 ASSIGNMENT-WIDE PLAGIARISM CHECK TESTING")
+    print("=" * 60)
+
+    test_matrices_match_single_checks()
+    test_best_match()
+    test_focus_matches_full_matrices()
+
+    print("\n🎉 All assignment-wide check tests passed!")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Test the exclusion of assignment templates (prompt, starter code) from plagiarism fingerprints
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from types import SimpleNamespace
+
+SKELETON = '''import sys
+
+def read_matrix(path):
+    """Read a distance matrix, one row per line."""
+    with open(path) as handle:
+        return [[float(value) for value in line.split()] for line in handle if line.strip()]
+
+def main():
+    matrix = read_matrix(sys.argv[1])
+    print(cluster(matrix))
+
+if __name__ == "__main__":
+    main()
+'''
+
+SOLUTIONS = [
+    SKELETON + '''
+def cluster(matrix):
+    groups = [[i] for i in range(len(matrix))]
+    while len(groups) > 1:
+        groups = groups[:-2] + [groups[-2] + groups[-1]]
+    return groups
+''',
+    SKELETON + '''
+def cluster(matrix):
+    size = len(matrix)
+    best = min((matrix[i][j], i, j) for i in range(size) for j in range(size) if i < j)
+    return {"pair": best[1:], "distance": best[0]}
+''',
+]
+
+def jaccard(left, right):
+    left, right = {f.hash for f in left}, {f.hash for f in right}
+    return len(left & right) / max(1, len(left | right))
+
+def test_template_texts():
+    """Description, instructions and attached templates are excluded, blanks are skipped"""
+    print("🔍 Testing template texts...")
+    from app import assignment_template_texts
+
+    assignment = SimpleNamespace(
+        description="Implement hierarchical clustering.", instructions="  ",
+        templates=[SimpleNamespace(content=SKELETON)]
+    )
+    assert assignment_template_texts(assignment) == ["Implement hierarchical clustering.", SKELETON]
+    print("✅ Template texts collected")
+
+def test_skeleton_is_excluded():
+    """Shared starter code no longer makes independent solutions look copied"""
+    print("🔍 Testing starter code exclusion...")
+    from app import compute_submission_fingerprints
+
+    for language in ('python', None):
+        fingerprints = [compute_submission_fingerprints(solution, language) for solution in SOLUTIONS]
+        template = {f.hash for f in compute_submission_fingerprints(SKELETON, language)}
+        filtered = [[f for f in prints if f.hash not in template] for prints in fingerprints]
+
+        before, after = jaccard(*fingerprints), jaccard(*filtered)
+        print(f"   {language or 'text'}: {before:.2f} with the skeleton, {after:.2f} without")
+        assert after < before / 2
+        assert all(len(prints) < len(original) for prints, original in zip(filtered, fingerprints))
+    print("✅ Starter code excluded")
+
+def main():
+    """Run all tests"""
+    print("🧪 ASSIGNMENT TEMPLATE TESTING")
+    print("=" * 60)
+
+    test_template_texts()
+    test_skeleton_is_excluded()
+
+    print("\n🎉 All assignment template tests passed!")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Test the AST subtree-hash clone detector on the Dolos Python benchmark files
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dolos-main', 'samples', 'python', 'benchmark_files')
+
+def load_sample(name):
+    from ast_clones import subtree_hashes
+    with open(os.path.join(SAMPLES, name), 'r', encoding='utf-8') as f:
+        return subtree_hashes(f.read())
+
+def test_benchmark_variants():
+    """Renamed, moved and reordered copies are structural clones, the unrelated file is not"""
+    print("🔍 Testing UPGMA benchmark variants...")
+    from ast_clones import clone_similarity
+
+    original = load_sample('UPGMA_A.py')
+    assert original, "the original should parse despite its broken line"
+    for variant in ('UPGMA_A_variablenames.py', 'UPGMA_A_functionsmoved.py', 'UPGMA_A_linesmoved.py'):
+        similarity = clone_similarity(original, load_sample(variant))
+        print(f"   {variant}: {similarity:.3f}")
+        assert similarity > 0.9, variant
+    unrelated = clone_similarity(original, load_sample('UPGMA_B.py'))
+    assert unrelated < 0.1
+    print(f"✅ Variants detected, unrelated file at {unrelated:.3f}")
+
+def test_normalized_hashes():
+    """Identifiers, literals and definition order do not change the module hash"""
+    print("🔍 Testing normalized subtree hashes...")
+    from ast_clones import subtree_hashes, pack_subtrees, unpack_subtrees, clone_regions
+
+    source = (
+        "def area(width, height):\n    total = width * height\n    return total + 1\n\n"
+        "def label(name):\n    return 'shape: ' + name.upper()\n"
+    )
+    renamed = (
+        "def describe(title):\n    return 'kind ' + title.upper()\n\n"
+        "def size(w, h):\n    result = w * h\n    return result + 2\n"
+    )
+    left, right = subtree_hashes(source, min_nodes=5), subtree_hashes(renamed, min_nodes=5)
+    assert left[-1].hash == right[-1].hash
+    assert clone_regions(left, right) == [(1, 6, 1, 6)]
+    assert unpack_subtrees(pack_subtrees(left)) == left
+
+    # With an extra statement only the functions match, each at its own place
+    extended = subtree_hashes(renamed + "print(size(2, 3))\n", min_nodes=5)
+    assert clone_regions(left, extended) == [(1, 3, 4, 6), (5, 6, 1, 2)]
+
+    assert subtree_hashes("if x = 1:\n    y = 2\n") is not None
+    assert subtree_hashes("x = (\n" * 30) is None and pack_subtrees(None) == b''
+    print("✅ Renames and reordering hash the same")
+
+def test_memoized_structure_uses_subtrees():
+    """Python pairs score structure by clone similarity in the stored-record checks"""
+    print("🔍 Testing structure matrix for Python pairs...")
+    from app import calculate_similarity_matrices, preprocess_documents
+    from ast_clones import subtree_hashes
+
+    with open(os.path.join(SAMPLES, 'UPGMA_A_variablenames.py'), 'r', encoding='utf-8') as f:
+        renamed = f.read()
+    with open(os.path.join(SAMPLES, 'UPGMA_A_functionsmoved.py'), 'r', encoding='utf-8') as f:
+        moved = f.read()
+    documents = preprocess_documents([renamed, moved])
+    matrices = calculate_similarity_matrices(documents, subtrees=[subtree_hashes(renamed), subtree_hashes(moved)])
+    assert matrices['structure'][0, 1] == 100.0
+    print("✅ Structure scored from AST subtrees")
+
+def main():
+    """Run all tests"""
+    print("🧪 AST CLONE DETECTION TESTING")
+    print("=" * 60)
+
+    test_benchmark_variants()
+    test_normalized_hashes()
+    test_memoized_structure_uses_subtrees()
+
+    print("\n🎉 All AST clone tests passed!")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Test the plagiarism engine benchmark: reproducible corpora, results and regression comparison
+"""
+
+import os
+import random
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from benchmark_engine import CorpusBuilder, benchmark_size, code_samples, compare_results, fixture_documents
+
+def test_corpus_is_reproducible():
+    """The same seed builds the same submissions, mixing prose and code variants"""
+    print("🔍 Testing synthetic corpus...")
+    prose = fixture_documents()
+    code = code_samples()
+    assert len(prose) >= 5 and len(code) >= 10
+    assert all('[WORD EXTRACTED TEXT]' in text for text in prose)
+
+    first = CorpusBuilder(prose, code, seed=7).build(60)
+    second = CorpusBuilder(prose, code, seed=7).build(60)
+    assert first == second
+    assert first != CorpusBuilder(prose, code, seed=8).build(60)
+    variants = {submission['variant'] for submission in first}
+    assert {'copy', 'original'} <= variants and 'renamed' in variants
+    assert any(not submission['file_name'].endswith('.txt') for submission in first), "code submissions"
+    print(f"✅ {len(prose)} documents and {len(code)} code samples, variants {sorted(variants)}")
+
+def test_benchmark_size():
+    """Every method and the combined score get latency, throughput and RSS figures"""
+    print("🔍 Testing benchmark run...")
+    submissions = CorpusBuilder(fixture_documents(), code_samples(), seed=1).build(8)
+    result = benchmark_size(submissions, checks=3, rng=random.Random(1))
+    assert result['submissions'] == 8 and result['checks'] == 3
+    assert set(result['methods']) == {'preprocess', 'tfidf', 'semantic', 'fingerprint', 'phrase', 'structure', 'combined'}
+    combined = result['methods']['combined']
+    assert combined['checks'] == 3 and combined['p50_ms'] <= combined['p99_ms'] <= combined['max_ms']
+    assert combined['checks_per_second'] > 0 and combined['peak_rss_mb'] > 0
+    print(f"✅ combined p50 {combined['p50_ms']}ms, peak RSS {combined['peak_rss_mb']}MB")
+
+def test_compare_results():
+    """Methods slower than the tolerance on a size present in both runs are regressions"""
+    print("🔍 Testing regression comparison...")
+    def report(p50s):
+        return {'results': [{'submissions': 100, 'methods': {name: {'p50_ms': value} for name, value in p50s.items()}}]}
+
+    baseline = report({'tfidf': 10.0, 'phrase': 5.0, 'combined': 40.0})
+    current = report({'tfidf': 11.0, 'phrase': 8.0, 'combined': 40.0, 'structure': 1.0})
+    regressions = compare_results(current, baseline, tolerance=1.2)
+    assert [(size, name) for size, name, *_ in regressions] == [(100, 'phrase')]
+    assert compare_results(current, {'results': []}) == [], "sizes missing from the baseline are skipped"
+    print("✅ Regressions reported")
+
+def main():
+    """Run all tests"""
+    print("🧪 ENGINE BENCHMARK TESTING")
+    print("=" * 60)
+
+    test_corpus_is_reproducible()
+    test_benchmark_size()
+    test_compare_results()
+
+    print("\n🎉 All benchmark tests passed!")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Test the tiered cascade scorer against running every method on every peer
+"""
+
+import glob
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+ORIGINAL = (
+    "Artificial Intelligence has revolutionized education. Machine learning algorithms help students "
+    "learn better by adapting lessons to their pace. Teachers receive insights about difficult topics."
+)
+DOCUMENTS = [
+    ORIGINAL,
+    ORIGINAL.replace("revolutionized", "transformed"),
+    "Renewable energy technologies are transforming the power sector. Solar panels are becoming more "
+    "efficient.\n\nWind farms now supply a large share of electricity in many countries.",
+    ORIGINAL,
+    "Short note about learning.",
+]
+
+def load_samples():
+    """Python benchmark files from the Dolos samples, if present"""
+    pattern = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           'dolos-main', 'samples', 'python', 'benchmark_files', '*.py')
+    samples = []
+    for path in sorted(glob.glob(pattern)):
+        with open(path, encoding='utf-8') as f:
+            samples.append(f.read())
+    return samples
+
+def corpus_subtrees(corpus):
+    """AST subtrees of the Python samples in a corpus, None for the prose documents"""
+    from ast_clones import subtree_hashes
+    return [None] * len(DOCUMENTS) + [subtree_hashes(source) for source in corpus[len(DOCUMENTS):]]
+
+def reordered(items, i):
+    """Item i first, then the others in order"""
+    return [items[i]] + items[:i] + items[i + 1:]
+
+def full_scores(documents, subtrees=None):
+    from app import (
+        calculate_tfidf_similarity, calculate_semantic_similarity, calculate_fingerprint_similarity,
+        calculate_phrase_similarity, calculate_structure_similarity
+    )
+    return {
+        'tfidf': calculate_tfidf_similarity(documents),
+        'semantic': calculate_semantic_similarity(documents),
+        'fingerprint': calculate_fingerprint_similarity(documents),
+        'phrase': calculate_phrase_similarity(documents),
+        'structure': calculate_structure_similarity(documents, subtrees),
+    }
+
+def test_cascade_matches_full_scoring():
+    """Every document checked against the others gives identical per-method maxima"""
+    print("🔍 Testing cascade against full scoring...")
+    from app import calculate_cascade_scores
+    from text_preprocessing import preprocess_documents
+
+    corpus = DOCUMENTS + load_samples()
+    subtrees = corpus_subtrees(corpus)
+    pruned = 0
+    for i in range(len(corpus)):
+        documents = preprocess_documents(reordered(corpus, i))
+        scores, stats = calculate_cascade_scores(documents, subtrees=reordered(subtrees, i))
+        assert scores == full_scores(documents, reordered(subtrees, i)), f"document {i} differs"
+        pruned += stats['semantic_pruned'] + stats['phrase_pruned']
+    print(f"✅ {len(corpus)} checks identical, {pruned} expensive comparisons pruned")
+    assert pruned > 0
+
+def test_best_peer_matches_matrix():
+    """The cascade names the same best match, with the same weighted score and structure, as the matrix checks"""
+    print("🔍 Testing best match...")
+    from app import calculate_cascade_scores, calculate_similarity_matrices, summarize_plagiarism_row
+    from text_preprocessing import preprocess_documents
+
+    corpus = DOCUMENTS + load_samples()
+    subtrees = corpus_subtrees(corpus)
+    for i in range(len(corpus)):
+        documents = preprocess_documents(reordered(corpus, i))
+        scores, stats = calculate_cascade_scores(documents, subtrees=reordered(subtrees, i))
+        matrices = calculate_similarity_matrices(documents, focus=0, subtrees=reordered(subtrees, i))
+        assert abs(scores['structure'] - matrices['structure'][0].max()) < 1e-9, f"document {i}: structure differs"
+        _, best, match_score = summarize_plagiarism_row(matrices, 0, list(range(1, len(documents))))
+        assert stats['best_peer'] + 1 == best, f"document {i}: {stats['best_peer'] + 1} != {best}"
+        assert abs(stats['best_score'] - match_score) < 1e-6
+    print(f"✅ {len(corpus)} checks name the same best match")
+
+def test_semantic_matches_counter_implementation():
+    """The sparse semantic similarity equals the context list / Counter formulation exactly"""
+    print("🔍 Testing sparse semantic similarity...")
+    from collections import Counter
+    from app import get_semantic_contexts, semantic_pair_similarity
+    from text_preprocessing import preprocess_documents
+
+    def legacy_contexts(doc):
+        words = doc.filtered_ids(3)
+        contexts = {}
+        for i, word in enumerate(words):
+            contexts.setdefault(word, []).extend(words[max(0, i - 3):min(len(words), i + 4)])
+        return contexts
+
+    def legacy_similarity(main_contexts, other_contexts):
+        similarity, total_words = 0.0, 0
+        for word, contexts in main_contexts.items():
+            if word in other_contexts:
+                main_counter, other_counter = Counter(contexts), Counter(other_contexts[word])
+                union = sum((main_counter | other_counter).values())
+                if union > 0:
+                    similarity += sum((main_counter & other_counter).values()) / union
+                total_words += 1
+        return similarity / total_words if total_words else 0.0
+
+    documents = preprocess_documents(DOCUMENTS + load_samples())
+    for a in documents:
+        for b in documents:
+            expected = legacy_similarity(legacy_contexts(a), legacy_contexts(b))
+            assert semantic_pair_similarity(get_semantic_contexts(a), get_semantic_contexts(b)) == expected
+    print(f"✅ {len(documents) ** 2} pairs identical")
+
+def test_phrase_matches_counter_implementation():
+    """The hashed phrase similarity equals counting phrase tuples exactly"""
+    print("🔍 Testing hashed phrase similarity...")
+    from collections import Counter
+    from app import extract_phrases, phrase_pair_similarity
+    from text_preprocessing import preprocess_documents
+
+    def legacy_phrases(doc):
+        words = doc.token_ids
+        return Counter(tuple(words[i:i + n]) for n in range(3, min(9, len(words) + 1))
+                       for i in range(len(words) - n + 1))
+
+    def legacy_similarity(main_phrases, other_phrases):
+        total_phrases = main_phrases | other_phrases
+        if len(total_phrases) > 0:
+            return sum((main_phrases & other_phrases).values()) / sum(total_phrases.values())
+        return 0.0
+
+    documents = preprocess_documents(DOCUMENTS + load_samples())
+    for a in documents:
+        for b in documents:
+            expected = legacy_similarity(legacy_phrases(a), legacy_phrases(b))
+            assert phrase_pair_similarity(extract_phrases(a), extract_phrases(b)) == expected
+    print(f"✅ {len(documents) ** 2} pairs identical")
+
+def test_upper_bounds():
+    """The cheap bounds are never below the exact pair scores"""
+    print("🔍 Testing upper bounds...")
+    from app import (
+        get_semantic_contexts, semantic_pair_similarity, semantic_upper_bound,
+        extract_phrases, phrase_pair_similarity, phrase_upper_bound, count_phrases
+    )
+    from text_preprocessing import preprocess_documents
+
+    documents = preprocess_documents(DOCUMENTS)
+    for a in documents:
+        for b in documents:
+            contexts_a, contexts_b = get_semantic_contexts(a), get_semantic_contexts(b)
+            assert semantic_upper_bound(contexts_a, contexts_b) >= semantic_pair_similarity(contexts_a, contexts_b)
+            phrases_a = extract_phrases(a)
+            assert count_phrases(len(a)) == phrases_a.total
+            bound = phrase_upper_bound(count_phrases(len(a)), count_phrases(len(b)))
+            assert bound >= phrase_pair_similarity(phrases_a, extract_phrases(b))
+    print("✅ Bounds hold")
+
+def main():
+    """Run all tests"""
+    print("🧪 CASCADE SCORER TESTING")
+    print("=" * 60)
+
+    test_semantic_matches_counter_implementation()
+    test_phrase_matches_counter_implementation()
+    test_upper_bounds()
+    test_cascade_matches_full_scoring()
+    test_best_peer_matches_matrix()
+
+    print("\n🎉 All cascade tests passed!")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test the code-aware tokenizer and fingerprints of code submissions
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dolos-main', 'samples', 'python', 'benchmark_files')
+
+def read_sample(name):
+    with open(os.path.join(SAMPLES, name), 'r', encoding='utf-8') as f:
+        return f.read()
+
+def jaccard(left, right):
+    left, right = {f.hash for f in left}, {f.hash for f in right}
+    return len(left & right) / max(1, len(left | right))
+
+def test_token_streams():
+    """Comments are dropped, identifiers and literals abstracted, keywords kept"""
+    print("🔍 Testing normalized token streams...")
+    from code_tokenizer import tokenize_code, language_for_file
+
+    source = "def add(a, b):\n    # sum\n    return a + b * 2.5  # done\n"
+    tokens, spans = tokenize_code(source, 'python')
+    assert tokens == ['def', 'ID', '(', 'ID', ',', 'ID', ')', ':', 'return', 'ID', '+', 'ID', '*', 'NUM']
+    assert [source[start:end] for start, end in spans][:2] == ['def', 'add']
+
+    tokens, _ = tokenize_code("function f(x) { /* note */ return `t ${x}` + 'a'; } // end", 'javascript')
+    assert tokens == ['function', 'ID', '(', 'ID', ')', '{', 'return', 'STR', '+', 'STR', ';', '}']
+    assert tokenize_code("SELECT name FROM users -- all", 'sql')[0] == ['select', 'ID', 'from', 'ID']
+
+    assert language_for_file('lab/Solution.JAVA') == 'java'
+    assert language_for_file('essay.docx') is None and language_for_file(None) is None
+    print("✅ Token streams normalized")
+
+def test_renamed_code_matches():
+    """Renamed variables leave code fingerprints unchanged, unlike word fingerprints"""
+    print("🔍 Testing code fingerprints on the Dolos samples...")
+    from code_tokenizer import compute_code_fingerprints
+    from fingerprinting import compute_fingerprints
+
+    original = read_sample('UPGMA_A.py')
+    renamed = read_sample('UPGMA_A_variablenames.py')
+    unrelated = read_sample('UPGMA_B.py')
+
+    code_score = jaccard(compute_code_fingerprints(original, 'python'), compute_code_fingerprints(renamed, 'python'))
+    text_score = jaccard(compute_fingerprints(original.lower()), compute_fingerprints(renamed.lower()))
+    assert code_score > 0.9 and code_score > text_score
+    assert jaccard(compute_code_fingerprints(original, 'python'), compute_code_fingerprints(unrelated, 'python')) < 0.2
+    print(f"✅ Renamed copy: {code_score:.2f} on code tokens, {text_score:.2f} on words")
+
+def test_code_submission_indexing():
+    """Code submissions are indexed with code fingerprints and their own parameters"""
+    print("🔍 Testing code submission indexing...")
+    from types import SimpleNamespace
+    from app import fingerprint_parameters, submission_language
+    from code_tokenizer import CODE_KGRAM_LENGTH, CODE_WINDOW_SIZE
+    from fingerprinting import DEFAULT_KGRAM_LENGTH, DEFAULT_WINDOW_SIZE
+
+    code = SimpleNamespace(file_name='upgma.py', file_path='uploads/20240101_upgma.py')
+    essay = SimpleNamespace(file_name='essay.docx', file_path='uploads/20240101_essay.docx')
+    assert submission_language(code) == 'python' and submission_language(essay) is None
+    assert fingerprint_parameters('python') == (CODE_KGRAM_LENGTH, CODE_WINDOW_SIZE)
+    assert fingerprint_parameters(None) == (DEFAULT_KGRAM_LENGTH, DEFAULT_WINDOW_SIZE)
+    print("✅ Code and documents fingerprinted separately")
+
+def main():
+    """Run all tests"""
+    print("🧪 CODE TOKENIZER TESTING")
+    print("=" * 60)
+
+    test_token_streams()
+    test_renamed_code_matches()
+    test_code_submission_indexing()
+
+    print("\n🎉 All code tokenizer tests passed!")
+
+if __name__ == "__main__":
+    main()
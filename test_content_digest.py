@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test the whitespace-normalized content digests computed while uploads are saved
+"""
+
+import hashlib
+import io
+import os
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+ESSAY = (
+    "Artificial Intelligence has revolutionized education.\n\n"
+    "    Machine learning algorithms help students learn better by adapting lessons.\r\n"
+    "Teachers receive insights about student performance – naïve approaches fail.\n"
+)
+
+def test_whitespace_is_normalized():
+    """Copies differing only in spacing and line endings share a digest, other edits do not"""
+    print("🔍 Testing normalized digests...")
+    from content_digest import normalized_sha256
+
+    respaced = "  " + ESSAY.replace("\n\n", "\n").replace("\r\n", "\n").replace(" ", "   ") + "\n\n"
+    assert normalized_sha256(respaced) == normalized_sha256(ESSAY)
+    assert normalized_sha256(ESSAY.replace("better", "faster")) != normalized_sha256(ESSAY)
+    assert normalized_sha256("abcdefghijkl") != normalized_sha256("abcdef ghijkl")
+
+    # Text extracted from a document matches the same text uploaded as a file
+    assert normalized_sha256("[WORD EXTRACTED TEXT]\n" + ESSAY) == normalized_sha256(ESSAY)
+    print("✅ Whitespace normalized")
+
+def test_short_text_has_no_digest():
+    """Empty and near-empty text gets no digest, so it never matches another upload"""
+    print("🔍 Testing short texts...")
+    from content_digest import extracted_text_digest, normalized_sha256, save_upload
+
+    assert normalized_sha256(" \n ") is None
+    assert normalized_sha256("too short") is None
+    assert normalized_sha256("just long enough") is not None
+    assert extracted_text_digest("[PDF EXTRACTED TEXT]\n  \n") is None, "image-only PDF"
+    with tempfile.TemporaryDirectory() as folder:
+        size, digest = save_upload(io.BytesIO(b"\n\n   \n"), os.path.join(folder, 'empty.txt'), text=True)
+        assert (size, digest) == (6, None)
+
+    print("✅ Short texts have no digest")
+
+def test_streaming_matches_whole_text():
+    """Hashing in chunks gives the same digest wherever the chunks (and UTF-8 characters) are cut"""
+    print("🔍 Testing streamed uploads...")
+    from content_digest import normalized_sha256, save_upload
+
+    data = ESSAY.encode('utf-8')
+    expected = normalized_sha256(ESSAY)
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'upload.txt')
+        for chunk_size in (1, 2, 3, 7, 64, 1 << 16):
+            size, digest = save_upload(io.BytesIO(data), path, text=True, chunk_size=chunk_size)
+            assert (size, digest) == (len(data), expected), chunk_size
+        with open(path, 'rb') as f:
+            assert f.read() == data
+
+        # Binary files keep the digest of their bytes
+        size, digest = save_upload(io.BytesIO(data), path, text=False, chunk_size=5)
+        assert digest == hashlib.sha256(data).hexdigest()
+    print("✅ Streamed digests agree")
+
+def test_extracted_text_digest():
+    """Only real extracted text gets a text digest, error and placeholder messages never do"""
+    print("🔍 Testing extracted text digests...")
+    from content_digest import extracted_text_digest, normalized_sha256
+
+    assert extracted_text_digest("[PDF EXTRACTED TEXT]\n" + ESSAY) == normalized_sha256(ESSAY)
+    assert extracted_text_digest("Binary file detected (PPTX). Content analysis not available for this file type.") is None
+    assert extracted_text_digest("Error extracting text from PDF: broken") is None
+    assert extracted_text_digest(None) is None
+    print("✅ Placeholders excluded")
+
+def main():
+    """Run all tests"""
+    print("🧪 CONTENT DIGEST TESTING")
+    print("=" * 60)
+
+    test_whitespace_is_normalized()
+    test_short_text_has_no_digest()
+    test_streaming_matches_whole_text()
+    test_extracted_text_digest()
+
+    print("\n🎉 All content digest tests passed!")
+
+if __name__ == "__main__":
+    main()
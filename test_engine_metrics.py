@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test the per-stage check profiles and the histograms they are aggregated into
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from engine_metrics import CheckProfile, EngineHistograms, Histogram, bucket_index, bucket_bound
+
+def test_profile_stages():
+    """Repeated measurements of a stage add up, counts accumulate, the peak is the largest allocation"""
+    print("🔍 Testing check profile...")
+    profile = CheckProfile(trace_memory=True)
+    assert tracemalloc.is_tracing()
+
+    for _ in range(3):
+        with profile.measure('phrase'):
+            time.sleep(0.002)
+        profile.count('phrase', tokens=100, compared=1)
+    profile.count('phrase', pruned=2)
+    with profile.measure('semantic'):
+        block = bytearray(2 * 1024 * 1024)
+    del block
+    with profile.measure('semantic'):
+        small = bytearray(1024)
+    profile.finish()
+    assert not tracemalloc.is_tracing(), "tracing stops with the last traced check"
+
+    stages = profile.to_dict()['stages']
+    assert stages['phrase']['wall_ms'] >= 6
+    assert (stages['phrase']['tokens'], stages['phrase']['peers_compared'], stages['phrase']['peers_pruned']) == (300, 3, 2)
+    assert stages['semantic']['peak_kb'] >= 2048, "the larger of the two measurements"
+    assert profile.to_dict()['slowest_stage'] == 'phrase'
+    assert set(profile.timings(['phrase', 'tfidf'])) == {'phrase', 'tfidf'}
+    print(f"✅ phrase {stages['phrase']['wall_ms']}ms, semantic peak {stages['semantic']['peak_kb']}KB")
+
+def test_untraced_profile():
+    """Without memory tracing no peak is reported and tracemalloc stays off"""
+    print("🔍 Testing untraced profile...")
+    profile = CheckProfile()
+    with profile.measure('tfidf'):
+        pass
+    profile.add_time('tfidf', 0.5)
+    profile.finish()
+    assert not tracemalloc.is_tracing()
+    stage = profile.to_dict()['stages']['tfidf']
+    assert 'peak_kb' not in stage and stage['wall_ms'] >= 500
+    print("✅ No tracing overhead by default")
+
+def test_histograms():
+    """Values fall into doubling buckets and quantiles are read from them"""
+    print("🔍 Testing histograms...")
+    assert [bucket_index(value) for value in (0, 0.3, 1, 1.5, 2, 3, 4, 5)] == [0, 1, 1, 2, 2, 3, 3, 4]
+    assert bucket_bound(3) == 4.0
+
+    histogram = Histogram()
+    for value in [1] * 90 + [100] * 10:
+        histogram.add(value)
+    summary = histogram.summary()
+    assert summary['count'] == 100 and summary['p50'] == 1 and summary['p95'] == 100 and summary['max'] == 100
+    assert summary['buckets'] == [{'le': 1.0, 'count': 90}, {'le': 128.0, 'count': 10}]
+
+    histograms = EngineHistograms()
+    for wall in (5, 50):
+        profile = CheckProfile()
+        profile.add_time('phrase', wall / 1000)
+        profile.count('phrase', tokens=1000)
+        histograms.record(profile)
+    summary = histograms.summary(stage='phrase', metric='wall_ms')
+    assert summary['checks'] == 2 and list(summary['stages']['phrase']) == ['wall_ms']
+    assert summary['stages']['phrase']['wall_ms']['count'] == 2
+    histograms.reset()
+    assert histograms.summary() == {'checks': 0, 'stages': {}}
+    print("✅ Histograms aggregate profiles")
+
+def main():
+    """Run all tests"""
+    print("🧪 ENGINE METRICS TESTING")
+    print("=" * 60)
+
+    test_profile_stages()
+    test_untraced_profile()
+    test_histograms()
+
+    print("\n🎉 All engine metrics tests passed!")
+
+if __name__ == "__main__":
+    main()
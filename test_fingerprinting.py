@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Test the winnowed fingerprinting module used by the plagiarism engine
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fingerprinting import (
+    tokenize, hash_token, compute_fingerprints, pack_fingerprints, unpack_fingerprints, ngram_hashes,
+    build_fragments, FingerprintIndex, top_k_by_shared, HASH_BASE, HASH_MOD, DEFAULT_KGRAM_LENGTH, DEFAULT_WINDOW_SIZE
+)
+
+ORIGINAL = (
+    "Artificial Intelligence has revolutionized education. Machine learning algorithms "
+    "help students learn better by adapting lessons to their individual pace and style. "
+    "Teachers receive insights about which topics need more attention in class."
+)
+COPIED = ORIGINAL.replace("revolutionized", "transformed") + " This paragraph was added at the end."
+DIFFERENT = (
+    "Renewable energy technologies are transforming the power sector. Solar panels are "
+    "becoming more efficient and wind farms now supply a large share of electricity."
+)
+
+def test_rolling_hash_matches_direct_hash():
+    """Every winnowed k-gram hash equals the hash computed from scratch"""
+    print("🔍 Testing rolling k-gram hashes...")
+    tokens, _ = tokenize(ORIGINAL)
+    token_hashes = [hash_token(token) for token in tokens]
+
+    for fingerprint in compute_fingerprints(ORIGINAL):
+        expected = 0
+        for token_hash in token_hashes[fingerprint.start:fingerprint.stop + 1]:
+            expected = (expected * HASH_BASE + token_hash) % HASH_MOD
+        assert fingerprint.hash == expected
+        assert fingerprint.stop - fingerprint.start + 1 == DEFAULT_KGRAM_LENGTH
+    print("✅ Rolling hashes are consistent")
+
+def test_winnowing_guarantee():
+    """At least one k-gram is selected from every window"""
+    print("🔍 Testing winnowing guarantee...")
+    tokens, _ = tokenize(ORIGINAL)
+    starts = {fingerprint.start for fingerprint in compute_fingerprints(ORIGINAL)}
+    kgram_count = len(tokens) - DEFAULT_KGRAM_LENGTH + 1
+
+    for window_start in range(kgram_count - DEFAULT_WINDOW_SIZE + 1):
+        window = range(window_start, window_start + DEFAULT_WINDOW_SIZE)
+        assert any(start in starts for start in window), f"window {window_start} has no fingerprint"
+    print(f"✅ {len(starts)} fingerprints selected from {kgram_count} k-grams")
+
+def test_character_spans():
+    """Fingerprints point at the matching text in the original document"""
+    print("🔍 Testing fingerprint character spans...")
+    tokens, _ = tokenize(ORIGINAL)
+    for fingerprint in compute_fingerprints(ORIGINAL):
+        region = ORIGINAL[fingerprint.char_start:fingerprint.char_end].lower()
+        assert tokenize(region)[0] == tokens[fingerprint.start:fingerprint.stop + 1]
+    print("✅ Character spans are correct")
+
+def test_pack_round_trip():
+    """Stored fingerprints unpack to the same values"""
+    print("🔍 Testing fingerprint serialization...")
+    fingerprints = compute_fingerprints(ORIGINAL)
+    assert unpack_fingerprints(pack_fingerprints(fingerprints)) == fingerprints
+    assert unpack_fingerprints(None) == []
+    print("✅ Serialization round trip works")
+
+def test_fingerprint_index():
+    """The index finds the copied document without re-hashing anything"""
+    print("🔍 Testing fingerprint index lookups...")
+    index = FingerprintIndex()
+    index.add('copied', compute_fingerprints(COPIED))
+    index.add('different', compute_fingerprints(DIFFERENT))
+
+    similarities = index.similarities(compute_fingerprints(ORIGINAL))
+    print(f"📊 Copied: {similarities['copied'] * 100:.1f}%, Different: {similarities['different'] * 100:.1f}%")
+    assert similarities['copied'] > 0.5
+    assert similarities['different'] == 0.0
+    assert index.max_similarity(compute_fingerprints(ORIGINAL))[0] == 'copied'
+
+    top = index.top_k(compute_fingerprints(ORIGINAL), k=5)
+    assert [doc_id for doc_id, _, _ in top] == ['copied'], "documents sharing nothing are never ranked"
+    assert abs(top[0][1] - similarities['copied']) < 1e-12
+
+    index.remove('copied')
+    assert 'copied' not in index
+    assert index.max_similarity(compute_fingerprints(ORIGINAL)) == ('different', 0.0)
+    print("✅ Index lookups work")
+
+def test_top_k_by_shared():
+    """Top-k ranks by Jaccard similarity from shared counts alone"""
+    print("🔍 Testing top-k ranking...")
+    shared = {'a': 10, 'b': 10, 'c': 2, 'd': 30}
+    sizes = {'a': 10, 'b': 40, 'c': 2, 'd': 200}
+    top = top_k_by_shared(20, shared, sizes, k=3)
+    assert [doc_id for doc_id, _, _ in top] == ['a', 'b', 'd']
+    assert top[0] == ('a', 0.5, 10)
+    assert top_k_by_shared(20, {}, {}, k=5) == []
+    print("✅ Top-k ranked")
+
+def test_ngram_hashes():
+    """Equal n-grams hash equal, every n-gram of every length is hashed once"""
+    print("🔍 Testing n-gram hashes...")
+    tokens, _ = tokenize(ORIGINAL + " " + ORIGINAL)
+    hashes = ngram_hashes([hash_token(token) for token in tokens], 3, 8)
+    assert len(hashes) == sum(len(tokens) - n + 1 for n in range(3, 9))
+
+    ngrams = [tuple(tokens[i:i + n]) for n in range(3, 9) for i in range(len(tokens) - n + 1)]
+    by_ngram = {}
+    for ngram, ngram_hash in zip(ngrams, hashes.tolist()):
+        assert by_ngram.setdefault(ngram, ngram_hash) == ngram_hash
+    assert len(set(by_ngram.values())) == len(by_ngram)
+    assert len(ngram_hashes([hash_token("too"), hash_token("short")], 3, 8)) == 0
+    print(f"✅ {len(by_ngram)} distinct n-grams, no collisions")
+
+def test_build_fragments():
+    """Consecutive shared fingerprints merge into fragments covering the copied text"""
+    print("🔍 Testing matched fragments...")
+    left, right = compute_fingerprints(ORIGINAL), compute_fingerprints(COPIED)
+    fragments = build_fragments(left, right)
+    assert fragments
+    for fragment in fragments:
+        # Both sides of a fragment cover the same words
+        assert tokenize(ORIGINAL[fragment.left_char_start:fragment.left_char_end])[0] == \
+            tokenize(COPIED[fragment.right_char_start:fragment.right_char_end])[0]
+        assert fragment.occurrences == fragment.left_stop - fragment.left_start
+    longest = max(fragments, key=lambda fragment: fragment.occurrences)
+    assert "Teachers receive insights" in ORIGINAL[longest.left_char_start:longest.left_char_end]
+
+    # A document against itself is one fragment, unrelated documents have none
+    assert len(build_fragments(left, left)) == 1 and build_fragments(left, left)[0].occurrences == len(left)
+    assert build_fragments(left, compute_fingerprints(DIFFERENT)) == []
+
+    # Endlessly repeated text pairs nothing instead of every occurrence with every other
+    repeated = compute_fingerprints("same words again " * 2000)
+    assert sum(fragment.occurrences for fragment in build_fragments(repeated, repeated)) < 10
+    print(f"✅ {len(fragments)} fragments, longest {longest.occurrences} fingerprints")
+
+def main():
+    """Run all tests"""
+    print("🧪 FINGERPRINTING TESTING")
+    print("=" * 60)
+
+    test_rolling_hash_matches_direct_hash()
+    test_winnowing_guarantee()
+    test_character_spans()
+    test_pack_round_trip()
+    test_fingerprint_index()
+    test_top_k_by_shared()
+    test_ngram_hashes()
+    test_build_fragments()
+
+    print("\n🎉 All fingerprinting tests passed!")
+
+if __name__ == "__main__":
+    main()
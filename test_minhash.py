@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test the MinHash signatures and LSH candidate index used for wider comparison scopes
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fingerprinting import compute_fingerprints
+from minhash import (
+    minhash_signature, pack_signature, unpack_signature, estimate_jaccard, band_buckets,
+    LSHIndex, DEFAULT_BANDS, DEFAULT_NUM_PERMUTATIONS
+)
+
+ORIGINAL = (
+    "Artificial Intelligence has revolutionized education. Machine learning algorithms "
+    "help students learn better by adapting lessons to their individual pace and style. "
+    "Teachers receive insights about which topics need more attention in class. "
+    "Automated feedback on essays lets students revise their work before submitting it."
+)
+COPIED = ORIGINAL.replace("revolutionized", "transformed") + " This paragraph was added at the end."
+DIFFERENT = (
+    "Renewable energy technologies are transforming the power sector. Solar panels are "
+    "becoming more efficient and wind farms now supply a large share of electricity."
+)
+
+def hashes(text):
+    return {fingerprint.hash for fingerprint in compute_fingerprints(text)}
+
+def test_estimate_close_to_jaccard():
+    """The signature estimate is close to the exact fingerprint Jaccard similarity"""
+    print("🔍 Testing MinHash estimates...")
+    a, b = hashes(ORIGINAL), hashes(COPIED)
+    exact = len(a & b) / len(a | b)
+    estimate = estimate_jaccard(minhash_signature(a), minhash_signature(b))
+    print(f"📊 Exact: {exact:.3f}, estimate: {estimate:.3f}")
+    assert abs(exact - estimate) < 0.15
+    assert estimate_jaccard(minhash_signature(a), minhash_signature(a)) == 1.0
+    assert estimate_jaccard(minhash_signature(a), minhash_signature(hashes(DIFFERENT))) < 0.1
+    print("✅ Estimates are accurate")
+
+def test_signature_round_trip():
+    """Stored signatures unpack to the same values, empty documents have no buckets"""
+    print("🔍 Testing signature serialization...")
+    signature = minhash_signature(hashes(ORIGINAL))
+    assert len(signature) == DEFAULT_NUM_PERMUTATIONS
+    assert (unpack_signature(pack_signature(signature)) == signature).all()
+    assert len(band_buckets(signature)) == DEFAULT_BANDS
+    assert band_buckets(minhash_signature([])) == []
+    print("✅ Serialization round trip works")
+
+def test_chunked_signature():
+    """Signatures of large sets are folded over chunks and equal the minima over the whole set"""
+    print("🔍 Testing chunked signatures...")
+    import minhash
+    values = list(range(1, 5000, 3))
+    chunked = minhash_signature(values)
+    chunk_size = minhash.CHUNK_SIZE
+    minhash.CHUNK_SIZE = 7
+    try:
+        assert (minhash_signature(values) == chunked).all()
+    finally:
+        minhash.CHUNK_SIZE = chunk_size
+    print("✅ Chunks give the same signature")
+
+def test_lsh_candidates():
+    """The near copy is a candidate, the unrelated document is not"""
+    print("🔍 Testing LSH candidates...")
+    index = LSHIndex()
+    index.add('copied', minhash_signature(hashes(COPIED)))
+    index.add('different', minhash_signature(hashes(DIFFERENT)))
+
+    candidates = index.candidates(minhash_signature(hashes(ORIGINAL)))
+    assert candidates == {'copied'}
+
+    index.remove('copied')
+    assert 'copied' not in index and len(index) == 1
+    assert index.candidates(minhash_signature(hashes(ORIGINAL))) == set()
+    print("✅ LSH candidates found")
+
+def main():
+    """Run all tests"""
+    print("🧪 MINHASH / LSH TESTING")
+    print("=" * 60)
+
+    test_estimate_close_to_jaccard()
+    test_signature_round_trip()
+    test_chunked_signature()
+    test_lsh_candidates()
+
+    print("\n🎉 All MinHash tests passed!")
+
+if __name__ == "__main__":
+    main()
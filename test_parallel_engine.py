@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test the multi-process all-pairs engine against the sequential similarity matrices
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+TEXTS = [
+    "Artificial Intelligence has revolutionized education. Machine learning algorithms help students "
+    "learn better by adapting lessons to their pace.\n\nTeachers receive insights about difficult topics.",
+    "Artificial Intelligence has transformed education. Machine learning algorithms help students "
+    "learn better by adapting lessons to their pace.\n\nTeachers receive insights about hard topics.",
+    "Renewable energy technologies are transforming the power sector. Solar panels are becoming more "
+    "efficient and wind farms now supply a large share of electricity.",
+    "Climate change affects agriculture worldwide. Farmers adapt planting seasons, irrigation and crop "
+    "choices as rainfall patterns shift.\n\nResearch helps them plan ahead.",
+    "def add(a, b):\n    total = a + b\n    return total\n\nprint(add(1, 2))\n",
+    "def plus(x, y):\n    result = x + y\n    return result\n\nprint(plus(3, 4))\n",
+]
+
+def test_partition_pairs():
+    """Row ranges cover every pair once with balanced pair counts"""
+    print("🔍 Testing pair space partitioning...")
+    from parallel_engine import partition_pairs
+
+    for n, parts in [(2, 4), (7, 3), (100, 8), (801, 32)]:
+        ranges = partition_pairs(n, parts)
+        assert ranges[0][0] == 0 and ranges[-1][1] == n - 1
+        assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+        counts = [sum(n - 1 - i for i in range(start, stop)) for start, stop in ranges]
+        assert sum(counts) == n * (n - 1) // 2
+        assert len(ranges) <= parts
+    assert max(counts) < 2 * (sum(counts) / len(counts))
+    assert partition_pairs(1, 4) == []
+    print(f"✅ {len(ranges)} ranges for 801 documents")
+
+def test_shared_arrays():
+    """Ragged arrays come back unchanged from the shared block"""
+    print("🔍 Testing shared arrays...")
+    from parallel_engine import SharedArrays, attach_field
+
+    arrays = [np.arange(5, dtype=np.int64), np.zeros(0, dtype=np.int64), np.array([7, 9], dtype=np.int64)]
+    floats = [np.array([0.5]), np.array([1.5, 2.5, 3.5]), np.array([])]
+    shared = SharedArrays({'ints': arrays, 'floats': floats})
+    try:
+        for name, expected in (('ints', arrays), ('floats', floats)):
+            values, offsets = attach_field(shared.memory, shared.layout[name])
+            for i, array in enumerate(expected):
+                assert np.array_equal(values[offsets[i]:offsets[i + 1]], array)
+    finally:
+        shared.close()
+    print("✅ Arrays shared without loss")
+
+def test_parallel_matches_sequential():
+    """The process pool produces exactly the sequential matrices"""
+    print("🔍 Testing parallel engine...")
+    from app import app, calculate_similarity_matrices, preprocess_documents
+    from ast_clones import subtree_hashes
+
+    documents = preprocess_documents(TEXTS)
+    subtrees = [None] * 4 + [subtree_hashes(text, min_nodes=3) for text in TEXTS[4:]]
+    previous = (app.config['PLAGIARISM_WORKERS'], app.config['PLAGIARISM_PARALLEL_MIN_DOCUMENTS'])
+    try:
+        app.config['PLAGIARISM_PARALLEL_MIN_DOCUMENTS'] = 10 ** 9
+        sequential = calculate_similarity_matrices(documents, subtrees=subtrees)
+
+        app.config['PLAGIARISM_WORKERS'], app.config['PLAGIARISM_PARALLEL_MIN_DOCUMENTS'] = 2, 2
+        stats = {}
+        parallel = calculate_similarity_matrices(documents, subtrees=subtrees, stats=stats)
+    finally:
+        app.config['PLAGIARISM_WORKERS'], app.config['PLAGIARISM_PARALLEL_MIN_DOCUMENTS'] = previous
+
+    assert stats['pairs'] == len(TEXTS) * (len(TEXTS) - 1) // 2 and stats['workers'] == 2
+    for method in sequential:
+        assert np.array_equal(sequential[method], parallel[method]), method
+    assert parallel['structure'][4, 5] == 100.0
+    print(f"✅ {stats['pairs']} pairs in {stats['tasks']} tasks, {stats['elapsed_ms']} ms")
+
+def main():
+    """Run all tests"""
+    print("🧪 PARALLEL ENGINE TESTING")
+    print("=" * 60)
+
+    test_partition_pairs()
+    test_shared_arrays()
+    test_parallel_matches_sequential()
+
+    print("\n🎉 All parallel engine tests passed!")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Test the plagiarism backend registry: cached health, circuit breakers and routing
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from plagiarism_backends import Backend, BackendRegistry, BackendUnavailable, CircuitBreaker, file_kind
+
+class Clock:
+    """Manually advanced time"""
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def test_circuit_breaker():
+    """Repeated failures open the circuit, a successful trial after the timeout closes it"""
+    print("🔍 Testing circuit breaker...")
+    clock = Clock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=clock)
+
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open' and not breaker.allow()
+
+    clock.now += 30
+    assert breaker.allow() and breaker.state == 'half_open'
+    assert not breaker.allow(), "only one trial call while half open"
+    breaker.record_failure()
+    assert breaker.state == 'open' and not breaker.allow()
+
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed' and breaker.allow()
+    print("✅ Circuit opens and recovers")
+
+def test_health_is_cached():
+    """Routing never probes; probes only run on registration and when refreshed after the TTL"""
+    print("🔍 Testing cached health...")
+    clock = Clock()
+    probes = []
+    def probe():
+        probes.append(clock.now)
+        return len(probes) > 1  # Unhealthy at startup, healthy afterwards
+
+    registry = BackendRegistry()
+    registry.register(Backend('dolos', 'peer', ['code'], probe, health_ttl=60, clock=clock))
+    registry.register(Backend('local', 'peer', ['code', 'text'], lambda: True, priority=100, clock=clock))
+
+    for _ in range(100):
+        assert [backend.name for backend in registry.route('peer', 'main.py')] == ['local']
+    assert len(probes) == 1
+
+    registry.refresh_health()
+    assert len(probes) == 1, "result still fresh"
+    clock.now += 60
+    registry.refresh_health()
+    assert len(probes) == 2
+    assert [backend.name for backend in registry.route('peer', 'main.py')] == ['dolos', 'local']
+    print(f"✅ {len(probes)} probes for 100 routed checks")
+
+def test_routing_by_file_type():
+    """Code goes to code backends first, documents skip them"""
+    print("🔍 Testing routing...")
+    registry = BackendRegistry()
+    registry.register(Backend('dolos', 'peer', ['code'], lambda: True))
+    registry.register(Backend('local', 'peer', ['code', 'text'], lambda: True, priority=100))
+    registry.register(Backend('plagium', 'web', ['text'], lambda: True))
+
+    assert file_kind('essay.docx') == 'text' and file_kind('Main.java') == 'code' and file_kind(None) is None
+    assert [b.name for b in registry.route('peer', 'Main.java')] == ['dolos', 'local']
+    assert [b.name for b in registry.route('peer', 'essay.docx')] == ['local']
+    assert [b.name for b in registry.route('peer')] == ['dolos', 'local'], "unknown files may go anywhere"
+    assert [b.name for b in registry.route('web', 'essay.txt')] == ['plagium']
+    print("✅ Routed by file type")
+
+def test_failures_open_circuit():
+    """Failed calls are timed and recorded; after the threshold the backend is no longer routed to"""
+    print("🔍 Testing failing backend...")
+    registry = BackendRegistry()
+    dolos = registry.register(Backend('dolos', 'peer', ['code'], lambda: True, failure_threshold=3))
+    registry.register(Backend('local', 'peer', ['code', 'text'], lambda: True, priority=100))
+
+    def failing():
+        raise BackendUnavailable("Node.js not available")
+
+    for _ in range(3):
+        assert registry.route('peer', 'main.py')[0] is dolos
+        try:
+            registry.call(dolos, failing)
+            assert False, "should raise"
+        except BackendUnavailable:
+            pass
+    assert [b.name for b in registry.route('peer', 'main.py')] == ['local']
+    assert registry.call(registry.get('local'), lambda x: x * 2, 21) == 42
+
+    status = {entry['name']: entry for entry in registry.status()}
+    assert status['dolos']['circuit'] == 'open' and status['dolos']['errors'] == 3
+    assert status['dolos']['last_error'] == "Node.js not available"
+    assert status['local']['calls'] == 1 and 'p95' in status['local']['latency_ms']
+    print("✅ Failing backend skipped")
+
+def test_raising_probe_is_unhealthy():
+    """A probe that raises marks the backend unhealthy instead of breaking startup"""
+    print("🔍 Testing raising probe...")
+    def probe():
+        raise OSError("node: not found")
+    registry = BackendRegistry()
+    backend = registry.register(Backend('plagium', 'web', ['text'], probe))
+    assert not backend.healthy and 'node: not found' in backend.last_error
+    assert registry.route('web', 'essay.txt') == []
+    print("✅ Raising probe handled")
+
+def main():
+    """Run all tests"""
+    print("🧪 PLAGIARISM BACKEND REGISTRY TESTING")
+    print("=" * 60)
+
+    test_circuit_breaker()
+    test_health_is_cached()
+    test_routing_by_file_type()
+    test_failures_open_circuit()
+    test_raising_probe_is_unhealthy()
+
+    print("\n🎉 All backend registry tests passed!")
+
+if __name__ == "__main__":
+    main()
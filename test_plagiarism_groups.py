@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Test the union-find clustering of plagiarism pairs into collusion groups
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from clustering import UnionFind, cluster_pairs
+
+def test_union_find():
+    """Unions merge sets, finds agree within a set"""
+    print("🔍 Testing union-find...")
+    sets = UnionFind()
+    for a, b in [(1, 2), (3, 4), (2, 3), (5, 6)]:
+        sets.union(a, b)
+    sets.add(7)
+    assert sets.find(1) == sets.find(4) and sets.find(5) == sets.find(6)
+    assert sets.find(1) != sets.find(5)
+    assert sorted(sorted(group) for group in sets.groups()) == [[1, 2, 3, 4], [5, 6], [7]]
+    assert sorted(sorted(group) for group in sets.groups(min_size=2)) == [[1, 2, 3, 4], [5, 6]]
+    print("✅ Sets merged")
+
+def test_cluster_pairs():
+    """Five students sharing a source form one group, weak pairs are ignored"""
+    print("🔍 Testing pair clustering...")
+    edges = [
+        (1, 2, 92.0), (2, 3, 75.0), (3, 4, 64.0), (4, 5, 81.0),  # chain through a shared source
+        (6, 7, 55.0),
+        (5, 6, 20.0), (8, 9, 10.0),                               # below the threshold
+    ]
+    groups = cluster_pairs(edges, threshold=50.0)
+    assert groups == [([1, 2, 3, 4, 5], 92.0), ([6, 7], 55.0)]
+    assert cluster_pairs(edges, threshold=95.0) == []
+    print(f"✅ {len(groups)} groups, largest of {len(groups[0][0])}")
+
+def test_assignment_groups():
+    """Pair scores from the similarity matrices group copied submissions"""
+    print("🔍 Testing assignment groups...")
+    from types import SimpleNamespace
+    from app import calculate_similarity_matrices, calculate_pair_scores, find_plagiarism_groups
+    from text_preprocessing import preprocess_documents
+
+    source = ("Artificial Intelligence has revolutionized education. Machine learning algorithms help students "
+              "learn better by adapting lessons to their pace. Teachers receive insights about difficult topics.")
+    contents = [
+        source,
+        source.replace("revolutionized", "transformed"),
+        source.replace("difficult", "hard"),
+        "Renewable energy technologies are transforming the power sector. Solar panels are becoming more "
+        "efficient and wind farms now supply a large share of electricity.",
+    ]
+    matrices = calculate_similarity_matrices(preprocess_documents(contents))
+    pair_scores = calculate_pair_scores(matrices, range(len(contents)))
+    assert (pair_scores == pair_scores.T).all()
+
+    submissions = [SimpleNamespace(id=100 + i) for i in range(len(contents))]
+    groups = find_plagiarism_groups(pair_scores, submissions, threshold=50.0)
+    assert [members for members, _ in groups] == [[100, 101, 102]]
+    print(f"✅ Group of {len(groups[0][0])}, highest pair score {groups[0][1]:.1f}%")
+
+def main():
+    """Run all tests"""
+    print("🧪 PLAGIARISM GROUP TESTING")
+    print("=" * 60)
+
+    test_union_find()
+    test_cluster_pairs()
+    test_assignment_groups()
+
+    print("\n🎉 All plagiarism group tests passed!")
+
+if __name__ == "__main__":
+    main()
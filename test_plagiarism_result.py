@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test the structured plagiarism result and the reports rendered from it
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from types import SimpleNamespace
+
+ORIGINAL = (
+    "Artificial Intelligence has revolutionized education. Machine learning algorithms help students "
+    "learn better by adapting lessons to their pace. Teachers receive insights about difficult topics."
+)
+OTHERS = [
+    ORIGINAL.replace("revolutionized", "transformed"),
+    "Renewable energy technologies are transforming the power sector. Solar panels are becoming more "
+    "efficient and wind farms now supply a large share of electricity.",
+]
+
+def test_result_matches_score():
+    """The structured result carries the same score as the plain local check"""
+    print("🔍 Testing structured local result...")
+    from app import calculate_local_plagiarism_result, calculate_local_plagiarism_score, PLAGIARISM_ENGINE_VERSION
+
+    peers = [SimpleNamespace(id=i, content=content) for i, content in enumerate(OTHERS, start=1)]
+    result = calculate_local_plagiarism_result(ORIGINAL, peers)
+    assert result.score == calculate_local_plagiarism_score(ORIGINAL, peers)
+    assert result.match_id == 1 and result.compared == 2
+    assert result.engine_version == PLAGIARISM_ENGINE_VERSION
+    assert set(result.timings) == set(result.scores)
+    assert result.content['words'] > 0
+    print(f"✅ Score {result.score}%, best match {result.match_id}, {result.total_time:.1f} ms")
+
+def test_json_round_trip():
+    """Stored details load back into an equal result"""
+    print("🔍 Testing JSON round trip...")
+    from app import calculate_local_plagiarism_result
+    from plagiarism_result import PlagiarismResult
+
+    result = calculate_local_plagiarism_result(ORIGINAL, [SimpleNamespace(content=content) for content in OTHERS])
+    data = result.to_json()
+    assert ' ' not in data.split('"common_words"')[0], "details should be compact"
+    restored = PlagiarismResult.from_json(data)
+    assert restored.to_dict() == result.to_dict()
+    assert restored.render_text() == result.render_text()
+
+    # Details stored before the overall score was included
+    legacy = PlagiarismResult.from_json('{"mode":"single","scores":{"tfidf":1.0},"compared":3}', score=12.5)
+    assert legacy.score == 12.5 and legacy.compared == 3
+    assert PlagiarismResult.from_json(None) is None and PlagiarismResult.from_json('not json') is None
+    print(f"✅ {len(data)} bytes of details")
+
+def test_report_renders_without_recomputation():
+    """The detailed report renders from the result alone"""
+    print("🔍 Testing report rendering...")
+    import app as app_module
+
+    result = app_module.calculate_local_plagiarism_result(
+        ORIGINAL, [SimpleNamespace(content=content) for content in OTHERS]
+    )
+    originals = {name: getattr(app_module, name) for name in (
+        'calculate_tfidf_similarity', 'calculate_semantic_similarity', 'calculate_fingerprint_similarity',
+        'calculate_phrase_similarity', 'calculate_structure_similarity', 'preprocess_documents'
+    )}
+
+    def fail(*args, **kwargs):
+        raise AssertionError("report recomputed a similarity method")
+
+    try:
+        for name in originals:
+            setattr(app_module, name, fail)
+        report = app_module.generate_detailed_plagiarism_report(ORIGINAL, OTHERS, result=result)
+    finally:
+        for name, function in originals.items():
+            setattr(app_module, name, function)
+
+    assert f"{result.score:.2f}%" in report
+    assert f"Semantic Similarity: {result.scores['semantic']:.1f}%" in report
+    assert "Error generating" not in report
+    print("✅ Report rendered from the stored result")
+
+def test_highlight_segments():
+    """Stored fragment ranges split both texts into copied and original pieces"""
+    print("🔍 Testing highlighted fragments...")
+    from app import calculate_local_plagiarism_result
+    from plagiarism_result import highlight_segments
+
+    result = calculate_local_plagiarism_result(ORIGINAL, [SimpleNamespace(content=content) for content in OTHERS])
+    assert result.fragments and result.match_id is None
+    segments = result.highlight(ORIGINAL)
+    assert ''.join(segment for segment, _ in segments) == ORIGINAL
+    assert sum(len(segment) for segment, copied in segments if copied) == result.copied_characters
+    assert "Machine learning algorithms" in ''.join(segment for segment, copied in result.match_highlight(OTHERS[0]) if copied)
+
+    # Overlapping and out of range ranges are merged and clipped
+    assert highlight_segments("abcdef", [(1, 3), (2, 4), (5, 99)]) == [
+        ("a", False), ("bcd", True), ("e", False), ("f", True)
+    ]
+    print(f"✅ {len(result.fragments)} fragments, {result.copied_characters} characters copied")
+
+def main():
+    """Run all tests"""
+    print("🧪 PLAGIARISM RESULT TESTING")
+    print("=" * 60)
+
+    test_result_matches_score()
+    test_json_round_trip()
+    test_report_renders_without_recomputation()
+    test_highlight_segments()
+
+    print("\n🎉 All plagiarism result tests passed!")
+
+if __name__ == "__main__":
+    main()
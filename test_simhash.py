@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Test paragraph SimHashes and the permuted-table Hamming index
+"""
+
+import os
+import random
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+PARAGRAPH = (
+    "Machine learning algorithms help students learn better by adapting lessons to their "
+    "individual pace. Teachers receive detailed insights about which topics students find "
+    "difficult, allowing them to focus classroom time where it matters most and to support "
+    "those who are falling behind."
+)
+# Sentences swapped, words inflected differently
+REWORDED = (
+    "Teachers receive detailed insight about which topics students find difficult, allowing "
+    "them to focus classroom time where it matters most and to support those who are falling "
+    "behind. Machine learning algorithms helps students learn better by adapted lessons to "
+    "their individual pace."
+)
+UNRELATED = (
+    "Renewable energy technologies are transforming the power sector. Solar panels are "
+    "becoming more efficient every year and wind farms now supply a large share of the "
+    "electricity used in many countries, steadily reducing emissions."
+)
+
+def test_reworded_paragraphs():
+    """A reworded paragraph stays within a few bits, an unrelated one does not"""
+    print("🔍 Testing paragraph SimHashes...")
+    from simhash import paragraph_simhashes, hamming_distance, MAX_HAMMING_DISTANCE
+
+    text = "Introduction\n\n" + PARAGRAPH + "\n\nThanks.\n\n" + UNRELATED
+    paragraphs = paragraph_simhashes(text)
+    assert [p.position for p in paragraphs] == [0, 1], "headings and short lines are skipped"
+    assert text[paragraphs[0].char_start:paragraphs[0].char_end] == PARAGRAPH
+
+    reworded = paragraph_simhashes(REWORDED)[0].simhash
+    close = hamming_distance(paragraphs[0].simhash, reworded)
+    far = hamming_distance(paragraphs[1].simhash, reworded)
+    print(f"   reworded: {close} bits, unrelated: {far} bits")
+    assert close <= MAX_HAMMING_DISTANCE < far
+
+    # Text without blank lines is split at line breaks
+    assert len(paragraph_simhashes(PARAGRAPH + "\n" + UNRELATED)) == 2
+    print("✅ Reworded paragraph detected")
+
+def test_index_matches_brute_force():
+    """The index returns exactly the hashes a full scan finds, including pending ones"""
+    print("🔍 Testing permuted-table index...")
+    from simhash import SimHashIndex, hamming_distance, table_masks
+
+    assert len(table_masks(3)) == 20 and table_masks(0) == [(1 << 64) - 1]
+
+    rng = random.Random(7)
+    hashes = [rng.getrandbits(64) for _ in range(20000)]
+    queries = []
+    for value in hashes[:50]:
+        for bit in rng.sample(range(64), rng.randint(0, 3)):
+            value ^= 1 << bit
+        queries.append(value)
+    queries += [rng.getrandbits(64) for _ in range(50)]
+
+    index = SimHashIndex()
+    for start in range(0, len(hashes), 3000):
+        index.add(hashes[start:start + 3000], list(range(start, min(start + 3000, len(hashes)))))
+    assert len(index) == len(hashes) and index.indexed < len(hashes)
+
+    for query in queries:
+        expected = sorted((hamming_distance(query, value), label) for label, value in enumerate(hashes)
+                          if hamming_distance(query, value) <= 3)
+        assert index.query(query) == [(label, distance) for distance, label in expected]
+    assert index.query(hashes[60], max_distance=0) == [(60, 0)]
+    print("✅ Index agrees with a full scan")
+
+def test_signed_storage():
+    """Hashes survive the round trip through a signed BIGINT column"""
+    print("🔍 Testing signed storage...")
+    from simhash import to_signed, to_unsigned
+
+    for value in (0, 1, (1 << 63) - 1, 1 << 63, (1 << 64) - 1):
+        assert -(1 << 63) <= to_signed(value) < 1 << 63
+        assert to_unsigned(to_signed(value)) == value
+    print("✅ Signed storage round trip")
+
+def main():
+    """Run all tests"""
+    print("🧪 PARAGRAPH SIMHASH TESTING")
+    print("=" * 60)
+
+    test_reworded_paragraphs()
+    test_index_matches_brute_force()
+    test_signed_storage()
+
+    print("\n🎉 All SimHash tests passed!")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test the fingerprint-anchored side-by-side comparison
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fingerprinting import Fragment, compute_fingerprints, build_fragments
+from submission_diff import anchor_chain, side_by_side_rows
+
+ORIGINAL = """Artificial Intelligence has revolutionized education.
+Machine learning algorithms help students learn better by adapting lessons to their pace.
+Teachers receive insights about which topics need more attention in class.
+Automated feedback on essays lets students revise their work before submitting it.
+A closing remark written by the first student."""
+
+COPIED = """An opening sentence that only the second student wrote.
+Artificial Intelligence has revolutionized education.
+Machine learning algorithms help students learn better by adapting lessons to their pace.
+Teachers receive insights about which topics need more attention in class.
+Automated feedback on essays lets students revise their work before submitting it.
+A different ending from the second student."""
+
+def fragment(left_start, left_end, right_start, right_end, occurrences):
+    return Fragment(0, occurrences, 0, occurrences, left_start, left_end, right_start, right_end, occurrences)
+
+def test_anchor_chain():
+    """The heaviest ordered, non-overlapping chain is chosen"""
+    print("🔍 Testing anchor chain...")
+    a = fragment(0, 10, 50, 60, 3)
+    b = fragment(20, 30, 0, 10, 2)     # crosses a
+    c = fragment(40, 50, 70, 80, 3)    # follows a
+    d = fragment(45, 55, 90, 95, 1)    # overlaps c on the left
+    assert anchor_chain([a, b, c, d]) == [a, c]
+    assert anchor_chain([b, d]) == [b, d]
+    assert anchor_chain([]) == []
+    print("✅ Chain is ordered and heaviest")
+
+def test_rows_cover_both_documents():
+    """Rows reproduce both documents, copied lines tagged as such"""
+    print("🔍 Testing side-by-side rows...")
+    anchors = anchor_chain(build_fragments(compute_fingerprints(ORIGINAL), compute_fingerprints(COPIED)))
+    rows = list(side_by_side_rows(ORIGINAL, COPIED, anchors))
+
+    left = ' '.join(line for _, line, _ in rows if line is not None)
+    right = ' '.join(line for _, _, line in rows if line is not None)
+    # Anchors end at token boundaries, so only whitespace may differ
+    assert ''.join(left.split()) == ''.join(ORIGINAL.split())
+    assert ''.join(right.split()) == ''.join(COPIED.split())
+
+    copied = ' '.join(line for tag, line, _ in rows if tag == 'copied' and line)
+    assert "Machine learning algorithms help students" in copied
+    assert "closing remark" not in copied
+    assert {tag for tag, _, _ in rows} <= {'copied', 'equal', 'replace', 'delete', 'insert'}
+    print(f"✅ {len(rows)} rows, {len(anchors)} anchors")
+
+def test_large_gaps_skip_difflib():
+    """Gaps above the line limit are shown as replaced without diffing"""
+    print("🔍 Testing large gaps...")
+    left = '\n'.join(f"left line {i}" for i in range(50))
+    right = '\n'.join(f"right line {i}" for i in range(60))
+    rows = list(side_by_side_rows(left, right, [], max_diff_lines=10))
+    assert len(rows) == 60 and all(tag == 'replace' for tag, _, _ in rows)
+    assert rows[-1][1] is None
+    print("✅ Large gaps are paired line by line")
+
+def test_rows_from_files():
+    """Files read forward in small chunks give the same rows as the whole texts"""
+    print("🔍 Testing rows read from files...")
+    import tempfile
+    import submission_diff
+
+    texts = [ORIGINAL.replace('\n', '\r\n'), COPIED + '\n\n']
+    paths = []
+    for text in texts:
+        with tempfile.NamedTemporaryFile('wb', suffix='.txt', delete=False) as f:
+            f.write(text.encode('utf-8'))
+            paths.append(f.name)
+    previous = submission_diff.READ_CHUNK_CHARS
+    submission_diff.READ_CHUNK_CHARS = 7
+    try:
+        contents = []
+        for path in paths:
+            with open(path, encoding='utf-8') as f:
+                contents.append(f.read())
+        anchors = anchor_chain(build_fragments(compute_fingerprints(contents[0]), compute_fingerprints(contents[1])))
+        with open(paths[0], encoding='utf-8') as left, open(paths[1], encoding='utf-8') as right:
+            rows = list(side_by_side_rows(left, right, anchors))
+        assert anchors and rows == list(side_by_side_rows(contents[0], contents[1], anchors))
+        with open(paths[0], encoding='utf-8') as left, open(paths[1], encoding='utf-8') as right:
+            assert list(side_by_side_rows(left, right, [], max_diff_lines=2)) == \
+                list(side_by_side_rows(contents[0], contents[1], [], max_diff_lines=2))
+    finally:
+        submission_diff.READ_CHUNK_CHARS = previous
+        for path in paths:
+            os.remove(path)
+    print(f"✅ {len(rows)} identical rows")
+
+def main():
+    """Run all tests"""
+    print("🧪 SUBMISSION DIFF TESTING")
+    print("=" * 60)
+
+    test_anchor_chain()
+    test_rows_cover_both_documents()
+    test_large_gaps_skip_difflib()
+    test_rows_from_files()
+
+    print("\n🎉 All submission diff tests passed!")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Test the shared single-pass text preprocessing used by the local similarity methods
+"""
+
+import os
+import re
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fingerprinting import compute_fingerprints
+from text_preprocessing import preprocess, preprocess_documents, Vocabulary
+
+SAMPLE = (
+    "Artificial Intelligence has revolutionized education! Machine learning algorithms help students.\n"
+    "\n"
+    "Teachers receive insights about which topics need attention. Is this the future of learning?"
+)
+
+def test_tokens_match_legacy_tokenization():
+    """Token ids decode to exactly the tokens the methods used to produce themselves"""
+    print("🔍 Testing tokenization...")
+    doc = preprocess(SAMPLE)
+    legacy = re.sub(r'[^\w\s]', ' ', SAMPLE.lower()).split()
+    assert doc.tokens == legacy
+    assert doc.filtered_ids(3) == [doc.vocabulary.ids[word] for word in legacy if len(word) > 2]
+    print(f"✅ {len(doc)} tokens, {len(doc.vocabulary)} distinct")
+
+def test_structure_offsets():
+    """Sentence and paragraph counts match the structure method's regex splits"""
+    print("🔍 Testing sentence and paragraph offsets...")
+    doc = preprocess(SAMPLE)
+    assert doc.sentence_count == len(re.split(r'[.!?]+', SAMPLE))
+    assert doc.paragraph_count == len(re.split(r'\n\s*\n', SAMPLE))
+    assert doc.word_count == len(SAMPLE.split())
+    assert SAMPLE[doc.paragraph_offsets[1]:].startswith("Teachers")
+    print(f"✅ {doc.sentence_count} sentences, {doc.paragraph_count} paragraphs")
+
+def test_shared_vocabulary():
+    """Documents preprocessed together share token ids and are passed through once preprocessed"""
+    print("🔍 Testing shared vocabulary...")
+    docs = preprocess_documents([SAMPLE, "Machine learning helps teachers."])
+    assert docs[0].vocabulary is docs[1].vocabulary
+    assert docs[0].vocabulary.ids['machine'] == docs[1].token_ids[0]
+
+    again = preprocess_documents(docs)
+    assert all(a is b for a, b in zip(docs, again))
+
+    mixed = preprocess_documents([docs[0], "Something new entirely."])
+    assert mixed[0] is docs[0] and mixed[1].vocabulary is docs[0].vocabulary
+
+    other = preprocess_documents([docs[1]], vocabulary=Vocabulary())
+    assert other[0] is not docs[1] and other[0].tokens == docs[1].tokens
+    print("✅ Vocabulary is shared")
+
+def test_fingerprints_match_text_fingerprints():
+    """Fingerprints from the token array equal fingerprints computed from the raw text"""
+    print("🔍 Testing fingerprints from preprocessed documents...")
+    assert preprocess(SAMPLE).fingerprints() == compute_fingerprints(SAMPLE)
+    print("✅ Fingerprints are identical")
+
+def test_context_matrix():
+    """Each row of the context matrix counts the words around every use of that word"""
+    print("🔍 Testing word x context matrix...")
+    from collections import Counter
+    import numpy as np
+    doc = preprocess(SAMPLE)
+    words = doc.filtered_ids(3)
+    expected = {}
+    for i, word in enumerate(words):
+        expected.setdefault(word, Counter()).update(words[max(0, i - 3):i + 4])
+
+    matrix = doc.context_matrix()
+    assert list(matrix.words) == list(expected)
+    assert list(matrix.rows) == sorted(expected)
+    for word, contexts in expected.items():
+        row = matrix.lookup(np.array([word]))[0]
+        counts = matrix.counts.getrow(row)
+        assert dict(zip(counts.indices, counts.data)) == dict(contexts)
+        assert matrix.sizes[row] == sum(contexts.values())
+    assert matrix.lookup(np.array([len(doc.vocabulary)]))[0] == -1, "unused word ids have no row"
+    print(f"✅ {len(expected)} words, {matrix.counts.nnz} co-occurring pairs")
+
+def long_text(words=40000, seed=5):
+    """A long essay-like text over a small vocabulary, so phrases repeat"""
+    import random
+    rng = random.Random(seed)
+    vocabulary = [''.join(rng.choice('abcdefghij') for _ in range(rng.randint(2, 8))) for _ in range(800)]
+    sentences = []
+    while words > 0:
+        length = rng.randint(5, 20)
+        sentences.append(' '.join(rng.choice(vocabulary) for _ in range(length)).capitalize() + '.')
+        words -= length
+    return ' '.join(sentences)
+
+def test_windowed_statistics():
+    """Statistics built window by window equal the whole-document ones while no sampling is needed"""
+    print("🔍 Testing windowed statistics...")
+    import numpy as np
+    import text_preprocessing
+    from text_preprocessing import plan_windows, set_memory_budget
+    from tfidf_model import term_counts, _hashing_vectorizer
+
+    text = long_text()
+    exact = preprocess(text)
+    set_memory_budget(24 * 1024 * 1024)
+    try:
+        windowed = preprocess(text)
+        window, rate = plan_windows(len(windowed), len(windowed) * 6)
+        assert window < len(windowed) and rate == 1
+
+        phrases, expected = windowed.phrase_counts(), exact.phrase_counts()
+        assert np.array_equal(phrases.keys, expected.keys) and np.array_equal(phrases.counts, expected.counts)
+        assert phrases.total == expected.total and phrases.sample_rate == 1
+
+        contexts, expected = windowed.context_matrix(), exact.context_matrix()
+        assert (contexts.counts != expected.counts).nnz == 0
+        assert np.array_equal(contexts.rows, expected.rows) and np.array_equal(contexts.words, expected.words)
+        assert np.array_equal(contexts.sizes, expected.sizes)
+
+        assert (term_counts([windowed]) != _hashing_vectorizer.transform([exact])).nnz == 0
+    finally:
+        set_memory_budget(None)
+    print(f"✅ {len(exact)} tokens in windows of {window}")
+
+def test_sampling_bounds_memory():
+    """Beyond the budget only a hash sample of the statistics is kept, and sampled documents still compare"""
+    print("🔍 Testing budget sampling...")
+    from pair_similarity import phrase_pair_similarity, semantic_pair_similarity
+    from text_preprocessing import set_memory_budget, sampled, STORED_BYTES_PER_ENTRY
+
+    text = long_text()
+    budget = 1024 * 1024
+    exact = preprocess(text)
+    set_memory_budget(budget)
+    try:
+        small = preprocess(text)
+        phrases = small.phrase_counts()
+        contexts = small.context_matrix()
+    finally:
+        set_memory_budget(None)
+
+    assert phrases.sample_rate > 1 and sampled(phrases.keys, phrases.sample_rate).all()
+    assert len(phrases.keys) * STORED_BYTES_PER_ENTRY <= budget
+    assert contexts.counts.nnz * STORED_BYTES_PER_ENTRY <= budget
+    assert contexts.counts.nnz < exact.context_matrix().counts.nnz
+
+    # A sampled document against the full one is compared at the sampled rate
+    assert phrase_pair_similarity(phrases, exact.phrase_counts()) == 1.0
+    assert phrase_pair_similarity(exact.phrase_counts(), preprocess(long_text(seed=6)).phrase_counts()) < 0.1
+    assert semantic_pair_similarity(contexts, exact.context_matrix()) == 1.0
+    print(f"✅ {len(phrases.keys)} phrases kept at rate {phrases.sample_rate}")
+
+def main():
+    """Run all tests"""
+    print("🧪 TEXT PREPROCESSING TESTING")
+    print("=" * 60)
+
+    test_tokens_match_legacy_tokenization()
+    test_structure_offsets()
+    test_shared_vocabulary()
+    test_fingerprints_match_text_fingerprints()
+    test_context_matrix()
+    test_windowed_statistics()
+    test_sampling_bounds_memory()
+
+    print("\n🎉 All preprocessing tests passed!")
+
+if __name__ == "__main__":
+    main()
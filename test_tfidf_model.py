@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Test the incremental hashed TF-IDF model used for assignment-wide checks
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from text_preprocessing import preprocess_documents
+from tfidf_model import term_counts, pack_vector, unpack_vector, extract_terms, DocumentFrequencies
+
+DOCUMENTS = [
+    "Artificial Intelligence has revolutionized education. Machine learning algorithms help students "
+    "learn better by adapting lessons to their pace. Teachers receive insights about difficult topics.",
+    "Artificial Intelligence has transformed education. Machine learning algorithms help students "
+    "learn better by adapting lessons to their pace. Teachers get insights about difficult topics.",
+    "Renewable energy technologies are transforming the power sector. Solar panels are becoming more "
+    "efficient and wind farms now supply a large share of electricity.",
+    "Online learning platforms give students flexible access to courses. Video lectures and quizzes "
+    "let learners study at their own pace from anywhere in the world.",
+]
+
+def test_matches_tfidf_vectorizer():
+    """Cosine similarities equal a TfidfVectorizer fitted on the same documents"""
+    print("🔍 Testing TF-IDF weighting against scikit-learn...")
+    documents = preprocess_documents(DOCUMENTS)
+    counts = term_counts(documents)
+    frequencies = DocumentFrequencies.from_rows([counts[i] for i in range(len(documents))])
+    vectors = frequencies.transform(counts)
+
+    fitted = TfidfVectorizer(analyzer=extract_terms).fit_transform(documents)
+    expected = (fitted @ fitted.T).toarray()
+    actual = (vectors @ vectors.T).toarray()
+    print(f"📊 Largest difference: {abs(expected - actual).max():.2e}")
+    assert np.allclose(expected, actual, atol=1e-12)
+    print("✅ Same similarities as a refit")
+
+def test_incremental_updates():
+    """Adding and removing documents one by one equals building from scratch"""
+    print("🔍 Testing incremental document frequencies...")
+    counts = term_counts(preprocess_documents(DOCUMENTS))
+    rows = [counts[i] for i in range(len(DOCUMENTS))]
+
+    frequencies = DocumentFrequencies()
+    for row in rows:
+        frequencies.add(row)
+    frequencies.add(rows[0])
+    frequencies.remove(rows[0])
+
+    rebuilt = DocumentFrequencies.from_rows(rows)
+    assert frequencies.document_count == rebuilt.document_count == len(DOCUMENTS)
+    assert (frequencies.indices == rebuilt.indices).all() and (frequencies.counts == rebuilt.counts).all()
+    print(f"✅ {len(frequencies.indices)} features tracked")
+
+def test_serialization():
+    """Stored vectors and document frequencies unpack to the same values"""
+    print("🔍 Testing serialization...")
+    counts = term_counts(preprocess_documents(DOCUMENTS))
+    row = counts[0]
+    assert (unpack_vector(pack_vector(row)) != row).nnz == 0
+    assert unpack_vector(b'').nnz == 0
+
+    frequencies = DocumentFrequencies.from_rows([counts[i] for i in range(len(DOCUMENTS))])
+    restored = DocumentFrequencies.unpack(frequencies.pack())
+    assert restored.document_count == frequencies.document_count
+    assert (restored.indices == frequencies.indices).all() and (restored.counts == frequencies.counts).all()
+    assert DocumentFrequencies.unpack(None).document_count == 0
+    print("✅ Serialization round trip works")
+
+def main():
+    """Run all tests"""
+    print("🧪 TF-IDF MODEL TESTING")
+    print("=" * 60)
+
+    test_matches_tfidf_vectorizer()
+    test_incremental_updates()
+    test_serialization()
+
+    print("\n🎉 All TF-IDF model tests passed!")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Text Preprocessing for the E-Assignment plagiarism engine
+Tokenizes each document once into a compact token-id array plus sentence and
+paragraph offsets, shared by all local similarity methods.
+
+Under a memory budget (see set_memory_budget) the phrase and context statistics
+of a long document are built one window of tokens at a time and merged, and are
+value-sampled by hash once even the merged statistics would exceed the budget,
+so one very long upload cannot exhaust a worker's memory.
+"""
+
+import re
+from array import array
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from scipy.sparse import coo_matrix, csr_matrix
+
+from fingerprinting import (
+    iter_tokens, hash_token, winnow, ngram_hashes, Fingerprint, DEFAULT_KGRAM_LENGTH, DEFAULT_WINDOW_SIZE
+)
+
+# Same boundaries the structure similarity method has always counted
+SENTENCE_BOUNDARY = re.compile(r'[.!?]+')
+PARAGRAPH_BOUNDARY = re.compile(r'\n\s*\n')
+WORD = re.compile(r'\S+')
+
+# Working memory per token while one window of a document is processed (n-gram and context arrays)
+WORKING_BYTES_PER_TOKEN = 512
+# Memory per entry of a document's merged statistics (key or index, count, and merge headroom)
+STORED_BYTES_PER_ENTRY = 48
+# Windows never get smaller than this, however small the budget
+MIN_WINDOW_TOKENS = 4096
+
+# Most memory (bytes) the statistics of one document may take, None for no limit
+_memory_budget: Optional[int] = None
+
+
+def set_memory_budget(budget: Optional[int]):
+    """Set the per-document memory budget in bytes (None or 0 disables it)."""
+    global _memory_budget
+    _memory_budget = budget or None
+
+
+def get_memory_budget() -> Optional[int]:
+    return _memory_budget
+
+
+def plan_windows(token_count: int, entries: int, budget: Optional[int] = None) -> Tuple[int, int]:
+    """
+    (window tokens, sample rate) keeping one method's statistics of a document within budget.
+
+    Half of the budget goes to the working arrays of one window, half to the merged
+    statistics; entries is an upper bound of their size. The sample rate is a power
+    of two: only keys whose low bits are zero are kept, so samples of different
+    rates nest and two documents can always be compared at the coarser rate.
+    """
+    budget = budget if budget is not None else _memory_budget
+    if not budget:
+        return max(token_count, 1), 1
+    window = max(MIN_WINDOW_TOKENS, budget // 2 // WORKING_BYTES_PER_TOKEN)
+    max_entries = max(1, budget // 2 // STORED_BYTES_PER_ENTRY)
+    rate = 1
+    while entries > max_entries * rate:
+        rate *= 2
+    return window, rate
+
+
+def sampled(keys: np.ndarray, rate: int) -> np.ndarray:
+    """Mask of the keys kept at a sample rate."""
+    return (keys.astype(np.uint64) & np.uint64(rate - 1)) == 0
+
+
+def merge_counts(keys: np.ndarray, counts: np.ndarray, more_keys: np.ndarray,
+                 more_counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Sum two sorted (keys, counts) multisets."""
+    if not len(keys):
+        return more_keys, more_counts
+    merged, inverse = np.unique(np.concatenate([keys, more_keys]), return_inverse=True)
+    totals = np.bincount(inverse, weights=np.concatenate([counts, more_counts]), minlength=len(merged))
+    return merged, totals.astype(np.int64)
+
+
+class Vocabulary:
+    """
+    Maps token strings to dense integer ids.
+
+    Ids are only meaningful within one vocabulary, so every document that is
+    compared in the same check must share it. The stable token hash of every id
+    is kept alongside so fingerprints can be produced without rehashing strings.
+    """
+
+    def __init__(self):
+        self.ids = {}
+        self.tokens: List[str] = []
+        self.hashes = array('q')
+        self.lengths = array('i')
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def add(self, token: str) -> int:
+        """Return the id of a token, assigning a new one if needed."""
+        token_id = self.ids.get(token)
+        if token_id is None:
+            token_id = len(self.tokens)
+            self.ids[token] = token_id
+            self.tokens.append(token)
+            self.hashes.append(hash_token(token))
+            self.lengths.append(len(token))
+        return token_id
+
+
+class ContextMatrix(NamedTuple):
+    """Sparse word x context co-occurrence counts of a document, one row per word it uses."""
+    counts: csr_matrix  # row: position in rows, column: context word id, value: co-occurrences
+    rows: np.ndarray    # sorted word id of every row
+    words: np.ndarray   # distinct word ids in order of first use
+    sizes: np.ndarray   # context size (row total) of every row
+
+    def lookup(self, words: np.ndarray) -> np.ndarray:
+        """Row of each word id, -1 for words this document does not use."""
+        if len(self.rows) == 0:
+            return np.full(len(words), -1, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.rows, words), len(self.rows) - 1)
+        return np.where(self.rows[positions] == words, positions, -1)
+
+
+class PhraseCounts(NamedTuple):
+    """Multiset of n-gram hashes of a document."""
+    keys: np.ndarray      # sorted distinct n-gram hashes (uint64)
+    counts: np.ndarray    # occurrences of each key
+    total: int            # occurrences of all keys
+    sample_rate: int = 1  # only keys kept at this rate are present, see plan_windows
+
+    def at_rate(self, rate: int) -> 'PhraseCounts':
+        """The same multiset sampled at a coarser rate."""
+        if rate <= self.sample_rate:
+            return self
+        keep = sampled(self.keys, rate)
+        counts = self.counts[keep]
+        return PhraseCounts(self.keys[keep], counts, int(counts.sum()), rate)
+
+
+class PreprocessedDocument:
+    """A document tokenized once for every similarity method."""
+
+    def __init__(self, text: str, vocabulary: Vocabulary):
+        self.text = text or ''
+        self.vocabulary = vocabulary
+
+        # Token by token, no list of token strings is built for long documents
+        self.token_ids = array('i')
+        self.token_starts = array('l')
+        self.token_ends = array('l')
+        for token, start, end in iter_tokens(self.text):
+            self.token_ids.append(vocabulary.add(token))
+            self.token_starts.append(start)
+            self.token_ends.append(end)
+
+        # Whitespace separated words, as used for word counts in reports and structure
+        self.word_count = sum(1 for _ in WORD.finditer(self.text))
+
+        # Character offsets where each sentence / paragraph starts
+        self.sentence_offsets = array('l', [0] + [m.end() for m in SENTENCE_BOUNDARY.finditer(self.text)])
+        self.paragraph_offsets = array('l', [0] + [m.end() for m in PARAGRAPH_BOUNDARY.finditer(self.text)])
+
+        self._fingerprints = None
+        self._context_matrix = None
+        self._phrase_counts = None
+
+    def __len__(self) -> int:
+        return len(self.token_ids)
+
+    @property
+    def sentence_count(self) -> int:
+        return len(self.sentence_offsets)
+
+    @property
+    def paragraph_count(self) -> int:
+        return len(self.paragraph_offsets)
+
+    @property
+    def tokens(self) -> List[str]:
+        """Token strings (materialized on demand)."""
+        vocabulary_tokens = self.vocabulary.tokens
+        return [vocabulary_tokens[token_id] for token_id in self.token_ids]
+
+    def filtered_ids(self, min_length: int) -> List[int]:
+        """Token ids of tokens with at least min_length characters."""
+        lengths = self.vocabulary.lengths
+        return [token_id for token_id in self.token_ids if lengths[token_id] >= min_length]
+
+    def fingerprints(self, k: int = DEFAULT_KGRAM_LENGTH, window_size: int = DEFAULT_WINDOW_SIZE) -> List[Fingerprint]:
+        """Winnowed fingerprints, identical to fingerprinting.compute_fingerprints(text)."""
+        if self._fingerprints is None or self._fingerprints[0] != (k, window_size):
+            hashes = self.vocabulary.hashes
+            token_hashes = [hashes[token_id] for token_id in self.token_ids]
+            spans = list(zip(self.token_starts, self.token_ends))
+            self._fingerprints = ((k, window_size), winnow(token_hashes, spans, k, window_size))
+        return self._fingerprints[1]
+
+    def context_matrix(self, window_size: int = 3, min_length: int = 3) -> ContextMatrix:
+        """
+        Co-occurrence counts of every word with the words within window_size of it.
+
+        The row of word w holds the multiset of all context windows of w (the word
+        itself included), computed once per document.
+        """
+        key = (window_size, min_length)
+        if self._context_matrix is None or self._context_matrix[0] != key:
+            ids = np.array(self.filtered_ids(min_length), dtype=np.int64)
+            size = len(self.vocabulary)
+            window, rate = plan_windows(len(ids), len(ids) * (2 * window_size + 1))
+            keep = sampled(np.array(self.vocabulary.hashes, dtype=np.int64), rate) if rate > 1 else None
+            row_ids, first_use = np.unique(ids, return_index=True)
+            words = ids[np.sort(first_use)]
+            if keep is not None:
+                row_ids, words = row_ids[keep[row_ids]], words[keep[words]]
+
+            # Rows of the words at positions [start, stop), contexts may reach into the neighbours
+            counts = None
+            for start in range(0, max(len(ids), 1), window):
+                stop = min(len(ids), start + window)
+                rows, cols = [], []
+                for offset in range(-window_size, window_size + 1):
+                    low, high = max(start, -offset), min(stop, len(ids) - offset)
+                    if low < high:
+                        rows.append(ids[low:high])
+                        cols.append(ids[low + offset:high + offset])
+                rows = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+                cols = np.concatenate(cols) if cols else np.zeros(0, dtype=np.int64)
+                if keep is not None:
+                    rows, cols = rows[keep[rows]], cols[keep[rows]]
+
+                # Rows only for the words of this document, so memory does not grow with the vocabulary
+                part = coo_matrix((np.ones(len(rows)), (np.searchsorted(row_ids, rows), cols)),
+                                  shape=(len(row_ids), size)).tocsr()
+                counts = part if counts is None else counts + part
+            counts.sum_duplicates()
+            sizes = np.asarray(counts.sum(axis=1)).ravel()
+            self._context_matrix = (key, ContextMatrix(counts, row_ids, words, sizes))
+        return self._context_matrix[1]
+
+    def phrase_counts(self, min_length: int = 3, max_length: int = 8) -> PhraseCounts:
+        """Rolling-hash multiset of all phrases of min_length to max_length tokens."""
+        key = (min_length, max_length)
+        if self._phrase_counts is None or self._phrase_counts[0] != key:
+            hashes = np.array(self.vocabulary.hashes, dtype=np.int64)
+            token_hashes = hashes[np.array(self.token_ids, dtype=np.int64)]
+            n = len(token_hashes)
+            window, rate = plan_windows(n, n * (max_length - min_length + 1))
+            if window >= n and rate == 1:
+                phrases = ngram_hashes(token_hashes, min_length, max_length)
+                keys, counts = np.unique(phrases, return_counts=True)
+                self._phrase_counts = (key, PhraseCounts(keys, counts, len(phrases)))
+                return self._phrase_counts[1]
+
+            # Window by window: n-grams starting in the window, merged into the running multiset
+            keys, counts = np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.int64)
+            for start in range(0, n, window):
+                stop = min(n, start + window)
+                phrases = ngram_hashes(token_hashes[start:stop + max_length - 1], min_length, max_length,
+                                       starts=stop - start)
+                if rate > 1:
+                    phrases = phrases[sampled(phrases, rate)]
+                keys, counts = merge_counts(keys, counts, *np.unique(phrases, return_counts=True))
+            self._phrase_counts = (key, PhraseCounts(keys, counts, int(counts.sum()), rate))
+        return self._phrase_counts[1]
+
+
+def preprocess(text: str, vocabulary: Optional[Vocabulary] = None) -> PreprocessedDocument:
+    """Tokenize a single document."""
+    return PreprocessedDocument(text, vocabulary if vocabulary is not None else Vocabulary())
+
+
+def preprocess_documents(documents: Iterable, vocabulary: Optional[Vocabulary] = None) -> List[PreprocessedDocument]:
+    """
+    Tokenize documents with a shared vocabulary.
+
+    Documents that are already preprocessed are passed through untouched, so the
+    similarity methods can be called with either raw text or the output of this function.
+    """
+    documents = list(documents)
+    if vocabulary is None:
+        existing = [doc.vocabulary for doc in documents if isinstance(doc, PreprocessedDocument)]
+        vocabulary = existing[0] if existing else Vocabulary()
+
+    result = []
+    for doc in documents:
+        if isinstance(doc, PreprocessedDocument) and doc.vocabulary is vocabulary:
+            result.append(doc)
+        else:
+            text = doc.text if isinstance(doc, PreprocessedDocument) else doc
+            result.append(PreprocessedDocument(text, vocabulary))
+    return result
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Incremental TF-IDF model for the E-Assignment plagiarism engine
+Hashed term-count vectors per document and document frequencies maintained as
+documents arrive, so comparing a document needs no refit. Weighting follows
+sklearn's TfidfVectorizer defaults (smooth idf, raw term counts, L2 norm).
+"""
+
+from typing import Iterable, List, Optional
+
+import numpy as np
+from scipy.sparse import csr_matrix, vstack
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS, HashingVectorizer, strip_accents_unicode
+
+from text_preprocessing import plan_windows
+
+# 2^20 hashed features, collisions between the few thousand terms of an essay are rare
+N_FEATURES = 2 ** 20
+
+
+def term_words(doc) -> List[str]:
+    """Words of a preprocessed document that terms are built from"""
+    words = [strip_accents_unicode(token) for token in doc.tokens]
+    return [word for word in words if len(word) > 1 and word not in ENGLISH_STOP_WORDS]
+
+
+def word_terms(words: List[str], start: int = 0, stop: Optional[int] = None) -> List[str]:
+    """1- to 3-word terms starting at positions [start, stop) of words"""
+    stop = len(words) if stop is None else stop
+    terms = []
+    for n in range(1, 4):
+        for i in range(start, min(stop, len(words) - n + 1)):
+            terms.append(' '.join(words[i:i + n]))
+    return terms
+
+
+def extract_terms(doc) -> List[str]:
+    """Same terms as TfidfVectorizer(stop_words='english', ngram_range=(1, 3)), from the shared tokens"""
+    return word_terms(term_words(doc))
+
+
+# Stateless, murmurhash feature indexes are stable across processes
+_hashing_vectorizer = HashingVectorizer(
+    analyzer=extract_terms, n_features=N_FEATURES, alternate_sign=False, norm=None
+)
+
+
+def built_terms(terms: List[str]) -> List[str]:
+    """Analyzer for term lists built by word_terms"""
+    return terms
+
+
+# Same hashing for terms that are already built, one window of a long document at a time
+_term_vectorizer = HashingVectorizer(
+    analyzer=built_terms, n_features=N_FEATURES, alternate_sign=False, norm=None
+)
+
+
+def windowed_term_counts(doc, window: int) -> csr_matrix:
+    """Term counts of one long document, summed over windows of words so its term list is never held whole."""
+    words = term_words(doc)
+    counts = csr_matrix((1, N_FEATURES))
+    for start in range(0, max(len(words), 1), window):
+        counts = counts + _term_vectorizer.transform([word_terms(words, start, start + window)])
+    return counts
+
+
+def term_counts(documents: Iterable) -> csr_matrix:
+    """Hashed term counts of preprocessed documents, one row per document."""
+    documents = list(documents)
+    windows = [plan_windows(len(doc), 3 * len(doc))[0] for doc in documents]
+    if all(window >= len(doc) for doc, window in zip(documents, windows)):
+        return _hashing_vectorizer.transform(documents)
+    rows = [
+        windowed_term_counts(doc, window) if window < len(doc) else _hashing_vectorizer.transform([doc])
+        for doc, window in zip(documents, windows)
+    ]
+    return vstack(rows).tocsr()
+
+
+def pack_vector(row: csr_matrix) -> bytes:
+    """Serialize one row of term counts: feature indexes then counts."""
+    indices = row.indices.astype('<i4')
+    counts = row.data.astype('<i4')
+    return np.int32(len(indices)).tobytes() + indices.tobytes() + counts.tobytes()
+
+
+def unpack_vector(data: Optional[bytes]) -> csr_matrix:
+    """Inverse of pack_vector, as a 1 x N_FEATURES row."""
+    if not data:
+        return csr_matrix((1, N_FEATURES))
+    size = int(np.frombuffer(data[:4], dtype='<i4')[0])
+    indices = np.frombuffer(data[4:4 + 4 * size], dtype='<i4')
+    counts = np.frombuffer(data[4 + 4 * size:], dtype='<i4').astype(np.float64)
+    return csr_matrix((counts, indices, [0, size]), shape=(1, N_FEATURES))
+
+
+class DocumentFrequencies:
+    """
+    Document frequency of every hashed feature in a growing corpus.
+
+    Kept sparse (sorted feature indexes and their counts), so an assignment of a
+    few hundred essays stores only the features that actually occur.
+    """
+
+    def __init__(self, document_count: int = 0, indices: Optional[np.ndarray] = None,
+                 counts: Optional[np.ndarray] = None):
+        self.document_count = document_count
+        self.indices = indices if indices is not None else np.zeros(0, dtype=np.int64)
+        self.counts = counts if counts is not None else np.zeros(0, dtype=np.int64)
+
+    def _update(self, row: csr_matrix, change: int):
+        indices = np.concatenate([self.indices, row.indices.astype(np.int64)])
+        counts = np.concatenate([self.counts, np.full(len(row.indices), change, dtype=np.int64)])
+        unique, inverse = np.unique(indices, return_inverse=True)
+        totals = np.bincount(inverse, weights=counts).astype(np.int64)
+        keep = totals > 0
+        self.indices, self.counts = unique[keep], totals[keep]
+        self.document_count += change
+
+    def add(self, row: csr_matrix):
+        """Count the features of a new document."""
+        self._update(row, 1)
+
+    def remove(self, row: csr_matrix):
+        """Forget a document added before."""
+        self._update(row, -1)
+
+    def frequencies(self, features: np.ndarray) -> np.ndarray:
+        """Document frequency of the given feature indexes."""
+        if len(self.indices) == 0:
+            return np.zeros(len(features), dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.indices, features), len(self.indices) - 1)
+        return np.where(self.indices[positions] == features, self.counts[positions], 0)
+
+    def transform(self, counts: csr_matrix) -> csr_matrix:
+        """L2 normalised TF-IDF rows of term count rows."""
+        counts = csr_matrix(counts, dtype=np.float64, copy=True)
+        df = self.frequencies(counts.indices.astype(np.int64))
+        counts.data *= np.log((1 + self.document_count) / (1 + df)) + 1
+        norms = np.sqrt(np.asarray(counts.multiply(counts).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        return csr_matrix(counts.multiply(1 / norms[:, None]))
+
+    def pack(self) -> bytes:
+        """Serialize for storage."""
+        return (np.int64(self.document_count).tobytes() + np.int64(len(self.indices)).tobytes()
+                + self.indices.astype('<i8').tobytes() + self.counts.astype('<i8').tobytes())
+
+    @classmethod
+    def unpack(cls, data: Optional[bytes]) -> 'DocumentFrequencies':
+        """Inverse of pack."""
+        if not data:
+            return cls()
+        document_count = int(np.frombuffer(data[:8], dtype='<i8')[0])
+        size = int(np.frombuffer(data[8:16], dtype='<i8')[0])
+        indices = np.frombuffer(data[16:16 + 8 * size], dtype='<i8').astype(np.int64)
+        counts = np.frombuffer(data[16 + 8 * size:], dtype='<i8').astype(np.int64)
+        return cls(document_count, indices, counts)
+
+    @classmethod
+    def from_rows(cls, rows: List[csr_matrix]) -> 'DocumentFrequencies':
+        """Build from scratch from term count rows."""
+        frequencies = cls()
+        if rows:
+            presence = vstack(rows).tocsc()
+            features = np.flatnonzero(np.diff(presence.indptr))
+            frequencies = cls(len(rows), features.astype(np.int64),
+                              np.diff(presence.indptr)[features].astype(np.int64))
+        return frequencies